@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+AI 文本分析（OpenAI 兼容 chat/completions 接口，SSE 流式输出，请求经 backend.llm_client）。
+- 边收边推：后台线程逐行解析 SSE，片段到达即经回调推给前端（Api 通过 window.evaluate_js 派发事件），
+  首个片段立即推送，之后按 PUSH_INTERVAL 合并，避免每个 token 一次 evaluate_js
+- 首字耗时（TTFT）与完整回答耗时统计
+- 可随时取消：置取消标志并关闭连接，阻塞在读取上的线程随即退出
+- 回答缓存（backend.ai_cache）命中时按同样的事件序列回放；相同请求在途时合并为一个上游请求
+- 单次请求可换用自己的流（如 backend.ai_chunking 的分块 map-reduce），其阶段进度以 progress 事件推送
+"""
+import itertools
+import threading
+import time
+
+from backend.capture_pipeline import StageStats
+from backend.ai_cache import response_key
+from backend.llm_client import LlmCancelled, LlmError, LlmNotConfigured, get_llm_client
+
+# 请求参数
+SYSTEM_MESSAGE = "你是一个专业的文本分析助手，请根据用户的要求分析下面的文本内容。"
+AI_TEMPERATURE = 0.7
+AI_MAX_TOKENS = 2000
+# 推送合并间隔（秒）：首个片段立即推送，之后最多每隔该时间推一次
+PUSH_INTERVAL = 0.05
+
+
+class AiCancelled(Exception):
+    """流式请求被取消。"""
+
+
+def build_payload(text, prompt="", model=None):
+    """构建 chat/completions 请求体（model 为 None 时由 LlmClient 按配置填入；stream 由请求方式决定）。"""
+    if prompt:
+        user_message = f"用户要求：{prompt}\n\n文本内容：\n{text}"
+    else:
+        user_message = f"请分析以下文本内容：\n{text}"
+    payload = {
+        "messages": [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": user_message},
+        ],
+        "temperature": AI_TEMPERATURE,
+        "max_tokens": AI_MAX_TOKENS,
+    }
+    if model:
+        payload["model"] = model
+    return payload
+
+
+def request_key(text, prompt="", model=None, system=SYSTEM_MESSAGE):
+    """
+    build_payload(text, prompt, model) 对应的缓存 / 合并键（model 为 None 时取客户端配置的模型）。
+    :param system: 系统提示词；分块分析等其他请求方式传入各自的标识，缓存互不混用
+    """
+    model = model or get_llm_client().config.model
+    return response_key(model, system, prompt, text, AI_TEMPERATURE)
+
+
+def stream_completion(payload, cancel=None, client=None):
+    """
+    发送流式请求，逐个产出内容片段（经共享的 LlmClient 长连接池）。
+    :param cancel: 可选 CancelEvent / threading.Event；置位后抛 AiCancelled
+    """
+    client = client or get_llm_client()
+    try:
+        yield from client.stream_chat(payload, cancel=cancel)
+    except LlmCancelled:
+        raise AiCancelled()
+
+
+def describe_error(e):
+    """异常 -> 给用户看的错误文本（与原 analyze_text_with_ai_stream 的提示一致）。"""
+    if isinstance(e, LlmError):
+        return f"请求失败：HTTP 错误 {e.status}\n{e.body}" if e.body else f"请求失败：HTTP 错误 {e.status}"
+    if isinstance(e, LlmNotConfigured):
+        return str(e)
+    if isinstance(e, OSError):
+        return f"网络连接失败：网络错误: {e}"
+    return f"分析失败：{e!s}"
+
+
+class AiMetrics:
+    """首字耗时 / 完整回答耗时统计（线程安全）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ttft = StageStats("AI 首字")
+        self.total = StageStats("AI 完整回答")
+        self.cancelled = 0
+        self.cache_hits = 0
+        self.coalesced = 0  # 合并到在途请求的次数
+
+    def count(self, name):
+        """计数器 name（cancelled / cache_hits / coalesced）加一。"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            counters = {"cancelled": self.cancelled, "cache_hits": self.cache_hits, "coalesced": self.coalesced}
+        return {"ttft": self.ttft.snapshot(), "total": self.total.snapshot(), **counters}
+
+
+class CancelEvent(threading.Event):
+    """取消标志；LlmClient 读取期间把 abort 设为打断连接的回调，取消时调用以唤醒阻塞的读取。"""
+
+    abort = None
+
+    def cancel(self):
+        self.set()
+        abort = self.abort
+        if abort is not None:
+            abort()
+
+
+class _Flight:
+    """
+    一次上游请求及其订阅者（相同请求合并后共享）。subscribers: stream_id -> [开始时间, 已推送字符数, 首字耗时]；
+    progress 为最近一次进度（新订阅者加入时补发）。
+    """
+
+    __slots__ = ("key", "cancel", "subscribers", "parts", "progress")
+
+    def __init__(self, key):
+        self.key = key
+        self.cancel = CancelEvent()
+        self.subscribers = {}
+        self.parts = []
+        self.progress = None
+
+
+class AiStreamManager:
+    """
+    后台流式分析任务（线程安全）。
+    :param on_event: 回调 (event_dict)，event_dict 含 stream_id、type 及对应字段：
+        delta {"delta", "ttft"（仅首个）}；done {"content", "ttft", "elapsed", "cached"}；
+        error {"error"}；cancelled {}；progress {"stage", "done", "total", ...}（仅自带进度的流）
+    :param stream: 回调 (payload, cancel) -> 片段迭代器，默认 stream_completion
+    :param cache: 可选 AiResponseCache；命中时直接回放缓存的回答，完成的回答写入缓存
+    相同 key 的请求在途时不再发新请求，新的 stream_id 订阅同一上游：先补发已收到的内容，再继续接收。
+    """
+
+    def __init__(self, on_event, stream=None, push_interval=PUSH_INTERVAL, cache=None):
+        self._on_event = on_event
+        self._stream = stream or (lambda payload, cancel: stream_completion(payload, cancel=cancel))
+        self._push_interval = push_interval
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._flights = {}   # key -> _Flight（在途）
+        self._owner = {}     # stream_id -> _Flight
+        self._ids = itertools.count(1)
+        self.metrics = AiMetrics()
+
+    def start(self, payload, key=None, stream=None):
+        """
+        开始一次流式分析，立即返回 stream_id。key 为缓存 / 合并用的请求键（None 时不缓存、不合并）。
+        :param stream: 可选，本次请求改用的流 (payload, cancel, progress) -> 片段迭代器；
+            progress(**fields) 会以 progress 事件推给所有订阅者
+        """
+        stream_id = f"ai-{next(self._ids)}"
+        t0 = time.perf_counter()
+        cached = self._cache.get(key) if key is not None and self._cache is not None else None
+        if cached is not None:
+            self.metrics.count("cache_hits")
+            threading.Thread(target=self._replay, args=(stream_id, cached, t0),
+                             name=f"ai-replay-{stream_id}", daemon=True).start()
+            return stream_id
+        with self._lock:
+            flight = self._flights.get(key) if key is not None else None
+            if flight is not None:
+                self.metrics.count("coalesced")
+            else:
+                flight = _Flight(key)
+                if key is not None:
+                    self._flights[key] = flight
+                threading.Thread(target=self._run, args=(flight, payload, stream),
+                                 name=f"ai-stream-{stream_id}", daemon=True).start()
+            flight.subscribers[stream_id] = [t0, 0, None]
+            self._owner[stream_id] = flight
+            progress = flight.progress
+        if progress is not None:
+            self._emit(stream_id, "progress", **progress)
+        return stream_id
+
+    def cancel(self, stream_id):
+        """
+        取消进行中的分析，返回是否取消成功。
+        合并请求中只退订该 stream_id；最后一个订阅者取消时才中断上游请求。
+        """
+        with self._lock:
+            flight = self._owner.pop(stream_id, None)
+            if flight is None or flight.subscribers.pop(stream_id, None) is None:
+                return False
+            last = not flight.subscribers
+            if last and self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        self.metrics.count("cancelled")
+        self._emit(stream_id, "cancelled")
+        if last:
+            flight.cancel.cancel()
+        return True
+
+    def _emit(self, stream_id, type_, **fields):
+        try:
+            self._on_event({"stream_id": stream_id, "type": type_, **fields})
+        except Exception:
+            pass
+
+    def _replay(self, stream_id, content, t0):
+        """缓存命中：按与真实请求相同的事件序列回放。"""
+        ttft = time.perf_counter() - t0
+        self.metrics.ttft.add(ttft)
+        self._emit(stream_id, "delta", delta=content, ttft=ttft)
+        self._emit(stream_id, "done", content=content, ttft=ttft, elapsed=time.perf_counter() - t0, cached=True)
+
+    def _push(self, flight, content):
+        """把各订阅者尚未收到的部分推给它们（新加入的订阅者从头补发）。"""
+        now = time.perf_counter()
+        with self._lock:
+            pending = []
+            for stream_id, sub in flight.subscribers.items():
+                if sub[1] < len(content):
+                    first = sub[2] is None
+                    if first:
+                        sub[2] = now - sub[0]
+                        self.metrics.ttft.add(sub[2])
+                    pending.append((stream_id, content[sub[1]:], sub[2] if first else None))
+                    sub[1] = len(content)
+        for stream_id, delta, ttft in pending:
+            if ttft is not None:
+                self._emit(stream_id, "delta", delta=delta, ttft=ttft)
+            else:
+                self._emit(stream_id, "delta", delta=delta)
+
+    def _progress(self, flight, **fields):
+        """把阶段进度推给当前所有订阅者。"""
+        with self._lock:
+            flight.progress = fields
+            stream_ids = list(flight.subscribers)
+        for stream_id in stream_ids:
+            self._emit(stream_id, "progress", **fields)
+
+    def _finish(self, flight):
+        """上游结束：摘下 flight，返回仍在订阅的 [(stream_id, sub)]。"""
+        with self._lock:
+            if flight.key is not None and self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            subs = list(flight.subscribers.items())
+            for stream_id, _ in subs:
+                self._owner.pop(stream_id, None)
+            flight.subscribers.clear()
+        return subs
+
+    def _run(self, flight, payload, stream=None):
+        cancel = flight.cancel
+        last_push = None
+        if stream is None:
+            chunks = self._stream(payload, cancel)
+        else:
+            chunks = stream(payload, cancel, lambda **fields: self._progress(flight, **fields))
+        try:
+            for content in chunks:
+                flight.parts.append(content)
+                now = time.perf_counter()
+                if last_push is None or now - last_push >= self._push_interval:
+                    self._push(flight, "".join(flight.parts))
+                    last_push = now
+            if cancel.is_set():
+                raise AiCancelled()
+            content = "".join(flight.parts)
+            if not content:
+                for stream_id, _ in self._finish(flight):
+                    self._emit(stream_id, "error", error="AI 返回了空结果")
+                return
+            self._push(flight, content)
+            if flight.key is not None and self._cache is not None:
+                self._cache.put(flight.key, content)
+            now = time.perf_counter()
+            for stream_id, (t0, _, ttft) in self._finish(flight):
+                if ttft is None:
+                    # 最后一次 _push 之后才加入的订阅者没收到过 delta，回答随 done 一次送达
+                    ttft = now - t0
+                    self.metrics.ttft.add(ttft)
+                self.metrics.total.add(now - t0)
+                self._emit(stream_id, "done", content=content, ttft=ttft, elapsed=now - t0, cached=False)
+        except Exception as e:
+            subs = self._finish(flight)
+            if not cancel.is_set():
+                for stream_id, _ in subs:
+                    self._emit(stream_id, "error", error=describe_error(e))
+        finally:
+            close = getattr(chunks, "close", None)  # 生成器未迭代完时归还其占用的连接与并发名额
+            if close is not None:
+                close()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+AI 分析结果缓存：同一段 OCR 文本用同一提示词反复点「AI 分析」时直接回放上次的回答，不再发 2000 token 的请求。
+- 键：(模型, 系统提示词, 用户提示词, 文本哈希, temperature)
+- 内存 LRU（条目数上限）+ SQLite 磁盘层，按 TTL 过期、按总字节数淘汰最早写入的条目
+- 磁盘层默认放在用户缓存目录，环境变量 TOOLBOX_AI_CACHE_DB 可指定路径，设为 off 时只用内存
+"""
+import collections
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# 缓存键格式版本（键的组成变化时旧条目自然失效）
+AI_CACHE_FORMAT = "ai_response/1"
+# 过期时间（秒）
+AI_CACHE_TTL = 7 * 24 * 3600
+# 内存层条目数上限
+AI_CACHE_MEMORY_ITEMS = 64
+# 磁盘层回答总字节上限（超出时删除最早写入的）
+AI_CACHE_DISK_MAX_BYTES = 32 * 1024 * 1024
+# 指定磁盘层路径的环境变量
+AI_CACHE_DB_ENV = "TOOLBOX_AI_CACHE_DB"
+
+
+def default_cache_path():
+    """用户缓存目录下的 toolbox/ai_cache.sqlite3（Windows 为 %LOCALAPPDATA%）。"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "toolbox", "ai_cache.sqlite3")
+
+
+def response_key(model, system, prompt, text, temperature):
+    """缓存键（十六进制字符串）；文本只参与哈希，不原样存入键。"""
+    text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    raw = json.dumps([AI_CACHE_FORMAT, model, system, prompt, text_hash, temperature], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class AiResponseCache:
+    """线程安全的两级缓存：内存 LRU + SQLite（可选）。值为回答文本。"""
+
+    def __init__(self, disk_path=None, ttl=AI_CACHE_TTL, memory_items=AI_CACHE_MEMORY_ITEMS,
+                 disk_max_bytes=AI_CACHE_DISK_MAX_BYTES):
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+        self._items = collections.OrderedDict()  # key -> (created, value)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_path:
+            self.open_disk(disk_path)
+
+    def open_disk(self, path):
+        """启用磁盘层并清掉已过期条目；打开失败时只用内存层。"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS ai_cache "
+                       "(key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS ai_cache_created ON ai_cache (created)")
+            db.execute("DELETE FROM ai_cache WHERE created < ?", (time.time() - self.ttl,))
+            db.commit()
+        except (OSError, sqlite3.Error):
+            return False
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+            self._db = db
+        return True
+
+    def _remember(self, key, created, value):
+        self._items[key] = (created, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.memory_items:
+            self._items.popitem(last=False)
+
+    def get(self, key):
+        """命中且未过期返回回答文本，否则 None。"""
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                if now - item[0] <= self.ttl:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._items[key]
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT created, value FROM ai_cache WHERE key = ? AND created >= ?",
+                                           (key, now - self.ttl)).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[1]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is None:
+                return
+            try:
+                self._db.execute("INSERT OR REPLACE INTO ai_cache (key, value, size, created) VALUES (?, ?, ?, ?)",
+                                 (key, value, len(value.encode("utf-8")), now))
+                self._db.execute("DELETE FROM ai_cache WHERE created < ?", (now - self.ttl,))
+                self._evict_locked()
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def _evict_locked(self):
+        """磁盘层总字节超过上限时，从最早写入的开始删除。"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM ai_cache").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM ai_cache ORDER BY created"):
+            if total <= self.disk_max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM ai_cache WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM ai_cache")
+                    self._db.commit()
+                except sqlite3.Error:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk": self._db is not None,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ai_cache():
+    """进程内共享的 AI 结果缓存（磁盘层路径见 TOOLBOX_AI_CACHE_DB，默认用户缓存目录）。"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = os.environ.get(AI_CACHE_DB_ENV) or default_cache_path()
+            _cache = AiResponseCache(disk_path=None if path.lower() == "off" else path)
+        return _cache
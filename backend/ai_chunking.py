@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+长文本分块分析（map-reduce）：长截图 OCR 文本整段塞进一条消息容易超出上下文，单个大请求也慢。
+- 按 OCR 行边界切块，每块不超过 token 预算（单行过长时按字切开）
+- map：各块并发请求（非流式，并发数有上限），得到每块的要点
+- 要点合起来仍超预算时再按同样方式合并一轮，直到放得进一个请求
+- reduce：汇总请求流式输出，与普通分析走同一套事件推送
+- 每完成一块回调一次进度
+"""
+import concurrent.futures
+
+from backend.ai_analysis import AI_MAX_TOKENS, AI_TEMPERATURE, AiCancelled, CancelEvent, build_payload, stream_completion
+from backend.llm_client import LlmCancelled, get_llm_client
+
+# 每块输入的 token 预算
+AI_CHUNK_TOKENS = 3000
+# 文本估算超过该 token 数时自动分块分析
+AI_CHUNK_AUTO_TOKENS = 6000
+# 并发的分块请求数（另受 LlmClient 的 max_connections 限制）
+AI_CHUNK_WORKERS = 4
+# 每块要点的最大输出 token 数
+AI_MAP_MAX_TOKENS = 500
+# token 估算：CJK 字符约 1 token / 字，其他字符约 4 字 / token
+ASCII_CHARS_PER_TOKEN = 4
+
+MAP_SYSTEM_MESSAGE = "你是一个专业的文本分析助手。下面是一段长文本中的一部分，请根据用户的要求提取这一部分的要点，只输出要点。"
+COLLAPSE_SYSTEM_MESSAGE = "你是一个专业的文本分析助手。下面是长文本若干部分的要点，请合并去重，保留全部关键信息，只输出要点。"
+REDUCE_SYSTEM_MESSAGE = "你是一个专业的文本分析助手。下面是一段长文本按顺序分成若干部分后各部分的要点，请根据用户的要求给出完整的分析结果。"
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数（不依赖分词器）。"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + (ascii_chars + ASCII_CHARS_PER_TOKEN - 1) // ASCII_CHARS_PER_TOKEN
+
+
+def split_lines(text, budget=AI_CHUNK_TOKENS):
+    """按行边界把文本切成若干块，每块估算不超过 budget token；单行超出预算时按字切开。"""
+    chunks, current, used = [], [], 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if cost > budget:
+            if current:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            piece, piece_cost = [], 0
+            for ch in line:
+                c = 1 if ord(ch) >= 128 else 1 / ASCII_CHARS_PER_TOKEN
+                if piece_cost + c > budget:
+                    chunks.append("".join(piece))
+                    piece, piece_cost = [], 0
+                piece.append(ch)
+                piece_cost += c
+            line, cost = "".join(piece), int(piece_cost) + 1
+        if used + cost > budget and current:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return [c for c in chunks if c.strip()]
+
+
+def _map_payload(system, prompt, chunk, index, total):
+    requirement = f"用户要求：{prompt}\n\n" if prompt else ""
+    return {
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": f"{requirement}第 {index + 1}/{total} 部分：\n{chunk}"},
+        ],
+        "temperature": AI_TEMPERATURE,
+        "max_tokens": AI_MAP_MAX_TOKENS,
+    }
+
+
+def reduce_payload(prompt, notes):
+    """汇总请求：各部分要点按原文顺序拼接。"""
+    requirement = f"用户要求：{prompt}" if prompt else "请分析以下文本内容"
+    body = "\n\n".join(f"第 {i + 1} 部分要点：\n{note}" for i, note in enumerate(notes))
+    return {
+        "messages": [
+            {"role": "system", "content": REDUCE_SYSTEM_MESSAGE},
+            {"role": "user", "content": f"{requirement}\n\n{body}"},
+        ],
+        "temperature": AI_TEMPERATURE,
+        "max_tokens": AI_MAX_TOKENS,
+    }
+
+
+def _map(system, prompt, chunks, cancel, progress, stage, client, workers):
+    """并发请求各块，按块顺序返回结果；每完成一块回调 progress(stage=..., done=..., total=...)。"""
+    children = [CancelEvent() for _ in chunks]
+    cancel.abort = lambda: [child.cancel() for child in children]
+    if cancel.is_set():
+        cancel.abort = None
+        raise AiCancelled()
+    total = len(chunks)
+    progress(stage=stage, done=0, total=total)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, total)),
+                                                   thread_name_prefix="ai-map") as pool:
+            futures = {
+                pool.submit(client.complete, _map_payload(system, prompt, chunk, i, total), children[i]): i
+                for i, chunk in enumerate(chunks)
+            }
+            results = [None] * total
+            try:
+                for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                    results[futures[future]] = future.result()
+                    progress(stage=stage, done=done, total=total, chunk=futures[future])
+            except BaseException:
+                for child in children:
+                    child.cancel()
+                raise
+    except LlmCancelled:
+        raise AiCancelled()
+    finally:
+        cancel.abort = None
+    if cancel.is_set():
+        raise AiCancelled()
+    return results
+
+
+def map_reduce_stream(text, prompt="", cancel=None, progress=None, client=None,
+                      budget=AI_CHUNK_TOKENS, workers=AI_CHUNK_WORKERS):
+    """
+    分块分析，逐个产出汇总结果的内容片段（与 stream_completion 相同的接口）。
+    :param cancel: 可选 CancelEvent；取消时中断所有在途的分块请求
+    :param progress: 可选回调 (**fields)：stage 为 map / collapse / reduce，done / total 为已完成 / 总块数，
+        chunk 为刚完成的块下标
+    """
+    client = client or get_llm_client()
+    cancel = cancel if cancel is not None else CancelEvent()
+    progress = progress or (lambda **fields: None)
+    chunks = split_lines(text, budget)
+    if len(chunks) <= 1:
+        progress(stage="reduce", done=0, total=1)
+        yield from stream_completion(build_payload(text, prompt), cancel, client)
+        return
+    notes = _map(MAP_SYSTEM_MESSAGE, prompt, chunks, cancel, progress, "map", client, workers)
+    while len(notes) > 1 and estimate_tokens("\n\n".join(notes)) > budget:
+        groups = split_lines("\n\n".join(notes), budget)
+        if len(groups) >= len(notes):
+            break  # 要点本身已无法再合并，直接汇总
+        notes = _map(COLLAPSE_SYSTEM_MESSAGE, prompt, groups, cancel, progress, "collapse", client, workers)
+    progress(stage="reduce", done=0, total=1)
+    yield from stream_completion(reduce_payload(prompt, notes), cancel, client)
+
+
+def chunked_system_key():
+    """分块分析的缓存键中代替系统提示词的部分（与普通分析的缓存互不混用）。"""
+    return "\n".join((MAP_SYSTEM_MESSAGE, COLLAPSE_SYSTEM_MESSAGE, REDUCE_SYSTEM_MESSAGE, str(AI_CHUNK_TOKENS)))
+
+
+def should_chunk(text):
+    """文本是否长到应当分块分析。"""
+    return estimate_tokens(text) > AI_CHUNK_AUTO_TOKENS
+
@@ -10,11 +10,12 @@ import sys
 import time
 import threading
 import json
-import urllib.request
-import urllib.error
 
 from PIL import Image, ImageGrab
 
+from backend.image_codec import to_data_url
+from backend.image_store import get_image_store
+
 
 def _get_scale_factor():
     if sys.platform != "win32":
@@ -36,10 +37,7 @@ def _data_url_to_pil(data_url: str):
 
 
 def _pil_to_data_url(img: Image.Image) -> str:
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-    return f"data:image/png;base64,{b64}"
+    return to_data_url(img)
 
 
 def _set_clipboard_image(img: Image.Image) -> bool:
@@ -119,6 +117,8 @@ class Api:
     def __init__(self, on_log=None):
         self._on_log = on_log or (lambda msg: None)
         self._window = None
+        self._ocr_jobs = None  # OcrJobManager，首次 submit_ocr 时创建
+        self._ai_streams = None  # AiStreamManager，首次 start_ai_analysis 时创建
 
     def set_window(self, window) -> None:
         """由 run_webview 在创建窗口后注入，用于文件对话框、最小化等。F1 最小化，任务栏恢复。"""
@@ -208,17 +208,44 @@ class Api:
         程序持续捕获该区域并拼接；用户点击「完成」后生成长图并写入剪贴板。
         返回 data URL；取消或失败返回空字符串。
         """
+        img = self._run_long_screenshot()
+        return _pil_to_data_url(img) if img is not None else ""
+
+    def capture_long_screenshot_handle(self, with_ocr=False) -> dict:
+        """
+        同 capture_long_screenshot，但返回图片句柄信息 {"handle", "url", "width", "height"}；取消返回空 dict。
+        with_ocr=True 时边拼接边在后台识别文字，结束后识别结果已挂在句柄上，ocr_from_handle 可立即返回。
+        """
+        ocr_index = None
+        if with_ocr:
+            from backend.long_screenshot_ocr import IncrementalOcrIndex
+            ocr_index = IncrementalOcrIndex(bgr=True)
+        img = self._run_long_screenshot(ocr_index)
+        if img is None:
+            if ocr_index is not None:
+                ocr_index.close()
+            return {}
+        info = self._store_image(img)
+        if ocr_index is not None:
+            result = ocr_index.finish()
+            if not result.error:
+                get_image_store().set_meta(info["handle"], "ocr", result)
+        return info
+
+    def _run_long_screenshot(self, ocr_index=None):
+        """长截图主流程，返回 PIL Image；取消或失败返回 None。ocr_index 为可选的边拼边识别索引。"""
         if self._window:
             try:
                 self._window.hide()
             except Exception:
                 pass
             time.sleep(0.35)
-        data_url = ""
+        img = None
         try:
             from backend.region_capture_tk import run_region_capture_with_rect
             from backend.long_screenshot_opencv import capture_long_screenshot_manual
-            region_data_url, rect = run_region_capture_with_rect()
+            from backend.long_screenshot_preview import PreviewFeed
+            _, rect = run_region_capture_with_rect(return_image=True)
             if rect is None:
                 self._on_log("已取消选区")
             else:
@@ -226,24 +253,27 @@ class Api:
                 stop_event = threading.Event()
                 result_holder = [None]
                 current_result_holder = [None, None]  # [预览图像, 匹配状态]
+                preview_feed = PreviewFeed(bgr=True)  # 增量缩略图：只发布新增行 + 版本号
                 done_action = [None]  # "done" | "cancel"
 
                 def run_capture():
                     result_holder[0] = capture_long_screenshot_manual(
                         rect, stop_event, on_log=self._on_log,
                         current_result_holder=current_result_holder,
+                        preview_feed=preview_feed,
+                        ocr_index=ocr_index,
                     )
 
                 cap_thread = threading.Thread(target=run_capture, daemon=True)
                 cap_thread.start()
                 from backend.long_screenshot_ui_modern import run_long_screenshot_ui
                 run_long_screenshot_ui(
-                    rect, stop_event, result_holder, current_result_holder, done_action
+                    rect, stop_event, result_holder, current_result_holder, done_action,
+                    preview_feed=preview_feed,
                 )
                 cap_thread.join(timeout=3)
                 if done_action[0] == "done" and result_holder[0] is not None:
                     img = result_holder[0]
-                    data_url = _pil_to_data_url(img)
                     
                     # 多次尝试复制到剪贴板
                     copy_success = False
@@ -267,7 +297,92 @@ class Api:
                     self._window.show()
                 except Exception:
                     pass
-        return data_url
+        return img
+
+    def _store_image(self, img) -> dict:
+        """存入图片仓库，返回前端可用的句柄信息。"""
+        store = get_image_store()
+        return store.info(store.put(img))
+
+    def _hide_window(self) -> None:
+        if self._window:
+            try:
+                self._window.hide()
+            except Exception:
+                pass
+            time.sleep(0.35)
+
+    def _show_window(self) -> None:
+        if self._window:
+            try:
+                self._window.show()
+            except Exception:
+                pass
+
+    def capture_full_handle(self) -> dict:
+        """全屏截图，返回 {"handle", "url", "width", "height"}；图片留在后端，前端按 url 取图。"""
+        try:
+            return self._store_image(ImageGrab.grab())
+        except Exception as e:
+            self._on_log(f"[截图错误] {e}")
+            return {}
+
+    def capture_region_handle(self) -> dict:
+        """区域截图（同 capture_region_interactive），返回句柄信息；取消返回空 dict。"""
+        self._hide_window()
+        info = {}
+        try:
+            from backend.region_capture_tk import run_region_capture_with_rect
+            img, _ = run_region_capture_with_rect(return_image=True)
+            if img is not None:
+                info = self._store_image(img)
+        except Exception as e:
+            self._on_log(f"[区域截图] {e}")
+        finally:
+            self._show_window()
+        self._on_log("区域截图完成" if info else "区域截图已取消")
+        return info
+
+    def capture_fullscreen_for_ocr_handle(self) -> dict:
+        """全屏识别截图（同 capture_fullscreen_for_ocr），返回句柄信息。"""
+        self._hide_window()
+        info = {}
+        try:
+            info = self._store_image(ImageGrab.grab())
+            # 全屏截图分辨率高、空白多，识别时默认做前处理（按 DPI 缩小、裁边、跳过空白）
+            get_image_store().set_meta(info["handle"], "ocr_preprocess", True)
+            self._on_log("全屏截图完成")
+        except Exception as e:
+            self._on_log(f"[全屏截图错误] {e}")
+        finally:
+            self._show_window()
+        return info
+
+    def crop_image_handle(self, handle: str, x, y, w, h) -> dict:
+        """在内存中的原图上裁剪矩形 (x,y,w,h)，返回新图的句柄信息；不做任何解码。"""
+        try:
+            img = get_image_store().get(handle)
+            if img is None:
+                return {}
+            x = int(x) if x is not None else 0
+            y = int(y) if y is not None else 0
+            w = int(w) if w is not None else 0
+            h = int(h) if h is not None else 0
+            if w <= 0 or h <= 0:
+                return {}
+            return self._store_image(img.crop((x, y, x + w, y + h)))
+        except Exception as e:
+            self._on_log(f"[裁剪错误] {e}")
+            return {}
+
+    def image_data_url(self, handle: str) -> str:
+        """按句柄取 data URL（兼容仍需 data URL 的场景，如复制/下载）。"""
+        img = get_image_store().get(handle)
+        return _pil_to_data_url(img) if img is not None else ""
+
+    def release_image(self, handle: str) -> None:
+        """前端不再需要某张图时释放。"""
+        get_image_store().discard(handle)
 
     def crop_image(self, data_url: str, x, y, w, h) -> str:
         """
@@ -291,25 +406,124 @@ class Api:
             self._on_log(f"[裁剪错误] {e}")
             return ""
 
-    def ocr_from_data_url(self, data_url: str) -> str:
-        """从 data URL 识别文字。"""
+    def _ocr_handle_result(self, handle: str, preprocess=None):
+        """
+        句柄对应图片的 OcrResult；首次识别后挂在图片仓库条目上，之后直接复用。
+        preprocess 为 None 时使用句柄上记录的默认前处理配置；显式指定时不复用、不覆盖挂载的结果。
+        """
+        store = get_image_store()
+        result = store.get_meta(handle, "ocr") if preprocess is None else None
+        if result is not None:
+            return result
+        img = store.get(handle)
+        if img is None:
+            from backend.ocr_result import OcrResult
+            return OcrResult.failed("[OCR 错误] 图片已失效，请重新截图")
+        from backend.ocr_engine import get_ocr_handler
+        explicit = preprocess is not None
+        if not explicit:
+            preprocess = store.get_meta(handle, "ocr_preprocess")
+        result = get_ocr_handler().recognize_image_result(img, preprocess=preprocess)
+        if not result.error and not explicit:
+            store.set_meta(handle, "ocr", result)
+        return result
+
+    def _get_ocr_jobs(self):
+        if self._ocr_jobs is None:
+            from backend.ocr_jobs import OcrJobManager
+            self._ocr_jobs = OcrJobManager(
+                run=lambda payload: self._ocr_handle_result(*payload).to_dict(),
+                on_finished=self._push_ocr_job,
+            )
+        return self._ocr_jobs
+
+    def _push_ocr_job(self, job: dict) -> None:
+        """任务结束时推给前端：window 上派发 "ocr-job" 事件，event.detail 同 poll_job 返回值。"""
+        if not self._window:
+            return
+        from backend.ocr_jobs import js_event
         try:
-            from backend.ocr_engine import OcrHandler
-            ocr = OcrHandler()
-            return ocr.recognize_from_data_url(data_url)
+            self._window.evaluate_js(js_event("ocr-job", job))
+        except Exception as e:
+            self._on_log(f"[OCR 任务推送失败] {e}")
+
+    def submit_ocr(self, handle: str, preprocess=None) -> str:
+        """
+        异步识别图片仓库中的图，立即返回 job_id（句柄无效返回空字符串）。
+        同一句柄 + 同一前处理配置的任务在途时返回已有 job_id。
+        完成后派发 window 事件 "ocr-job"，也可用 poll_job 轮询。
+        """
+        if get_image_store().get(handle) is None:
+            return ""
+        key = (handle, json.dumps(preprocess, sort_keys=True))
+        return self._get_ocr_jobs().submit(key, (handle, preprocess))
+
+    def poll_job(self, job_id: str) -> dict:
+        """任务状态 {"job_id", "status", "result", "error", "elapsed"}；status 为 pending / running / done / error / cancelled。"""
+        if self._ocr_jobs is None:
+            return {}
+        return self._ocr_jobs.poll(job_id) or {}
+
+    def cancel_job(self, job_id: str) -> bool:
+        """取消任务：排队中的直接取消，执行中的丢弃结果。返回是否取消成功。"""
+        if self._ocr_jobs is None:
+            return False
+        return self._ocr_jobs.cancel(job_id)
+
+    def ocr_result_from_handle(self, handle: str) -> dict:
+        """对图片仓库中的图识别，返回结构化结果 {"width", "height", "error", "text", "lines": [{"box", "text", "score", "index"}]}。"""
+        try:
+            return self._ocr_handle_result(handle).to_dict()
         except Exception as e:
             self._on_log(f"[OCR 错误] {e}")
-            return f"[OCR 错误] {e}"
+            return {"error": f"[OCR 错误] {e}", "text": f"[OCR 错误] {e}", "lines": []}
 
-    def ocr_from_file(self, path: str) -> str:
-        """从本地文件路径识别。"""
+    def ocr_region_from_handle(self, handle: str, x, y, w, h) -> dict:
+        """
+        只取图中 (x, y, w, h) 区域内的文字：从该图已有的识别结果中筛选，不对子区域重新 OCR。
+        返回结构同 ocr_result_from_handle。
+        """
         try:
-            from backend.ocr_engine import OcrHandler
-            ocr = OcrHandler()
-            return ocr.recognize_from_file(path)
+            result = self._ocr_handle_result(handle)
+            return result.in_region(float(x or 0), float(y or 0), float(w or 0), float(h or 0)).to_dict()
         except Exception as e:
             self._on_log(f"[OCR 错误] {e}")
-            return f"[OCR 错误] {e}"
+            return {"error": f"[OCR 错误] {e}", "text": f"[OCR 错误] {e}", "lines": []}
+
+    def ocr_result_from_data_url(self, data_url: str) -> dict:
+        """从 data URL 识别，返回结构化结果。"""
+        try:
+            from backend.ocr_engine import get_ocr_handler
+            return get_ocr_handler().recognize_data_url_result(data_url).to_dict()
+        except Exception as e:
+            self._on_log(f"[OCR 错误] {e}")
+            return {"error": f"[OCR 错误] {e}", "text": f"[OCR 错误] {e}", "lines": []}
+
+    def ocr_result_from_file(self, path: str) -> dict:
+        """从本地文件识别，返回结构化结果。"""
+        try:
+            from backend.ocr_engine import get_ocr_handler
+            return get_ocr_handler().recognize_file_result(path).to_dict()
+        except Exception as e:
+            self._on_log(f"[OCR 错误] {e}")
+            return {"error": f"[OCR 错误] {e}", "text": f"[OCR 错误] {e}", "lines": []}
+
+    def ocr_from_data_url(self, data_url: str) -> str:
+        """从 data URL 识别文字。"""
+        return self.ocr_result_from_data_url(data_url)["text"]
+
+    def ocr_from_handle(self, handle: str) -> str:
+        """对图片仓库中的图识别文字（直接使用内存中的 PIL 图，不再解码）。"""
+        return self.ocr_result_from_handle(handle)["text"]
+
+    def ocr_from_file(self, path: str) -> str:
+        """从本地文件路径识别。"""
+        return self.ocr_result_from_file(path)["text"]
+
+    def ocr_metrics(self) -> dict:
+        """OCR 引擎加载 / 预热耗时、冷热识别耗时与结果缓存命中统计。"""
+        from backend.ocr_engine import get_ocr_metrics
+        return get_ocr_metrics()
 
     def open_cursor(self) -> None:
         """优先激活已打开的、最近使用的 Cursor 窗口（玩家通常已开着 Cursor）；若无则再尝试启动 Cursor。"""
@@ -464,9 +678,71 @@ class Api:
             self._on_log(f"[剪贴板] {e}")
             return False
 
+    def _get_ai_streams(self):
+        if self._ai_streams is None:
+            from backend.ai_analysis import AiStreamManager
+            from backend.ai_cache import get_ai_cache
+            self._ai_streams = AiStreamManager(on_event=self._push_ai_event, cache=get_ai_cache())
+        return self._ai_streams
+
+    def _push_ai_event(self, event: dict) -> None:
+        """流式分析事件推给前端：window 上派发 "ai-stream" 事件，event.detail 见 AiStreamManager。"""
+        if event["type"] == "done":
+            if event.get("cached"):
+                source = "（缓存）"
+            elif event.get("ttft") is None:
+                source = f"（总计 {event['elapsed']:.2f}s）"
+            else:
+                source = f"（首字 {event['ttft']:.2f}s，总计 {event['elapsed']:.2f}s）"
+            self._on_log(f"AI 分析完成{source}")
+        elif event["type"] == "error":
+            self._on_log(f"[AI 分析错误] {event['error']}")
+        if not self._window:
+            return
+        from backend.ocr_jobs import js_event
+        try:
+            self._window.evaluate_js(js_event("ai-stream", event))
+        except Exception as e:
+            self._on_log(f"[AI 推送失败] {e}")
+
+    def start_ai_analysis(self, text: str, prompt: str = "", chunked=None) -> str:
+        """
+        开始流式 AI 分析，立即返回 stream_id（没有文本时返回空字符串）。
+        片段到达即派发 window 事件 "ai-stream"：detail.type 为 delta / done / error / cancelled / progress。
+        同一文本 + 提示词的回答有缓存时直接回放；相同请求在途时共享同一个上游请求。
+        chunked 为 None 时按文本长度自动选择：长文本按 OCR 行分块并发提取要点再流式汇总，
+        期间以 progress 事件（stage 为 map / collapse / reduce，done / total）报告进度。
+        """
+        if not text:
+            return ""
+        from backend.ai_analysis import build_payload, request_key
+        from backend.ai_chunking import chunked_system_key, map_reduce_stream, should_chunk
+        if chunked is None:
+            chunked = should_chunk(text)
+        if not chunked:
+            self._on_log("正在请求 Qwen3 AI 分析（流式）...")
+            return self._get_ai_streams().start(build_payload(text, prompt), key=request_key(text, prompt))
+        self._on_log("正在请求 Qwen3 AI 分析（长文本分块）...")
+        return self._get_ai_streams().start(
+            None, key=request_key(text, prompt, system=chunked_system_key()),
+            stream=lambda _, cancel, progress: map_reduce_stream(text, prompt, cancel=cancel, progress=progress))
+
+    def cancel_ai_analysis(self, stream_id: str) -> bool:
+        """取消进行中的流式分析，返回是否取消成功。"""
+        if self._ai_streams is None:
+            return False
+        return self._ai_streams.cancel(stream_id)
+
+    def ai_metrics(self) -> dict:
+        """AI 分析首字耗时（TTFT）/ 完整回答耗时、缓存命中与请求合并统计。"""
+        from backend.ai_cache import get_ai_cache
+        metrics = self._ai_streams.metrics.snapshot() if self._ai_streams is not None else {}
+        metrics["cache"] = get_ai_cache().stats()
+        return metrics
+
     def analyze_text_with_ai_stream(self, text: str, prompt: str = "") -> dict:
         """
-        使用 Qwen3 AI 分析文本（流式输出）。
+        使用 Qwen3 AI 分析文本，等整段回答收完后一次返回（兼容旧前端；新前端用 start_ai_analysis 边收边显示）。
         
         Args:
             text: 要分析的文本（OCR 识别结果）
@@ -477,110 +753,27 @@ class Api:
         """
         if not text:
             return {"status": "error", "content": "没有可分析的文本"}
-        
-        # Qwen3 配置
-        QWEN3_URL = "http://1318411781707473.cn-shanghai.pai-eas.aliyuncs.com/api/predict/xuchuan_qwen3_coder/v1/chat/completions"
-        QWEN3_API_KEY = "MDA2ZWZiOGE4MGM3MTEzYmEwYzg3YTQ1YjBhYWFjMGVlMTg0NTNlZg=="
-        QWEN3_MODEL = "Qwen3-Coder-480B-A35B-Instruct-PAI-optimized"
-        
+        from backend.ai_analysis import build_payload, describe_error, request_key, stream_completion
+        from backend.ai_cache import get_ai_cache
+        from backend.ai_chunking import chunked_system_key, map_reduce_stream, should_chunk
+        chunked = should_chunk(text)
+        key = request_key(text, prompt, system=chunked_system_key()) if chunked else request_key(text, prompt)
+        cached = get_ai_cache().get(key)
+        if cached is not None:
+            self._on_log("AI 分析完成（缓存）")
+            return {"status": "success", "content": cached, "chunks": [cached]}
+        self._on_log("正在请求 Qwen3 AI 分析（流式）...")
         try:
-            # 构建消息
-            system_message = "你是一个专业的文本分析助手，请根据用户的要求分析下面的文本内容。"
-            
-            if prompt:
-                user_message = f"用户要求：{prompt}\n\n文本内容：\n{text}"
+            if chunked:
+                chunks = list(map_reduce_stream(text, prompt))
             else:
-                user_message = f"请分析以下文本内容：\n{text}"
-            
-            # 构建请求数据（启用流式输出）
-            data = {
-                "model": QWEN3_MODEL,
-                "messages": [
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 2000,
-                "stream": True  # 启用流式输出
-            }
-            
-            # 发送请求
-            req = urllib.request.Request(
-                QWEN3_URL,
-                data=json.dumps(data).encode('utf-8'),
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {QWEN3_API_KEY}'
-                }
-            )
-            
-            self._on_log("正在请求 Qwen3 AI 分析（流式）...")
-            
-            full_content = ""
-            chunks = []
-            
-            with urllib.request.urlopen(req, timeout=120) as response:
-                # 读取流式数据
-                for line in response:
-                    line = line.decode('utf-8').strip()
-                    if not line or line == "data: [DONE]":
-                        continue
-                    
-                    if line.startswith("data: "):
-                        line = line[6:]  # 去掉 "data: " 前缀
-                        
-                        try:
-                            chunk_data = json.loads(line)
-                            if 'choices' in chunk_data and len(chunk_data['choices']) > 0:
-                                delta = chunk_data['choices'][0].get('delta', {})
-                                content = delta.get('content', '')
-                                if content:
-                                    full_content += content
-                                    chunks.append(content)
-                        except json.JSONDecodeError:
-                            continue
-                
-                if full_content:
-                    self._on_log("AI 分析完成")
-                    return {
-                        "status": "success",
-                        "content": full_content,
-                        "chunks": chunks
-                    }
-                else:
-                    return {
-                        "status": "error",
-                        "content": "AI 返回了空结果"
-                    }
-        
-        except urllib.error.HTTPError as e:
-            error_msg = f"HTTP 错误 {e.code}"
-            try:
-                error_detail = e.read().decode('utf-8')
-                self._on_log(f"[AI 分析错误] {error_msg}: {error_detail}")
-                return {
-                    "status": "error",
-                    "content": f"请求失败：{error_msg}\n{error_detail}"
-                }
-            except:
-                self._on_log(f"[AI 分析错误] {error_msg}")
-                return {
-                    "status": "error",
-                    "content": f"请求失败：{error_msg}"
-                }
-        
-        except urllib.error.URLError as e:
-            error_msg = f"网络错误: {e.reason}"
-            self._on_log(f"[AI 分析错误] {error_msg}")
-            return {
-                "status": "error",
-                "content": f"网络连接失败：{error_msg}"
-            }
-        
+                chunks = list(stream_completion(build_payload(text, prompt)))
         except Exception as e:
-            error_msg = str(e)
+            error_msg = describe_error(e)
             self._on_log(f"[AI 分析错误] {error_msg}")
-            return {
-                "status": "error",
-                "content": f"分析失败：{error_msg}"
-            }
+            return {"status": "error", "content": error_msg}
+        if not chunks:
+            return {"status": "error", "content": "AI 返回了空结果"}
+        get_ai_cache().put(key, "".join(chunks))
+        self._on_log("AI 分析完成")
+        return {"status": "success", "content": "".join(chunks), "chunks": chunks}
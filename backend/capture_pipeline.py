@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+长截图多阶段流水线：截屏线程 → 有界环形队列 → 匹配拼接线程 → 预览编码线程。
+截屏不再被慢速的模板匹配或预览转换拖住；队列满时丢弃最旧帧，
+截屏间隔根据滚动速度自适应调整。
+"""
+import collections
+import threading
+import time
+
+# 帧队列容量（满时丢弃最旧的帧）
+QUEUE_CAPACITY = 4
+# 自适应截屏间隔的上下限（秒）
+MIN_CAPTURE_INTERVAL = 0.05
+MAX_CAPTURE_INTERVAL = 0.5
+# 期望相邻两帧之间滚动的距离（占帧高比例），间隔按此反推；
+# 取重叠匹配可接受范围（重叠比例 0.3 时为 0.4 ~ 0.7 帧高）的中间
+TARGET_SCROLL_FRACTION = 0.55
+# 未检测到滚动时，间隔每次放大的倍数（逐步回落到低频）
+IDLE_BACKOFF = 1.25
+# 匹配失败（多半是两帧之间滚过了重叠区）时，间隔每次缩小的倍数
+MISS_SPEEDUP = 0.5
+# 队列积压超过该比例时，截屏线程主动放慢（背压）
+BACKPRESSURE_FILL = 0.75
+# 截屏线程等待下一帧时检查外部 stop_event 的粒度（秒）；内部提前结束（halt）立即唤醒
+STOP_POLL_INTERVAL = 0.02
+
+
+class StageStats:
+    """单个阶段的计时计数器（线程安全）。"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def time(self):
+        """with stats.time(): ... 记录代码块耗时。"""
+        return _StageTimer(self)
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.total / self.count if self.count else 0.0
+            return {"count": self.count, "avg_ms": avg * 1000, "max_ms": self.max * 1000}
+
+    def __str__(self):
+        s = self.snapshot()
+        return f"{self.name}: {s['count']} 次，平均 {s['avg_ms']:.1f} ms，最大 {s['max_ms']:.1f} ms"
+
+
+class _StageTimer:
+    def __init__(self, stats):
+        self._stats = stats
+        self._t0 = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._stats.add(time.perf_counter() - self._t0)
+        return False
+
+
+class FrameRingBuffer:
+    """
+    有界环形帧队列：put 永不阻塞，满时丢弃最旧的帧（drop-oldest，put 返回被丢弃的帧）；get 阻塞等待。
+    close() 后 get 取完剩余帧即返回 None。
+    """
+
+    def __init__(self, capacity=QUEUE_CAPACITY):
+        self.capacity = max(1, int(capacity))
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        dropped = None
+        with self._cond:
+            if len(self._items) >= self.capacity:
+                dropped = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        return dropped
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        with self._cond:
+            return self._closed
+
+    def fill_ratio(self):
+        with self._cond:
+            return len(self._items) / self.capacity
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class AdaptiveInterval:
+    """
+    根据滚动速度自适应截屏间隔：滚得快就截得勤，停下来就逐步放慢，匹配失败时立即加快。
+    目标是相邻两帧之间大约滚动 TARGET_SCROLL_FRACTION 个帧高，保证重叠足够又不浪费算力。
+    """
+
+    def __init__(self, initial, frame_height, min_interval=MIN_CAPTURE_INTERVAL, max_interval=MAX_CAPTURE_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.frame_height = max(1, int(frame_height))
+        self._interval = min(max(initial, min_interval), max_interval)
+        self._last_t = None
+
+    @property
+    def interval(self):
+        return self._interval
+
+    def observe(self, new_rows, now=None):
+        """
+        匹配线程每处理一帧调用一次；new_rows 为本帧新增行数，0 = 未滚动（重复帧），None = 匹配失败。
+        匹配失败不更新测速起点：下一次成功匹配的新增行数包含失败期间滚过的距离。
+        """
+        now = time.perf_counter() if now is None else now
+        if new_rows is None:
+            self._interval = max(self._interval * MISS_SPEEDUP, self.min_interval)
+            return
+        last_t, self._last_t = self._last_t, now
+        if new_rows <= 0 or last_t is None:
+            if new_rows <= 0:
+                self._interval = min(self._interval * IDLE_BACKOFF, self.max_interval)
+            return
+        velocity = new_rows / max(now - last_t, 1e-3)  # 行/秒
+        target = self.frame_height * TARGET_SCROLL_FRACTION / velocity
+        self._interval = min(max(target, self.min_interval), self.max_interval)
+
+
+class CapturePipeline:
+    """
+    三阶段长截图流水线。
+    - grab(): 截取一帧（截屏线程调用），返回 None 表示本次没有可用的帧
+    - process(frame) -> int | None: 处理一帧并返回新增行数，重复帧返回 0，匹配失败返回 None（匹配线程调用）
+    - release(frame): 帧用完（处理完毕或被队列丢弃）后归还给截屏方，用于复用缓冲区
+    - publish(): 把最新结果编码成预览（预览线程调用，只在有新结果时执行，多次更新会合并）
+    - should_stop(): 返回 True 时整条流水线结束（例如达到最大帧数）
+    - close_grab(): 截屏线程退出前调用，用于在同一线程内释放截屏句柄
+    """
+
+    def __init__(self, grab, process, stop_event, frame_height, publish=None, should_stop=None,
+                 initial_interval=MAX_CAPTURE_INTERVAL, capacity=QUEUE_CAPACITY, on_log=None, close_grab=None,
+                 release=None):
+        self._grab = grab
+        self._close_grab = close_grab
+        self._release = release or (lambda frame: None)
+        self._process = process
+        self._publish = publish
+        self._should_stop = should_stop or (lambda: False)
+        self._stop_event = stop_event
+        self._halt = threading.Event()
+        self._log = on_log or (lambda msg: None)
+        self.queue = FrameRingBuffer(capacity)
+        self.pacer = AdaptiveInterval(initial_interval, frame_height)
+        self.grab_stats = StageStats("截屏")
+        self.match_stats = StageStats("匹配拼接")
+        self.preview_stats = StageStats("预览编码")
+        self.backpressure_waits = 0
+        self._preview_cond = threading.Condition()
+        self._preview_version = 0
+        self._match_done = False
+
+    def _stopped(self):
+        return self._stop_event.is_set() or self._halt.is_set()
+
+    def _sleep(self, seconds):
+        """等待 seconds 秒；halt 立即唤醒，外部 stop_event 按 STOP_POLL_INTERVAL 粒度检查。"""
+        deadline = time.perf_counter() + seconds
+        while not self._stop_event.is_set():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self._halt.wait(min(remaining, STOP_POLL_INTERVAL)):
+                return
+
+    def _capture_loop(self):
+        try:
+            while not self._stopped():
+                t0 = time.perf_counter()
+                with self.grab_stats.time():
+                    frame = self._grab()
+                if frame is not None:
+                    dropped = self.queue.put(frame)
+                    if dropped is not None:
+                        self._release(dropped)
+                interval = self.pacer.interval
+                if self.queue.fill_ratio() >= BACKPRESSURE_FILL:
+                    # 背压：匹配跟不上时放慢截屏，而不是一味丢帧
+                    self.backpressure_waits += 1
+                    interval = self.pacer.max_interval
+                self._sleep(interval - (time.perf_counter() - t0))
+        except Exception as e:
+            self._log(f"[截屏线程异常] {e}")
+            self._halt.set()
+        finally:
+            if self._close_grab is not None:
+                try:
+                    self._close_grab()
+                except Exception:
+                    pass
+            self.queue.close()
+
+    def _match_loop(self):
+        try:
+            while True:
+                frame = self.queue.get(timeout=0.1)
+                if frame is None:
+                    if self.queue.closed and len(self.queue) == 0:
+                        break
+                    continue
+                try:
+                    with self.match_stats.time():
+                        new_rows = self._process(frame)
+                finally:
+                    self._release(frame)
+                self.pacer.observe(new_rows)
+                with self._preview_cond:
+                    self._preview_version += 1
+                    self._preview_cond.notify()
+                if self._should_stop():
+                    self._halt.set()
+                    break
+        except Exception as e:
+            self._log(f"[匹配线程异常] {e}")
+            self._halt.set()
+        finally:
+            with self._preview_cond:
+                self._match_done = True
+                self._preview_cond.notify()
+
+    def _preview_loop(self):
+        seen = 0
+        while True:
+            with self._preview_cond:
+                self._preview_cond.wait_for(lambda: self._preview_version != seen or self._match_done)
+                if self._preview_version == seen and self._match_done:
+                    return
+                seen = self._preview_version
+            try:
+                with self.preview_stats.time():
+                    self._publish()
+            except Exception as e:
+                self._log(f"[预览线程异常] {e}")
+
+    def run(self):
+        """启动各阶段并阻塞直到 stop_event 被 set（或 should_stop 为真），所有阶段退出后返回。"""
+        threads = [
+            threading.Thread(target=self._capture_loop, name="long-shot-capture", daemon=True),
+            threading.Thread(target=self._match_loop, name="long-shot-match", daemon=True),
+        ]
+        if self._publish is not None:
+            threads.append(threading.Thread(target=self._preview_loop, name="long-shot-preview", daemon=True))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    @property
+    def halted(self):
+        """是否因 should_stop 或阶段异常而提前结束。"""
+        return self._halt.is_set()
+
+    def stats_lines(self):
+        """各阶段计时与队列统计，便于写入日志。"""
+        return [
+            str(self.grab_stats),
+            str(self.match_stats),
+            str(self.preview_stats),
+            f"队列: 丢弃最旧帧 {self.queue.dropped} 次，背压降速 {self.backpressure_waits} 次，"
+            f"当前截屏间隔 {self.pacer.interval * 1000:.0f} ms",
+        ]
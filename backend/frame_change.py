@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+长截图帧变化检测：判断新帧与上一帧是否「几乎相同」（用户未滚动），相同则跳过匹配。
+每种检测器先把帧压缩成签名（signature），再比较签名；上一帧只需保留签名，不必保留整帧。
+
+可选检测器（成本从低到高）：
+- row_hash: 均匀抽样若干行做字节哈希，统计变化行比例
+- phash:    缩小到 hash_size 网格的灰度图，按纵向差分生成感知哈希，比较汉明距离
+- absdiff:  按 stride 跨步抽样后 cv2.absdiff，与旧实现相同的「相似度 >= 阈值」语义
+"""
+import numpy as np
+
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+# 默认使用的检测器（row_hash 对截屏噪声过于敏感，静止帧会被误判为有变化）
+DEFAULT_CHANGE_DETECTOR = "absdiff"
+# 旧实现的相似度阈值（absdiff 检测器沿用）
+SAME_FRAME_THRESHOLD = 0.98
+
+
+class ChangeDetector:
+    """检测器基类：signature(frame) 生成签名，same(sig_a, sig_b) 判断是否几乎相同。"""
+
+    name = ""
+
+    def signature(self, frame):
+        raise NotImplementedError
+
+    def same(self, sig_a, sig_b):
+        raise NotImplementedError
+
+    def frames_same(self, frame_a, frame_b):
+        """直接比较两帧（内部各算一次签名）。"""
+        if frame_a is None or frame_b is None or frame_a.shape != frame_b.shape:
+            return False
+        return self.same(self.signature(frame_a), self.signature(frame_b))
+
+
+class SampledRowHashDetector(ChangeDetector):
+    """
+    抽样行哈希：均匀抽取 rows 行（含最后一行），逐行字节哈希。
+    变化行占比 <= max_changed 视为相同，可容忍光标闪烁等局部变化；滚动会改变几乎所有行。
+    rows 越多越不容易漏掉小区域变化，成本与 rows × 帧宽 成正比。
+    """
+
+    name = "row_hash"
+
+    def __init__(self, rows=48, max_changed=0.1):
+        self.rows = max(1, int(rows))
+        self.max_changed = max_changed
+
+    def signature(self, frame):
+        h = frame.shape[0]
+        idx = np.unique(np.linspace(0, h - 1, min(self.rows, h)).astype(np.intp))
+        return frame.shape, np.fromiter((hash(frame[i].tobytes()) for i in idx), dtype=np.int64, count=idx.size)
+
+    def same(self, sig_a, sig_b):
+        (shape_a, hashes_a), (shape_b, hashes_b) = sig_a, sig_b
+        if shape_a != shape_b:
+            return False
+        changed = np.count_nonzero(hashes_a != hashes_b)
+        return changed <= self.max_changed * hashes_a.size
+
+
+class PerceptualHashDetector(ChangeDetector):
+    """
+    感知哈希：灰度缩小到 (hash_size + 1) × hash_size，相邻行比较得到 hash_size² 位，
+    汉明距离 <= max_distance 视为相同。纵向差分对上下滚动敏感，对轻微噪声不敏感；
+    hash_size 越大越能察觉小幅滚动，成本主要在一次 INTER_AREA 缩放。
+    """
+
+    name = "phash"
+
+    def __init__(self, hash_size=32, max_distance=4):
+        self.hash_size = int(hash_size)
+        self.max_distance = int(max_distance)
+
+    def signature(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, (self.hash_size, self.hash_size + 1), interpolation=cv2.INTER_AREA)
+        return frame.shape, np.packbits(small[1:] > small[:-1])
+
+    def same(self, sig_a, sig_b):
+        (shape_a, bits_a), (shape_b, bits_b) = sig_a, sig_b
+        if shape_a != shape_b:
+            return False
+        distance = int(np.unpackbits(np.bitwise_xor(bits_a, bits_b)).sum())
+        return distance <= self.max_distance
+
+
+class SubsampledAbsDiffDetector(ChangeDetector):
+    """
+    跨步抽样绝对差：取 frame[::stride, ::stride] 做 cv2.absdiff，平均差换算成相似度，
+    >= threshold 视为相同（与旧的全图 int32 求差语义一致，stride=1 时结果相同）。
+    stride 越大越快，但越可能漏掉细小变化。
+    """
+
+    name = "absdiff"
+
+    def __init__(self, stride=4, threshold=SAME_FRAME_THRESHOLD):
+        self.stride = max(1, int(stride))
+        self.threshold = threshold
+
+    def signature(self, frame):
+        s = self.stride
+        # 总是拷贝：stride=1 时切片即原帧，截屏缓冲区复用后签名会跟着变
+        return np.array(frame[::s, ::s], copy=True, order="C")
+
+    def same(self, sig_a, sig_b):
+        if sig_a.shape != sig_b.shape:
+            return False
+        diff = cv2.absdiff(sig_a, sig_b)
+        channels = 1 if diff.ndim == 2 else diff.shape[2]
+        mean_diff = sum(cv2.mean(diff)[:channels]) / channels
+        similarity = 1.0 - mean_diff / 255.0
+        return similarity >= self.threshold
+
+
+CHANGE_DETECTORS = {
+    SampledRowHashDetector.name: SampledRowHashDetector,
+    PerceptualHashDetector.name: PerceptualHashDetector,
+    SubsampledAbsDiffDetector.name: SubsampledAbsDiffDetector,
+}
+
+
+def get_change_detector(name=DEFAULT_CHANGE_DETECTOR, **options):
+    """按名称创建检测器，options 透传给构造函数（如 rows / hash_size / stride / threshold）。"""
+    try:
+        cls = CHANGE_DETECTORS[name]
+    except KeyError:
+        raise ValueError(f"未知的帧变化检测器: {name}（可选: {', '.join(CHANGE_DETECTORS)}）")
+    return cls(**options)
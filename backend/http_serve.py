@@ -1,9 +1,47 @@
 # -*- coding: utf-8 -*-
-"""本地 HTTP 服务：用于提供 frontend/dist，使 QWebChannel 在 http 下稳定工作。"""
+"""
+本地 HTTP 服务：用于提供 frontend/dist，使 QWebChannel 在 http 下稳定工作；同时按句柄提供内存中的截图。
+- ThreadingHTTPServer + HTTP/1.1 keep-alive：启动时 WebView 并发拉取的各个资源不再排队
+- 启动时把 dist 预加载进内存（AssetBundle），请求不再读盘
+- ETag / If-None-Match 协商缓存；Vite 带内容哈希的 assets/ 文件加 Cache-Control: immutable，index.html 每次校验
+- 有预压缩的 .br / .gz 时按 Accept-Encoding 直接返回；没有时文本类资源在预加载时 gzip 一份
+"""
+import email.utils
+import gzip
+import hashlib
+import mimetypes
 import os
+import posixpath
+import re
 import socket
 import threading
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.image_store import get_image_store, parse_image_path
+
+# 预加载进内存的单个文件 / 总字节上限（超出的按需读盘）
+ASSET_PRELOAD_MAX_FILE = 8 * 1024 * 1024
+ASSET_PRELOAD_MAX_BYTES = 64 * 1024 * 1024
+# 预加载时跳过的目录（未构建时 dist 回退为 frontend 源码目录）
+ASSET_SKIP_DIRS = {"node_modules", ".git", ".vite"}
+# 小于该字节数或不可压缩的类型不做 gzip
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml",
+                      "application/wasm", "application/xml")
+# 预压缩文件扩展名 -> Content-Encoding（按优先级）
+PRECOMPRESSED = ((".br", "br"), (".gz", "gzip"))
+# Vite 构建产物文件名中的内容哈希（name-<hash>.ext），这类文件内容不变，可永久缓存
+HASHED_ASSET_RE = re.compile(r"(^|/)assets/.+[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/javascript", ".mjs")
+mimetypes.add_type("text/css", ".css")
+mimetypes.add_type("image/svg+xml", ".svg")
+mimetypes.add_type("application/wasm", ".wasm")
 
 
 def _find_free_port():
@@ -12,10 +50,219 @@ def _find_free_port():
         return s.getsockname()[1]
 
 
-class _Handler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, directory=None, **kwargs):
-        self.directory = directory or os.getcwd()
-        super().__init__(*args, directory=self.directory, **kwargs)
+def _content_type(rel):
+    mime = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+    if mime.startswith("text/") or mime == "application/javascript":
+        mime += "; charset=utf-8"
+    return mime
+
+
+def _compressible(mime):
+    return mime.startswith(COMPRESSIBLE_TYPES)
+
+
+class Asset:
+    """一个静态文件：原始字节 + 各编码版本（encoding -> bytes）与响应头所需信息。"""
+
+    __slots__ = ("data", "encodings", "mime", "etag", "cache_control", "last_modified")
+
+    def __init__(self, data, mime, etag, cache_control, last_modified, encodings=None):
+        self.data = data
+        self.mime = mime
+        self.etag = etag
+        self.cache_control = cache_control
+        self.last_modified = last_modified
+        self.encodings = encodings or {}
+
+    def select(self, accept_encoding):
+        """按 Accept-Encoding 选编码，返回 (encoding 或 None, 字节)。"""
+        accepted = {part.split(";", 1)[0].strip().lower() for part in (accept_encoding or "").split(",")}
+        for _, encoding in PRECOMPRESSED:
+            if encoding in accepted and encoding in self.encodings:
+                return encoding, self.encodings[encoding]
+        return None, self.data
+
+
+class AssetBundle:
+    """
+    dist 目录的内存快照（线程安全，只读）。
+    get(rel) 未预加载的文件（超出上限或启动后新增）每次从磁盘读取，不做压缩。
+    """
+
+    def __init__(self, root, max_file=ASSET_PRELOAD_MAX_FILE, max_bytes=ASSET_PRELOAD_MAX_BYTES):
+        self.root = os.path.abspath(root)
+        self.max_file = max_file
+        self.max_bytes = max_bytes
+        self._assets = {}  # 相对路径（/ 分隔）-> Asset
+        self.nbytes = 0
+        self.preload()
+
+    def _cache_control(self, rel):
+        return IMMUTABLE_CACHE if HASHED_ASSET_RE.search(rel) else REVALIDATE_CACHE
+
+    def preload(self):
+        """遍历 root 读入所有文件（含同名 .br / .gz），对未预压缩的文本资源 gzip 一份。"""
+        assets, total = {}, 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in ASSET_SKIP_DIRS]
+            names = set(filenames)
+            for name in filenames:
+                if any(name.endswith(ext) and name[:-len(ext)] in names for ext, _ in PRECOMPRESSED):
+                    continue  # 预压缩版本随原文件一起加载
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if st.st_size > self.max_file or total + st.st_size > self.max_bytes:
+                    continue
+                rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+                asset = self._load(path, rel, st, names)
+                if asset is None:
+                    continue
+                assets[rel] = asset
+                total += len(asset.data) + sum(len(v) for v in asset.encodings.values())
+        self._assets, self.nbytes = assets, total
+
+    def _load(self, path, rel, st, names=None):
+        """读入一个文件；names 为同目录文件名集合（用于查找预压缩版本），None 表示按需读盘、不做压缩。"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        mime = _content_type(rel)
+        encodings = {}
+        name = os.path.basename(path)
+        for ext, encoding in PRECOMPRESSED if names is not None else ():
+            if name + ext in names:
+                try:
+                    with open(path + ext, "rb") as f:
+                        encodings[encoding] = f.read()
+                except OSError:
+                    pass
+        if names is not None and "gzip" not in encodings and len(data) >= GZIP_MIN_BYTES and _compressible(mime):
+            packed = gzip.compress(data, GZIP_LEVEL, mtime=0)
+            if len(packed) < len(data):
+                encodings["gzip"] = packed
+        etag = '"' + hashlib.sha1(data).hexdigest()[:20] + '"'
+        return Asset(data, mime, etag, self._cache_control(rel), email.utils.formatdate(st.st_mtime, usegmt=True),
+                     encodings)
+
+    def resolve(self, url_path):
+        """URL 路径 -> 相对路径（/ 映射为 index.html）；越出 root 时返回 None。"""
+        path = posixpath.normpath(urllib.parse.unquote(url_path.split("?", 1)[0].split("#", 1)[0]))
+        rel = path.lstrip("/")
+        if rel in ("", "."):
+            return "index.html"
+        if rel.startswith("..") or "\\" in rel or "\0" in rel:
+            return None
+        if url_path.split("?", 1)[0].endswith("/"):
+            rel += "/index.html"
+        return rel
+
+    def get(self, rel):
+        asset = self._assets.get(rel)
+        if asset is not None:
+            return asset
+        path = os.path.join(self.root, *rel.split("/"))
+        if not os.path.abspath(path).startswith(self.root + os.sep):
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        return self._load(path, rel, st)
+
+    def is_dir(self, rel):
+        """rel 是否为 root 下的目录（用于把不带末尾 / 的目录地址重定向）。"""
+        prefix = rel.rstrip("/") + "/"
+        if any(key.startswith(prefix) for key in self._assets):
+            return True
+        path = os.path.join(self.root, *rel.split("/"))
+        return os.path.abspath(path).startswith(self.root + os.sep) and os.path.isdir(path)
+
+    def __len__(self):
+        return len(self._assets)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # keep-alive 下响应头与正文分两次写，避免 Nagle + 延迟 ACK 的 40 ms 等待
+    bundle = None  # AssetBundle，create_server 中按服务绑定
+
+    def do_GET(self):
+        if self._send_store_image(True):
+            return
+        self._send_asset(True)
+
+    def do_HEAD(self):
+        if self._send_store_image(False):
+            return
+        self._send_asset(False)
+
+    def _send_asset(self, with_body):
+        rel = self.bundle.resolve(self.path)
+        asset = self.bundle.get(rel) if rel is not None else None
+        if asset is None:
+            if rel is not None and self.bundle.is_dir(rel):
+                self._redirect_to_dir()
+                return
+            self.send_error(404, "File not found")
+            return
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and (if_none_match.strip() == "*" or asset.etag in
+                              [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+            self.send_response(304)
+            self.send_header("ETag", asset.etag)
+            self.send_header("Cache-Control", asset.cache_control)
+            self.end_headers()
+            return
+        encoding, data = asset.select(self.headers.get("Accept-Encoding"))
+        self.send_response(200)
+        self.send_header("Content-Type", asset.mime)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", asset.etag)
+        self.send_header("Last-Modified", asset.last_modified)
+        self.send_header("Cache-Control", asset.cache_control)
+        if asset.encodings:
+            self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if with_body:
+            self.wfile.write(data)
+
+    def _redirect_to_dir(self):
+        """目录地址不带末尾 / 时 301 到带 / 的地址（与 SimpleHTTPRequestHandler 一致），页面内相对路径才能正确解析。"""
+        parts = urllib.parse.urlsplit(self.path)
+        location = urllib.parse.urlunsplit(("", "", parts.path + "/", parts.query, parts.fragment))
+        self.send_response(301)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_store_image(self, with_body):
+        """处理 /_img/<handle>.<ext>：从图片仓库取编码后的字节直接返回。"""
+        parsed = parse_image_path(self.path)
+        if parsed is None:
+            return False
+        found = get_image_store().encoded(*parsed)
+        if found is None:
+            self.send_error(404, "image not found")
+            return True
+        data, mime = found
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(len(data)))
+        # 句柄对应的图片不会变，可放心让 WebView 缓存
+        self.send_header("Cache-Control", "private, max-age=3600, immutable")
+        self.end_headers()
+        if with_body:
+            self.wfile.write(data)
+        return True
 
     def log_message(self, format, *args):
         pass  # 静默
@@ -25,14 +272,21 @@ _server = None
 _port = None
 
 
+def create_server(dist_dir: str, port: int) -> ThreadingHTTPServer:
+    """创建（不启动）服务 dist_dir 静态文件与 /_img/ 截图的 HTTP 服务（dist 预加载进内存），并登记图片仓库根地址。"""
+    handler = type("Handler", (_Handler,), {"bundle": AssetBundle(dist_dir)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.bundle = handler.bundle
+    get_image_store().base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
 def start_server(dist_dir: str) -> int:
     """在后台线程启动 HTTP 服务，返回端口。"""
     global _server, _port
     _port = _find_free_port()
-    def handler(*args):
-        return _Handler(*args, directory=dist_dir)
-
-    _server = HTTPServer(("127.0.0.1", _port), handler)
+    _server = create_server(dist_dir, _port)
     t = threading.Thread(target=_server.serve_forever, daemon=True)
     t.start()
     return _port
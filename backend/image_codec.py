@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+统一的图片编码：所有截图路径（data URL、HTTP 取图、剪贴板之外的导出）都走这里。
+- PNG 默认低压缩级别、关闭 optimize（截图以纯色块为主，级别 1 体积增加有限，耗时大幅下降）
+- 预览可选 JPEG / WebP
+- 大图 PNG 按行分块多线程 deflate（zlib 压缩时释放 GIL），拼成单个合法 zlib 流
+- 编码结果按「图片对象 + 编码参数」缓存，同一张截图多次取用只编码一次
+"""
+import base64
+import collections
+import concurrent.futures
+import io
+import os
+import struct
+import threading
+import weakref
+import zlib
+
+import numpy as np
+
+# PNG 压缩级别（0~9，越大越慢越小）
+PNG_COMPRESS_LEVEL = 1
+# JPEG / WebP 预览质量
+PREVIEW_QUALITY = 85
+# 像素数超过该值时 PNG 走多线程分块压缩
+THREADED_ENCODE_MIN_PIXELS = 2_000_000
+# 多线程压缩的线程数
+ENCODE_WORKERS = min(8, os.cpu_count() or 2)
+# 多线程 PNG 支持的模式（8 位灰度 / RGB / RGBA）；其余模式（LA、P、I;16 等）交给 PIL，保留透明通道与位深
+THREADED_PNG_MODES = ("RGB", "RGBA", "L")
+# 编码结果缓存的总字节上限
+ENCODE_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+# 扩展名 -> (PIL 格式, MIME)
+ENCODE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "jpg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "bmp": ("BMP", "image/bmp"),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="img-encode")
+        return _executor
+
+
+def mime_type(fmt):
+    return ENCODE_FORMATS[fmt.lower()][1]
+
+
+def _png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def _deflate_part(data, level, last):
+    """原始 deflate（无 zlib 头尾）压缩一段；非最后一段以 SYNC_FLUSH 结束，保证可直接拼接。"""
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return comp.compress(data) + comp.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _encode_png_threaded(img, compress_level, workers):
+    """
+    多线程 PNG 编码：逐行 Up 滤波后按行分块并行 deflate，
+    各块拼成一个 zlib 流（统一的头 + 各块 + 整体 adler32），输出标准 PNG。
+    img.mode 须为 THREADED_PNG_MODES 之一。
+    """
+    arr = np.asarray(img)
+    if arr.ndim == 2:
+        arr = arr[:, :, None]
+    h, w, c = arr.shape
+    # Up 滤波：每行减去上一行（uint8 回绕），首行不变；每行前加滤波类型字节 2
+    filtered = np.empty((h, w * c + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    flat = arr.reshape(h, w * c)
+    filtered[0, 1:] = flat[0]
+    np.subtract(flat[1:], flat[:-1], out=filtered[1:, 1:])
+    raw = memoryview(filtered.reshape(-1))
+    row_bytes = w * c + 1
+    rows_per_part = max(1, -(-h // workers))
+    bounds = [(i * row_bytes, min(h, i + rows_per_part) * row_bytes) for i in range(0, h, rows_per_part)]
+    futures = [
+        _get_executor().submit(_deflate_part, raw[a:b], compress_level, i == len(bounds) - 1)
+        for i, (a, b) in enumerate(bounds)
+    ]
+    # zlib 头：CM=8, CINFO=7；FLEVEL 只是提示，固定 0x78 0x01 即可
+    stream = [b"\x78\x01"] + [f.result() for f in futures]
+    stream.append(struct.pack(">I", zlib.adler32(raw) & 0xFFFFFFFF))
+    color_type = {1: 0, 3: 2, 4: 6}[c]
+    ihdr = struct.pack(">IIBBBBB", w, h, 8, color_type, 0, 0, 0)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", ihdr),
+        _png_chunk(b"IDAT", b"".join(stream)),
+        _png_chunk(b"IEND", b""),
+    ])
+
+
+def _encode_uncached(img, fmt, compress_level, quality, optimize, threaded):
+    pil_format = ENCODE_FORMATS[fmt][0]
+    if pil_format == "PNG":
+        if threaded is None:
+            threaded = img.width * img.height >= THREADED_ENCODE_MIN_PIXELS and not optimize
+        if threaded and ENCODE_WORKERS > 1 and img.mode in THREADED_PNG_MODES:
+            return _encode_png_threaded(img, compress_level, ENCODE_WORKERS)
+        params = {"compress_level": compress_level, "optimize": optimize}
+    elif pil_format == "JPEG":
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        params = {"quality": quality, "optimize": optimize}
+    elif pil_format == "WEBP":
+        params = {"quality": quality, "method": 0}
+    else:
+        params = {}
+    buf = io.BytesIO()
+    img.save(buf, format=pil_format, **params)
+    return buf.getvalue()
+
+
+class _EncodeCache:
+    """
+    编码结果缓存：键为 (id(img), 编码参数)，同时保存图片弱引用以确认仍是同一个对象。
+    图片被回收时自动移除；要求缓存过的图片不再被原地修改（截图结果都是只读使用）。
+    """
+
+    def __init__(self, max_bytes=ENCODE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, img, key):
+        full_key = (id(img),) + key
+        with self._lock:
+            item = self._items.get(full_key)
+            if item is not None and item[0]() is img:
+                self._items.move_to_end(full_key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+            return None
+
+    def put(self, img, key, data):
+        full_key = (id(img),) + key
+        try:
+            ref = weakref.ref(img, lambda _r, k=full_key: self._discard(k))
+        except TypeError:
+            return
+        with self._lock:
+            old = self._items.pop(full_key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._items[full_key] = (ref, data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _discard(self, full_key):
+        with self._lock:
+            item = self._items.pop(full_key, None)
+            if item is not None:
+                self._bytes -= len(item[1])
+
+    def stats(self):
+        with self._lock:
+            return {"items": len(self._items), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+_cache = _EncodeCache()
+
+
+def encode_image(img, fmt="png", compress_level=PNG_COMPRESS_LEVEL, quality=PREVIEW_QUALITY,
+                 optimize=False, threaded=None, use_cache=True):
+    """
+    编码 PIL Image，返回 bytes。
+    :param fmt: png / jpeg / webp / bmp
+    :param compress_level: PNG 压缩级别
+    :param quality: JPEG / WebP 质量
+    :param optimize: 是否启用 PIL 的 optimize（慢，默认关闭）
+    :param threaded: PNG 是否多线程分块压缩；None 表示按像素数自动决定
+    :param use_cache: 是否使用按图片对象缓存的编码结果
+    """
+    fmt = fmt.lower()
+    if fmt not in ENCODE_FORMATS:
+        raise ValueError(f"不支持的编码格式: {fmt}")
+    key = (fmt, compress_level, quality, optimize)
+    if use_cache:
+        data = _cache.get(img, key)
+        if data is not None:
+            return data
+    data = _encode_uncached(img, fmt, compress_level, quality, optimize, threaded)
+    if use_cache:
+        _cache.put(img, key, data)
+    return data
+
+
+def to_data_url(img, fmt="png", **options) -> str:
+    """PIL Image -> data:image/...;base64,..."""
+    data = encode_image(img, fmt, **options)
+    b64 = base64.b64encode(data).decode("ascii")
+    return f"data:{mime_type(fmt)};base64,{b64}"
+
+
+def encode_cache_stats():
+    """编码缓存统计：条目数、字节数、命中/未命中次数。"""
+    return _cache.stats()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+识别前的图片加载：尽量少复制。
+旧路径「整文件读入 bytes → BytesIO → PIL 解码 → convert('RGB') → np.array」峰值约为图片三份大小；
+这里改为：
+- 有 OpenCV 时把文件 np.memmap 映射进来直接 cv2.imdecode，解码结果原地 BGR→RGB，只有一份像素缓冲
+- 否则 PIL 按路径惰性打开（不先读成 bytes），模式已是 RGB 时直接 np.asarray
+- 多帧 TIFF 逐帧解码产出，不一次性载入全部页
+"""
+import os
+
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+# 可能包含多帧的格式（逐帧流式读取）
+MULTI_FRAME_EXTS = (".tif", ".tiff", ".gif")
+
+
+def _pil_to_rgb_array(img):
+    """PIL 图 -> RGB ndarray；已是 RGB 时不再 convert。"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.asarray(img)
+
+
+def decode_file(path):
+    """解码图片文件为 RGB uint8 ndarray（H, W, 3）。文件不存在抛 FileNotFoundError。"""
+    if OPENCV_AVAILABLE:
+        if os.path.getsize(path) > 0:
+            mapped = np.memmap(path, dtype=np.uint8, mode="r")
+            try:
+                arr = cv2.imdecode(mapped, cv2.IMREAD_COLOR)
+            finally:
+                del mapped
+            if arr is not None:
+                return cv2.cvtColor(arr, cv2.COLOR_BGR2RGB, dst=arr)
+        # OpenCV 不支持的格式（如部分 WebP / 调色板 GIF）退回 PIL
+    with Image.open(path) as img:
+        return _pil_to_rgb_array(img)
+
+
+def iter_frames(path):
+    """逐帧产出 RGB ndarray：多帧 TIFF / GIF 一次只解码一页，其他格式只产出一帧。"""
+    if path.lower().endswith(MULTI_FRAME_EXTS):
+        with Image.open(path) as img:
+            n = getattr(img, "n_frames", 1)
+            if n > 1:
+                for i in range(n):
+                    img.seek(i)
+                    yield _pil_to_rgb_array(img)
+                return
+    yield decode_file(path)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+后端图片仓库：截图留在内存里，用句柄（handle）在 JS 与 Python 之间传递，
+前端通过本地 HTTP 服务按句柄取图（/_img/<handle>.png），不再经 pywebview JSON 桥传 base64 PNG。
+裁剪、OCR 直接作用于内存中的 PIL 图，不再重复解码。
+"""
+import collections
+import threading
+import uuid
+
+from backend.image_codec import encode_image, mime_type
+
+# 仓库最多保留的图片数与总字节上限（像素 + 缓存的编码结果；超出时淘汰最久未使用的）
+IMAGE_STORE_MAX_ITEMS = 32
+IMAGE_STORE_MAX_BYTES = 512 * 1024 * 1024
+# HTTP 取图路由前缀
+IMAGE_ROUTE = "/_img/"
+# 可用的传输格式：扩展名 -> image_codec.encode_image 的参数（jpeg / webp 为有损预览）
+IMAGE_FORMATS = {
+    "png": {},
+    "jpeg": {},
+    "jpg": {},
+    "webp": {},
+    "bmp": {},
+}
+
+
+def _image_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+def _entry_nbytes(entry):
+    """像素字节 + 已缓存的各格式编码字节。"""
+    return _image_nbytes(entry.image) + sum(len(data) for data in entry.encoded.values())
+
+
+class _Entry:
+    __slots__ = ("image", "encoded", "meta")
+
+    def __init__(self, image):
+        self.image = image
+        self.encoded = {}  # 扩展名 -> bytes
+        self.meta = {}     # 与图片同生命周期的附加数据（如 OCR 结果）
+
+
+class ImageStore:
+    """线程安全的 LRU 图片仓库：put 返回句柄，get / encoded 按句柄取图或取编码后的字节。"""
+
+    def __init__(self, max_items=IMAGE_STORE_MAX_ITEMS, max_bytes=IMAGE_STORE_MAX_BYTES):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._items = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.base_url = ""  # 本地 HTTP 服务根地址，如 http://127.0.0.1:8765
+
+    def put(self, img):
+        """存入 PIL 图，返回句柄。"""
+        handle = uuid.uuid4().hex
+        with self._lock:
+            self._items[handle] = _Entry(img)
+            self._bytes += _image_nbytes(img)
+            self._evict()
+        return handle
+
+    def _evict(self):
+        while self._items and (len(self._items) > self.max_items or self._bytes > self.max_bytes):
+            if len(self._items) == 1:
+                break
+            _, entry = self._items.popitem(last=False)
+            self._bytes -= _entry_nbytes(entry)
+
+    def get(self, handle):
+        """按句柄取 PIL 图，不存在时返回 None。"""
+        with self._lock:
+            entry = self._items.get(handle)
+            if entry is None:
+                return None
+            self._items.move_to_end(handle)
+            return entry.image
+
+    def encoded(self, handle, ext="png"):
+        """按句柄取编码后的 (bytes, mime)，同一格式只编码一次；句柄或格式无效返回 None。"""
+        options = IMAGE_FORMATS.get(ext)
+        with self._lock:
+            entry = self._items.get(handle)
+        if entry is None or options is None:
+            return None
+        data = entry.encoded.get(ext)
+        if data is None:
+            # 编码结果已按句柄缓存在 entry 上，不再占用 image_codec 的全局缓存
+            data = encode_image(entry.image, ext, use_cache=False, **options)
+            with self._lock:
+                if ext in entry.encoded:  # 并发请求已先编码并计入
+                    data = entry.encoded[ext]
+                else:
+                    entry.encoded[ext] = data
+                    if self._items.get(handle) is entry:  # 编码期间被淘汰的不再计入
+                        self._bytes += len(data)
+                        self._evict()
+        return data, mime_type(ext)
+
+    def set_meta(self, handle, key, value):
+        """给句柄附加数据（随图片一起淘汰）；句柄无效时忽略。"""
+        with self._lock:
+            entry = self._items.get(handle)
+            if entry is not None:
+                entry.meta[key] = value
+
+    def get_meta(self, handle, key, default=None):
+        with self._lock:
+            entry = self._items.get(handle)
+            return entry.meta.get(key, default) if entry is not None else default
+
+    def discard(self, handle):
+        with self._lock:
+            entry = self._items.pop(handle, None)
+            if entry is not None:
+                self._bytes -= _entry_nbytes(entry)
+
+    def url(self, handle, ext="png"):
+        return f"{self.base_url}{IMAGE_ROUTE}{handle}.{ext}"
+
+    def info(self, handle):
+        """供前端使用的描述：{"handle", "url", "width", "height"}；句柄无效返回空 dict。"""
+        img = self.get(handle)
+        if img is None:
+            return {}
+        return {"handle": handle, "url": self.url(handle), "width": img.width, "height": img.height}
+
+
+def parse_image_path(path):
+    """解析 /_img/<handle>.<ext>（可带查询串），返回 (handle, ext)，不匹配返回 None。"""
+    path = path.split("?", 1)[0]
+    if not path.startswith(IMAGE_ROUTE):
+        return None
+    name = path[len(IMAGE_ROUTE):]
+    handle, _, ext = name.partition(".")
+    return handle, (ext or "png").lower()
+
+
+_store = ImageStore()
+
+
+def get_image_store():
+    """进程内共享的图片仓库。"""
+    return _store
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+AI 分析接口的 HTTP 客户端（OpenAI 兼容 chat/completions）。
+- http.client 长连接池：同一主机的连接用完放回复用，省掉每次分析的 DNS / TCP / TLS 建连
+- 并发上限：同时在途的请求数不超过 max_connections，超出的排队等待
+- 429 / 5xx 与建连失败时按带抖动的指数退避重试（有 Retry-After 时按它，但不超过上限）；
+  流式输出一旦开始就不再重试
+- 连接超时与读取超时分开配置
+- 接口地址 / 密钥 / 模型等来自配置：内置默认值 <- 配置文件（JSON，TOOLBOX_AI_CONFIG 指定路径）<- 环境变量；
+  接口地址与密钥不内置，未配置时请求抛 LlmNotConfigured
+"""
+import http.client
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.parse
+
+from backend.capture_pipeline import StageStats
+
+# 默认接口配置（地址与密钥须由配置文件或环境变量提供）
+DEFAULT_URL = ""
+DEFAULT_API_KEY = ""
+DEFAULT_MODEL = "Qwen3-Coder-480B-A35B-Instruct-PAI-optimized"
+# 连接超时 / 读取超时（秒；读取超时为两次收到数据之间的最长等待）
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 120
+# 同时在途的请求数上限（也是每个主机保留的空闲连接数上限）
+MAX_CONNECTIONS = 4
+# 重试次数与退避时间（秒）：第 n 次重试等待 uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** n))
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+# 排队等待并发名额时检查取消标志的间隔（秒）
+SLOT_POLL_INTERVAL = 0.05
+# 需要重试的 HTTP 状态码
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# 配置文件路径的环境变量，以及各配置项对应的环境变量
+AI_CONFIG_ENV = "TOOLBOX_AI_CONFIG"
+AI_ENV_KEYS = {
+    "url": "TOOLBOX_AI_URL",
+    "api_key": "TOOLBOX_AI_API_KEY",
+    "model": "TOOLBOX_AI_MODEL",
+    "connect_timeout": "TOOLBOX_AI_CONNECT_TIMEOUT",
+    "read_timeout": "TOOLBOX_AI_READ_TIMEOUT",
+    "max_connections": "TOOLBOX_AI_MAX_CONNECTIONS",
+    "max_retries": "TOOLBOX_AI_MAX_RETRIES",
+}
+
+
+class LlmError(Exception):
+    """接口返回错误状态码（重试用尽或不可重试）。"""
+
+    def __init__(self, status, body=""):
+        super().__init__(f"HTTP 错误 {status}")
+        self.status = status
+        self.body = body
+
+
+class LlmCancelled(Exception):
+    """请求被取消。"""
+
+
+class LlmNotConfigured(Exception):
+    """未配置接口地址或密钥。"""
+
+    def __init__(self, missing):
+        names = "、".join(AI_ENV_KEYS[key] for key in missing)
+        super().__init__(f"未配置 AI 接口：请设置环境变量 {names}，"
+                         f"或用 {AI_CONFIG_ENV} 指定 JSON 配置文件（字段 url、api_key）")
+        self.missing = missing
+
+
+class LlmConfig:
+    """接口配置。"""
+
+    __slots__ = ("url", "api_key", "model", "connect_timeout", "read_timeout", "max_connections", "max_retries",
+                 "backoff_base", "backoff_max")
+
+    def __init__(self, url=DEFAULT_URL, api_key=DEFAULT_API_KEY, model=DEFAULT_MODEL,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, max_connections=MAX_CONNECTIONS,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.connect_timeout = float(connect_timeout)
+        self.read_timeout = float(read_timeout)
+        self.max_connections = max(1, int(max_connections))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+
+    @classmethod
+    def load(cls, path=None, environ=None):
+        """默认值 <- 配置文件（path 或 TOOLBOX_AI_CONFIG）<- 环境变量。配置文件不存在或格式错误时忽略。"""
+        environ = os.environ if environ is None else environ
+        values = {}
+        path = path or environ.get(AI_CONFIG_ENV)
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                values.update({k: v for k, v in data.items() if k in cls.__slots__})
+            except (OSError, ValueError, AttributeError):
+                pass
+        for key, env in AI_ENV_KEYS.items():
+            if environ.get(env):
+                values[key] = environ[env]
+        return cls(**values)
+
+    def missing(self):
+        """必填但未配置的字段名列表（url / api_key）。"""
+        return [key for key in ("url", "api_key") if not getattr(self, key)]
+
+
+class _Pool:
+    """单个主机的空闲连接池 + 并发信号量。"""
+
+    def __init__(self, scheme, host, port, config):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.config = config
+        self.slots = threading.BoundedSemaphore(config.max_connections)
+        self._lock = threading.Lock()
+        self._idle = []
+        self.opened = 0
+
+    def connect(self):
+        """取一个连接：优先复用空闲连接（第二个返回值为 True），否则新建。"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.opened += 1
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.config.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.config.read_timeout)
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn, False
+
+    def release(self, conn, reusable):
+        with self._lock:
+            if reusable and len(self._idle) < self.config.max_connections:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def iter_sse_content(lines):
+    """逐行解析 SSE（bytes 或 str），产出 choices[0].delta.content 片段；遇到 [DONE] 结束。"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        choices = chunk.get("choices") or []
+        if choices:
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+def _abort(conn):
+    """从其他线程打断阻塞在读取上的连接。"""
+    sock = conn.sock
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class LlmClient:
+    """
+    chat/completions 客户端（线程安全）。
+    stream_chat 逐个产出内容片段；complete 返回完整文本。请求体中未给 model 时使用配置中的模型。
+    """
+
+    def __init__(self, config=None):
+        self.config = config or LlmConfig.load()
+        parts = urllib.parse.urlsplit(self.config.url)
+        self._path = parts.path + (f"?{parts.query}" if parts.query else "")
+        default_port = 443 if parts.scheme == "https" else 80
+        self._pool = _Pool(parts.scheme, parts.hostname, parts.port or default_port, self.config)
+        self.latency = StageStats("AI 请求首字节")
+        self.retries = 0
+
+    def _headers(self, stream):
+        return {
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream" if stream else "application/json",
+            "Authorization": f"Bearer {self.config.api_key}",
+        }
+
+    def _backoff(self, attempt, retry_after=None):
+        limit = min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt)
+        if retry_after is not None:
+            try:
+                return min(self.config.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0, limit)
+
+    def _open(self, payload, stream, cancel):
+        """
+        占用一个并发名额并发送请求，返回 (conn, response)；调用方负责 _finish（归还连接与名额）。
+        排队等名额期间每 SLOT_POLL_INTERVAL 秒检查一次 cancel，取消时抛 LlmCancelled；出错时名额在此归还。
+        """
+        missing = self.config.missing()
+        if missing:
+            raise LlmNotConfigured(missing)
+        if cancel is None:
+            self._pool.slots.acquire()
+        else:
+            while not self._pool.slots.acquire(timeout=SLOT_POLL_INTERVAL):
+                if cancel.is_set():
+                    raise LlmCancelled()
+        try:
+            return self._send(payload, stream, cancel)
+        except BaseException:
+            self._pool.slots.release()
+            raise
+
+    def _send(self, payload, stream, cancel):
+        """
+        发送请求直到拿到 200 响应，返回 (conn, response)。
+        复用的空闲连接已被服务端关闭时立即换新连接重发，不计入重试次数。
+        """
+        body = json.dumps({"model": self.config.model, **payload, "stream": stream}).encode("utf-8")
+        headers = self._headers(stream)
+        attempt = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise LlmCancelled()
+            t0 = time.perf_counter()
+            conn, reused = None, False
+            try:
+                conn, reused = self._pool.connect()
+                if cancel is not None:
+                    cancel.abort = lambda c=conn: _abort(c)  # 等待响应头期间也可打断
+                    if cancel.is_set():  # 检查与设置 abort 之间被取消时 abort 没能生效
+                        cancel.abort = None
+                        conn.close()
+                        raise LlmCancelled()
+                conn.request("POST", self._path, body=body, headers=headers)
+                response = conn.getresponse()
+            except (OSError, http.client.HTTPException):
+                if conn is not None:
+                    conn.close()
+                if cancel is not None and cancel.is_set():
+                    raise LlmCancelled()
+                if reused:
+                    continue
+                if attempt >= self.config.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if response.status == 200:
+                    self.latency.add(time.perf_counter() - t0)
+                    return conn, response
+                detail = response.read().decode("utf-8", "replace")
+                if cancel is not None:
+                    cancel.abort = None
+                self._pool.release(conn, not response.will_close)
+                if response.status not in RETRY_STATUSES or attempt >= self.config.max_retries:
+                    raise LlmError(response.status, detail)
+                delay = self._backoff(attempt, response.getheader("Retry-After"))
+            attempt += 1
+            self.retries += 1
+            if cancel is not None and cancel.wait(delay):
+                raise LlmCancelled()
+            if cancel is None:
+                time.sleep(delay)
+
+    def _finish(self, conn, response, complete):
+        """读完剩余响应后把连接放回池中并归还并发名额；未读完（取消 / 出错）的连接直接关闭。"""
+        try:
+            if complete:
+                try:
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    complete = False
+            self._pool.release(conn, complete and not response.will_close and response.isclosed())
+        finally:
+            self._pool.slots.release()
+
+    def stream_chat(self, payload, cancel=None):
+        """
+        流式请求，逐个产出内容片段。
+        :param cancel: 可选 threading.Event；置位后抛 LlmCancelled。请求期间其 abort 属性被设为打断连接的回调
+        并发名额占用到读完或生成器关闭为止：中途不再迭代时须调用 close()（with contextlib.closing(...)）。
+        """
+        conn, response = self._open(payload, True, cancel)
+        complete = False
+        try:
+            for content in iter_sse_content(response):
+                if cancel is not None and cancel.is_set():
+                    raise LlmCancelled()
+                yield content
+            if cancel is not None and cancel.is_set():
+                raise LlmCancelled()  # 被打断的连接读到 EOF 而正常结束
+            complete = True
+        except (OSError, ValueError, http.client.HTTPException):
+            if cancel is not None and cancel.is_set():
+                raise LlmCancelled()
+            raise
+        finally:
+            if cancel is not None:
+                cancel.abort = None
+            self._finish(conn, response, complete)
+
+    def complete(self, payload, cancel=None):
+        """非流式请求，返回完整回答文本。"""
+        conn, response = self._open(payload, False, cancel)
+        try:
+            data = json.loads(response.read().decode("utf-8"))
+        except Exception:
+            self._finish(conn, response, False)
+            if cancel is not None and cancel.is_set():
+                raise LlmCancelled()
+            raise
+        finally:
+            if cancel is not None:
+                cancel.abort = None
+        self._finish(conn, response, True)
+        choices = data.get("choices") or []
+        if not choices:
+            return ""
+        return (choices[0].get("message") or {}).get("content") or ""
+
+    def stats(self):
+        return {"connections_opened": self._pool.opened, "retries": self.retries,
+                "first_byte": self.latency.snapshot()}
+
+    def close(self):
+        self._pool.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """进程内共享的客户端（首次调用时按 LlmConfig.load() 创建）。"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LlmClient()
+        return _client
+
+
+def configure_llm_client(config=None, **overrides):
+    """替换共享客户端：config 为 LlmConfig（None 时重新加载），overrides 覆盖其中的字段。"""
+    global _client
+    config = config or LlmConfig.load()
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    with _client_lock:
+        old, _client = _client, LlmClient(config)
+    if old is not None:
+        old.close()
+    return _client
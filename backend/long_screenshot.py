@@ -6,8 +6,13 @@
 import sys
 import time
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from PIL import Image, ImageGrab
 
+from backend.long_screenshot_preview import PreviewFeed
+from backend.stitch_canvas import StitchCanvas
+
 # 用户手动滚动时，每次截图的间隔（秒）
 CAPTURE_INTERVAL = 0.35
 # 用于查找重叠区域的高度（像素），越大越稳但越慢
@@ -16,67 +21,148 @@ OVERLAP_SEARCH_HEIGHT = 120
 OVERLAP_STEP = 4
 # 两帧视为「几乎相同」的像素差阈值（用于跳过未滚动时的重复帧）
 SAME_FRAME_DIFF_THRESHOLD = 8000
+# 重叠粗筛时每行压缩成的列分箱数（越大下界越紧、复核越少，但粗筛越慢）
+OVERLAP_PROFILE_BINS = 64
+
+
+def _to_array(img):
+    """PIL Image / ndarray -> (H, W, C) uint8 ndarray；灰度图补出通道维。"""
+    arr = img if isinstance(img, np.ndarray) else np.asarray(img)
+    if arr.ndim == 2:
+        arr = arr[:, :, None]
+    return arr
+
+
+def _row_hashes(arr):
+    """逐行内容哈希（每行字节串哈希一次），用于像素级完全重合时的快速预筛。"""
+    flat = np.ascontiguousarray(arr).reshape(arr.shape[0], -1)
+    return np.fromiter((hash(row.tobytes()) for row in flat), dtype=np.int64, count=flat.shape[0])
+
+
+def _row_profiles(arr, bins=OVERLAP_PROFILE_BINS):
+    """
+    把每行压缩成 bins 个列分箱的亮度和，返回 (profiles, 每个分箱的元素数)，用于全部候选偏移的批量粗筛。
+    用 float64：分箱和为整数，求差与求和都不会有舍入，粗筛得分可作为严格下界。
+    """
+    h, w = arr.shape[:2]
+    bins = max(1, min(bins, w))
+    usable_w = w - w % bins
+    binned = arr[:, :usable_w].reshape(h, bins, -1)
+    return binned.sum(axis=2, dtype=np.uint32).astype(np.float64), binned.shape[2]
+
+
+def _strip_diff(a, b, metric="sad"):
+    """两条等大像素带的全分辨率差异：sad=绝对差之和，ssd=平方差之和。"""
+    d = a.astype(np.int32) - b
+    if metric == "ssd":
+        d = d.ravel()
+        return float(np.einsum("i,i->", d, d, dtype=np.int64))
+    return float(np.abs(d).sum(dtype=np.int64))
 
 
 def _images_almost_same(img1, img2, strip_height=40, threshold=SAME_FRAME_DIFF_THRESHOLD):
     """比较两图底部 strip_height 像素，差异小于 threshold 视为相同（用户未滚动）。"""
-    if img1.size != img2.size or img1.height < strip_height or img2.height < strip_height:
-        return False
-    s1 = img1.crop((0, img1.height - strip_height, img1.width, img1.height))
-    s2 = img2.crop((0, img2.height - strip_height, img2.width, img2.height))
-    a, b = list(s1.getdata()), list(s2.getdata())
-    if len(a) != len(b):
+    a, b = _to_array(img1), _to_array(img2)
+    if a.shape != b.shape or a.shape[0] < strip_height:
         return False
-    diff = sum(abs(x - y) for x, y in zip(a, b))
-    return diff < threshold
+    s1, s2 = a[-strip_height:], b[-strip_height:]
+    if np.array_equal(s1, s2):
+        return True
+    return _strip_diff(s1, s2) < threshold
 
 
-def _find_overlap(img_top, img_bottom, step=OVERLAP_STEP, search_h=OVERLAP_SEARCH_HEIGHT):
+def _find_overlap(img_top, img_bottom, step=OVERLAP_STEP, search_h=OVERLAP_SEARCH_HEIGHT, metric="sad"):
     """
     在 img_bottom 中找与 img_top 底部重叠的 y 偏移。
-    img_top: 上一张图（或其上部分）
-    img_bottom: 下一张图
+    img_top: 上一张图（或其上部分），PIL Image 或 (H, W, C) ndarray
+    img_bottom: 下一张图，PIL Image 或 (H, W, C) ndarray
+    metric: "sad"（绝对差之和，默认）或 "ssd"（平方差之和）
     返回: (overlap_height, diff_score)，即从 img_bottom 的哪一行起与 img_top 底部重合，以及该处差异得分（越小越像）。
+
+    结果与逐个偏移全分辨率比较（取得分最小、同分取最小 y）完全一致，实现分三步：
+    1. 行哈希预筛：整条模板逐行哈希完全对上的偏移直接复核返回（屏幕内容滚动通常逐像素一致）；
+    2. 行剖面粗筛：每行压缩为列分箱亮度，借助滑动窗口视图对所有偏移批量求差异。
+       分箱和之差的绝对值不超过箱内逐像素绝对差之和（ssd 时平方后除以箱内元素数不超过箱内平方差之和），
+       因此粗筛得分是全分辨率得分的下界；
+    3. 全分辨率复核：按下界从小到大复核，下界已超过当前最好得分时其余偏移不可能更好，提前结束。
+       重复行、低纹理页面下界区分度差，复核的偏移会变多，但结果不变。
     """
-    w1, h1 = img_top.size
-    w2, h2 = img_bottom.size
-    if w1 != w2 or h1 < search_h or h2 < search_h:
+    top, bottom = _to_array(img_top), _to_array(img_bottom)
+    h1, w1 = top.shape[:2]
+    h2, w2 = bottom.shape[:2]
+    if w1 != w2 or top.shape[2] != bottom.shape[2] or h1 < search_h or h2 < search_h:
         return 0, float("inf")
-    # 取 img_top 底部 search_h 高的一条
-    strip = img_top.crop((0, h1 - search_h, w1, h1))
-    strip_arr = list(strip.getdata())
+    candidates = np.arange(0, min(h2 - search_h + 1, h1), step)
+    if candidates.size == 0:
+        return 0, float("inf")
+    # 取 img_top 底部 search_h 高的一条；img_bottom 只需覆盖到最后一个候选窗口
+    strip = top[h1 - search_h:]
+    region = bottom[:candidates[-1] + search_h]
+
+    # 1) 行哈希预筛
+    strip_hash = _row_hashes(strip)
+    windows = sliding_window_view(_row_hashes(region), search_h)[candidates]
+    exact = np.flatnonzero((windows == strip_hash).all(axis=1))
+    for idx in exact:
+        y0 = int(candidates[idx])
+        score = _strip_diff(strip, bottom[y0:y0 + search_h], metric)
+        if score == 0:
+            return y0, score
+
+    # 2) 行剖面粗筛（window 维在最后：(n, bins, search_h)）
+    strip_prof, per_bin = _row_profiles(strip)
+    region_prof, _ = _row_profiles(region)
+    windows = sliding_window_view(region_prof, search_h, axis=0)[candidates]
+    diff = windows - strip_prof.T
+    if metric == "ssd":
+        # 下界为 bound / per_bin；比较时改乘到另一侧，全程整数运算不丢精度
+        bound = np.einsum("nij,nij->n", diff, diff)
+        scale = per_bin
+    else:
+        bound = np.abs(diff).sum(axis=(1, 2))
+        scale = 1
+
+    # 3) 按下界升序（同下界时 y 小的在前）做全分辨率复核；得分相同时保留较小的 y（与逐行扫描一致）
     best_y = 0
     best_score = float("inf")
-    for y0 in range(0, min(h2 - search_h + 1, h1), step):
-        region = img_bottom.crop((0, y0, w2, y0 + search_h))
-        region_arr = list(region.getdata())
-        if len(strip_arr) != len(region_arr):
-            continue
-        score = sum(
-            abs(a - b) for a, b in zip(strip_arr, region_arr)
-        )
-        if score < best_score:
+    for idx in np.lexsort((candidates, bound)):
+        if best_score != float("inf") and int(bound[idx]) > int(best_score) * scale:
+            break
+        y0 = int(candidates[idx])
+        score = _strip_diff(strip, bottom[y0:y0 + search_h], metric)
+        if score < best_score or (score == best_score and y0 < best_y):
             best_score = score
             best_y = y0
     return best_y, best_score
 
 
-def capture_long_screenshot_manual(rect, stop_event, on_log=None, current_result_holder=None):
+def capture_long_screenshot_manual(rect, stop_event, on_log=None, current_result_holder=None, preview_feed=None):
     """
     PixPin 式长截图：在用户手动滚动内容时，持续截取指定区域并实时拼接。
     直到 stop_event 被 set 后结束并返回拼接结果。
     :param rect: (left, top, right, bottom) 屏幕坐标
     :param stop_event: threading.Event，set 后停止捕获
     :param on_log: 可选 (msg: str) -> None 日志回调
-    :param current_result_holder: 可选 [None]，每次拼接后将当前长图写入 current_result_holder[0] 供预览
+    :param current_result_holder: 可选 [None]，每次拼接后将当前长图的缩略图（PIL，宽 PREVIEW_THUMB_WIDTH）
+        写入 current_result_holder[0] 供预览；不复制整张长图
+    :param preview_feed: 可选 PreviewFeed，传入后只发布新增行的缩略条带，不再写 current_result_holder
     :return: PIL.Image 或 None
     """
     log = on_log or (lambda msg: None)
     left, top, right, bottom = rect
     if right <= left or bottom <= top:
         return None
-    result = None
+    canvas = None  # 拼接画布（StitchCanvas，RGB）
     last_capture = None
+    holder_feed = None
+    if preview_feed is None and current_result_holder is not None:
+        # 旧接口也走增量缩略图：每帧只缩放新增的行，holder 里放缩略图
+        preview_feed = holder_feed = PreviewFeed()
+
+    def publish(rows):
+        preview_feed.append(rows)
+        if holder_feed is not None:
+            current_result_holder[0] = Image.fromarray(holder_feed.snapshot()["thumb"])
     while not stop_event.is_set():
         try:
             img = ImageGrab.grab(bbox=(left, top, right, bottom))
@@ -85,30 +171,27 @@ def capture_long_screenshot_manual(rect, stop_event, on_log=None, current_result
         if img is None:
             time.sleep(CAPTURE_INTERVAL)
             continue
-        if result is None:
-            result = img.copy()
-            last_capture = img
-            if current_result_holder is not None:
-                current_result_holder[0] = result
+        frame = np.asarray(img.convert("RGB"))
+        if canvas is None:
+            canvas = StitchCanvas.from_frame(frame)
+            last_capture = frame
+            if preview_feed is not None:
+                publish(frame)
             log("已记录首帧，请手动滚动内容…")
         else:
-            if _images_almost_same(last_capture, img):
+            if _images_almost_same(last_capture, frame):
                 time.sleep(CAPTURE_INTERVAL)
                 continue
-            overlap_y, _ = _find_overlap(result, img)
-            add_h = img.height - overlap_y
+            # 候选偏移不超过一帧高度，取画布末尾一帧高的零拷贝视图即可
+            overlap_y, _ = _find_overlap(canvas.tail(frame.shape[0]), frame)
+            add_h = frame.shape[0] - overlap_y
             if add_h > 5:
-                new_h = result.height + add_h
-                new_img = Image.new("RGB", (result.width, new_h), (255, 255, 255))
-                new_img.paste(result, (0, 0))
-                new_img.paste(
-                    img.crop((0, overlap_y, img.width, img.height)),
-                    (0, result.height),
-                )
-                result = new_img
-                if current_result_holder is not None:
-                    current_result_holder[0] = result
+                start = canvas.append(frame[overlap_y:])
+                if preview_feed is not None:
+                    publish(canvas.rows(start))
                 log("已拼接一帧")
-            last_capture = img
+            last_capture = frame
         time.sleep(CAPTURE_INTERVAL)
-    return result
+    if canvas is None:
+        return None
+    return Image.fromarray(canvas.finish())
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+长截图边拼边识别：匹配线程每拼上一段新行就交给这里，攒够一个条带后在后台线程 OCR，
+用户点「完成」时大部分文字已经识别好，只需补最后一段。
+条带划分与 OcrHandler 分块识别一致（相邻条带重叠 TILE_OVERLAP 行，按重叠区中线归属），
+结果用 ocr_result.merge_bands 合并，与对整张长图分块识别等价。
+"""
+import queue
+import threading
+
+import numpy as np
+from PIL import Image
+
+from backend.ocr_engine import TILE_HEIGHT, TILE_OVERLAP, get_ocr_handler
+from backend.ocr_result import OcrResult, merge_bands
+
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+
+class IncrementalOcrIndex:
+    """
+    增量文字索引（线程安全）。
+    - feed(start_y, rows): 匹配线程调用，传入 FrameStitcher.push 返回的新增行（只拷贝这些行）
+    - snapshot(): 已识别部分的 OcrResult；search(keyword): 在已识别的行中查找
+    - finish(): 识别最后一段并等待后台完成，返回整张长图的 OcrResult
+    - close(): 取消（丢弃未识别的条带）
+    """
+
+    def __init__(self, handler=None, tile_height=TILE_HEIGHT, overlap=TILE_OVERLAP, bgr=True):
+        self._handler = handler or get_ocr_handler()
+        self.tile_height = int(tile_height)
+        self.overlap = int(overlap)
+        self._bgr = bgr
+        self._lock = threading.Lock()
+        self._pending = []       # 尚未提交的新增行条带（拷贝）
+        self._pending_rows = 0
+        self._context = None     # 上一条带末尾 overlap 行，作为下一条带的上文
+        self._band_start = 0     # 下一条带在长图中的起始 y（含上文）
+        self._height = 0         # 已收到的总行数
+        self._width = 0
+        self._bands = []         # [(OcrResult, y_offset, keep_top, keep_bottom)]
+        self._queue = queue.Queue()
+        self._closed = False     # finish / close 之后不再接收新行
+        self._cancelled = False  # close 取消：丢弃后台尚未完成的条带
+        self._worker = threading.Thread(target=self._run, name="long-shot-ocr", daemon=True)
+        self._worker.start()
+
+    def feed(self, start_y, rows):
+        """追加新拼接的行（BGR / RGB 由 bgr 决定）；攒够一个条带就提交后台识别。"""
+        if rows is None or rows.shape[0] == 0:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            self._width = rows.shape[1]
+            self._height = start_y + rows.shape[0]
+            self._pending.append(np.array(rows))
+            self._pending_rows += rows.shape[0]
+            context_rows = self._context.shape[0] if self._context is not None else 0
+            while context_rows + self._pending_rows >= self.tile_height:
+                self._submit_locked(final=False)
+                context_rows = self._context.shape[0]
+
+    def _submit_locked(self, final):
+        """把上文 + 待识别行切成一个条带提交；非最后条带只取 tile_height 行，其余留到下一条带。"""
+        parts = ([self._context] if self._context is not None else []) + self._pending
+        band = np.concatenate(parts, axis=0) if len(parts) > 1 else parts[0]
+        if not final and band.shape[0] > self.tile_height:
+            rest = band[self.tile_height:]
+            band = band[:self.tile_height]
+            self._pending, self._pending_rows = [rest], rest.shape[0]
+        else:
+            self._pending, self._pending_rows = [], 0
+        y0 = self._band_start
+        y1 = y0 + band.shape[0]
+        half = self.overlap / 2
+        keep_top = 0 if y0 == 0 else y0 + half
+        keep_bottom = float("inf") if final else y1 - half
+        self._queue.put((band, y0, keep_top, keep_bottom))
+        self._context = band[-self.overlap:] if self.overlap else None
+        self._band_start = y1 - (self._context.shape[0] if self._context is not None else 0)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                band, y0, keep_top, keep_bottom = item
+                if self._bgr and OPENCV_AVAILABLE:
+                    band = cv2.cvtColor(band, cv2.COLOR_BGR2RGB)
+                elif self._bgr:
+                    band = np.ascontiguousarray(band[:, :, ::-1])
+                result = self._handler.recognize_image_result(Image.fromarray(band), tiled=False)
+                with self._lock:
+                    if not self._cancelled:
+                        self._bands.append((result, y0, keep_top, keep_bottom))
+            finally:
+                self._queue.task_done()
+
+    def snapshot(self):
+        """已识别部分的合并结果（坐标为长图坐标）。"""
+        with self._lock:
+            bands = list(self._bands)
+            width, height = self._width, self._height
+        return merge_bands(bands, width, height)
+
+    def search(self, keyword):
+        """在已识别的行中查找包含 keyword 的行，返回 [OcrLine]（按阅读顺序）。"""
+        return [ln for ln in self.snapshot().lines if keyword in ln.text]
+
+    def finish(self, timeout=None):
+        """提交剩余行并等待全部条带识别完成，返回整张长图的 OcrResult。"""
+        with self._lock:
+            if self._closed:
+                return OcrResult(width=self._width, height=self._height)
+            if self._pending_rows or self._context is not None:
+                self._submit_locked(final=True)
+            self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout)
+        return self.snapshot()
+
+    def close(self):
+        """取消：不再接收新行，丢弃尚未识别的条带。"""
+        with self._lock:
+            self._closed = True
+            self._cancelled = True
+            self._pending, self._pending_rows = [], 0
+        while True:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        self._queue.put(None)
@@ -3,11 +3,18 @@
 长截图 - PixPin 风格增量拼接算法
 核心思路：相邻帧底部/顶部模板匹配 → 计算偏移量 → 增量拼接
 """
+import argparse
+import os
 import sys
+import threading
 import time
 import numpy as np
 from PIL import Image
 
+from backend.capture_pipeline import QUEUE_CAPACITY, CapturePipeline
+from backend.frame_change import DEFAULT_CHANGE_DETECTOR, get_change_detector
+from backend.stitch_canvas import StitchCanvas
+
 try:
     import cv2
     OPENCV_AVAILABLE = True
@@ -21,83 +28,167 @@ except ImportError:
     MSS_AVAILABLE = False
     from PIL import ImageGrab
 
-# 用户手动滚动时，每次截图的间隔（秒）
+# 用户手动滚动时的初始截图间隔（秒），之后按滚动速度自适应调整
 CAPTURE_INTERVAL = 0.25
-# 两帧视为「几乎相同」的相似度阈值
-SAME_FRAME_THRESHOLD = 0.98
 # 模板匹配的重叠区域比例（30% = 底部30%与顶部30%匹配）
 OVERLAP_RATIO = 0.3
 # 模板匹配的置信度阈值（越高越严格，0.7 = 70%）
 MATCH_CONFIDENCE_THRESHOLD = 0.7
+# 匹配基准窗口：画布末尾「新帧高度 × 该比例」行（1.0 = 恰好是最近拼接的一帧）
+TAIL_WINDOW_RATIO = 1.0
+# 粗到细金字塔层数（每层缩小一半，0 = 不使用金字塔）
+PYRAMID_LEVELS = 2
+# 金字塔顶层模板的最小高度（像素），不足时自动减少层数
+PYRAMID_MIN_TEMPLATE_H = 12
 # 最大存储帧数（避免内存溢出）
 MAX_FRAMES = 150
+# 截屏缓冲区个数（队列容量 + 匹配中的一帧 + 正在写入的一帧 + 余量）；全部被占用时本次截屏跳过
+GRAB_BUFFER_POOL = QUEUE_CAPACITY + 3
+# 离线拼接时从目录读取的图片扩展名
+FRAME_FILE_EXTS = (".png", ".jpg", ".jpeg", ".bmp")
 
 
-def _capture_region_mss(rect):
-    """使用 MSS 高速截取指定区域（返回 BGR numpy array）"""
-    if MSS_AVAILABLE:
-        with mss() as sct:
-            monitor = {
-                "top": rect[1],
-                "left": rect[0],
-                "width": rect[2],
-                "height": rect[3]
-            }
-            sct_img = sct.grab(monitor)
-            # 转换为 numpy array (BGRA)
-            img = np.array(sct_img)
-            # BGRA -> BGR
-            if img.shape[2] == 4:
-                img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            return img
-    else:
-        # 降级使用 PIL
+class RegionGrabber:
+    """
+    截屏会话：整个长截图期间复用同一个 mss 句柄和一组预分配的输出缓冲区。
+    
+    - mss 句柄在第一次 grab() 时于调用线程内创建（mss 句柄不能跨线程使用）
+    - 输出缓冲区最多 pool_size 个，BGRA -> BGR 直接写入复用的目标缓冲区；
+      grab() 只从空闲列表取缓冲区，使用方用完后须 release(frame) 归还（可在其他线程调用），
+      没有空闲缓冲区时 grab() 返回 None（本次截屏跳过），不会覆盖仍在使用的帧
+    - channels=4 时直接输出 BGRA（拷贝进复用缓冲区，不做颜色转换）
+    - 统计截屏次数、FPS、本会话分配的缓冲区个数与因缓冲区耗尽跳过的次数
+    """
+
+    def __init__(self, rect, pool_size=GRAB_BUFFER_POOL, channels=3):
         x, y, w, h = rect
-        pil_img = ImageGrab.grab(bbox=(x, y, x + w, y + h))
-        # PIL RGB -> OpenCV BGR
-        img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-        return img
+        self._monitor = {"top": y, "left": x, "width": w, "height": h}
+        self._shape = (h, w, channels)
+        self._channels = channels
+        self.pool_size = max(1, int(pool_size))
+        self._free = []      # 空闲缓冲区
+        self._in_use = 0     # 已交出、尚未归还的缓冲区数
+        self._lock = threading.Lock()
+        self._sct = None
+        self.grab_count = 0
+        self.alloc_count = 0
+        self.skipped = 0
+        self.grab_time = 0.0
 
+    def _buffer(self):
+        """取一块空闲缓冲区（不足 pool_size 块时才分配新的）；全部被占用时返回 None。"""
+        with self._lock:
+            if self._free:
+                buf = self._free.pop()
+            elif self._in_use < self.pool_size:
+                buf = np.empty(self._shape, dtype=np.uint8)
+                self.alloc_count += 1
+            else:
+                return None
+            self._in_use += 1
+            return buf
 
-def _images_almost_same(img1, img2, threshold=SAME_FRAME_THRESHOLD):
-    """
-    判断两张图片是否几乎相同（使用快速像素比较）。
-    
-    Args:
-        img1, img2: numpy arrays (H, W, 3), BGR format
-        threshold: 相似度阈值（0-1），越接近 1 表示越相似
-    
-    Returns:
-        bool: 如果相似度 >= threshold，返回 True
-    """
-    if img1 is None or img2 is None:
-        return False
-    if img1.shape != img2.shape:
+    def release(self, frame):
+        """归还 grab() 返回的帧，其缓冲区之后会被复用；归还后调用方不得再读该帧。"""
+        with self._lock:
+            self._in_use -= 1
+            if frame.shape == self._shape:
+                self._free.append(frame)
+
+    def grab(self):
+        """
+        截取一帧，返回 (H, W, channels) uint8（BGR 或 BGRA），写在复用缓冲区中，用完须 release()。
+        所有缓冲区都在使用中时返回 None。
+        """
+        t0 = time.perf_counter()
+        dst = self._buffer()
+        if dst is None:
+            self.skipped += 1
+            return None
+        if MSS_AVAILABLE:
+            if self._sct is None:
+                self._sct = mss()
+            sct_img = self._sct.grab(self._monitor)
+            # 直接以 mss 的原始字节构造 BGRA 视图，不经过 np.array 拷贝
+            bgra = np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+            if bgra.shape[:2] != dst.shape[:2]:
+                # 高 DPI 等情况下实际尺寸与请求不符：按实际尺寸重建缓冲池（旧尺寸的缓冲区归还时丢弃）
+                with self._lock:
+                    self._shape = bgra.shape[:2] + (self._channels,)
+                    self._free.clear()
+                self.release(dst)
+                dst = self._buffer()
+                if dst is None:
+                    self.skipped += 1
+                    return None
+            if self._channels == 4:
+                np.copyto(dst, bgra)
+            else:
+                cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=dst)
+        else:
+            # 降级使用 PIL
+            m = self._monitor
+            pil_img = ImageGrab.grab(bbox=(m["left"], m["top"], m["left"] + m["width"], m["top"] + m["height"]))
+            code = cv2.COLOR_RGB2BGRA if self._channels == 4 else cv2.COLOR_RGB2BGR
+            cv2.cvtColor(np.asarray(pil_img.convert("RGB")), code, dst=dst)
+        self.grab_count += 1
+        self.grab_time += time.perf_counter() - t0
+        return dst
+
+    @property
+    def fps(self):
+        """纯截屏吞吐（帧/秒，不含等待间隔）。"""
+        return self.grab_count / self.grab_time if self.grab_time else 0.0
+
+    def stats_line(self):
+        return (f"截屏会话: {self.grab_count} 帧，{self.fps:.0f} FPS，缓冲区分配 {self.alloc_count} 次，"
+                f"缓冲区耗尽跳过 {self.skipped} 次")
+
+    def close(self):
+        if self._sct is not None:
+            try:
+                self._sct.close()
+            except Exception:
+                pass
+            self._sct = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
         return False
-    
-    # 快速像素差异检测
-    diff = np.sum(np.abs(img1.astype(np.int32) - img2.astype(np.int32)))
-    max_diff = img1.shape[0] * img1.shape[1] * img1.shape[2] * 255
-    similarity = 1.0 - (diff / max_diff)
-    
-    return similarity >= threshold
 
 
-def _find_overlap_offset(base_img, new_img, overlap_ratio=OVERLAP_RATIO, threshold=MATCH_CONFIDENCE_THRESHOLD):
+def _match_template_y(search_region, template):
+    """在 search_region 中做归一化相关模板匹配，返回 (最佳匹配行 y, 置信度)。"""
+    result = cv2.matchTemplate(search_region, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_loc[1], max_val
+
+
+def _find_overlap_offset(base_img, new_img, overlap_ratio=OVERLAP_RATIO, threshold=MATCH_CONFIDENCE_THRESHOLD,
+                         pyramid_levels=PYRAMID_LEVELS):
     """
     使用模板匹配找到两帧之间的垂直偏移量（增量拼接核心算法）。
     
     PixPin 的核心原理：
-    1. 取基准图（已拼接长图）的底部 30% 作为模板
-    2. 在新帧的顶部 60% 区域搜索该模板
+    1. 取基准图末尾（上一帧 / 画布尾部窗口）的底部 overlap_ratio × 新帧高度 作为模板
+    2. 在新帧顶部 2 × 模板高度的范围内（灰度）搜索该模板：先在金字塔顶层（缩小 2^levels 倍）粗搜，
+       再回到原分辨率，只在粗搜位置附近的窄带内精搜；
+       即只接受滚动了 (1 - 2 × overlap_ratio) ~ (1 - overlap_ratio) 帧高的新帧
     3. 找到最佳匹配位置，计算偏移量
     4. 根据偏移量裁剪掉重复部分，只拼接新内容
     
+    模板高度只与新帧高度有关，base_img 再高也只用到末尾 overlap_h 行，
+    因此单帧匹配耗时不随长图总高度增长。
+    
     Args:
-        base_img: 基准图（已拼接的长图），numpy array (H, W, 3) BGR
+        base_img: 基准图（上一帧或画布尾部窗口），numpy array (H, W, 3) BGR
         new_img: 新帧图，numpy array (H, W, 3) BGR
-        overlap_ratio: 重叠区域比例（默认 0.3 = 30%）
+        overlap_ratio: 模板高度占新帧高度的比例（默认 0.3 = 30%）
         threshold: 匹配阈值（0-1，越高越严格）
+        pyramid_levels: 粗搜金字塔层数（0 = 直接在原分辨率搜索区域内匹配）
     
     Returns:
         (offset, confidence): 
@@ -115,32 +206,43 @@ def _find_overlap_offset(base_img, new_img, overlap_ratio=OVERLAP_RATIO, thresho
     if w_base != w_new:
         return 0, 0.0
     
-    # 计算重叠区域高度（至少 20px）
-    overlap_h = max(int(h_base * overlap_ratio), 20)
-    overlap_h = min(overlap_h, h_base // 2, h_new // 2)
+    # 计算重叠区域高度（至少 20px），按新帧高度取比例
+    overlap_h = max(int(h_new * overlap_ratio), 20)
+    overlap_h = min(overlap_h, h_base, h_new // 2)
     
     if overlap_h < 20:
         return 0, 0.0
     
     # 基准图底部区域（模板）
     template = base_img[-overlap_h:, :]
-    
-    # 新图可搜索区域（允许新图顶部到中部范围，搜索范围为 overlap_h * 2）
+    # 新图可搜索区域（新图顶部到中部，搜索范围为 overlap_h * 2）
     search_h = min(overlap_h * 2, h_new)
-    search_region = new_img[:search_h, :]
-    
-    if search_region.shape[0] < template.shape[0]:
-        return 0, 0.0
     
-    # 模板匹配（使用归一化相关系数）
     try:
-        result = cv2.matchTemplate(search_region, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        # 统一在灰度图上匹配（耗时约为三通道的 1/3）
+        gray_tpl = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        gray_new = cv2.cvtColor(new_img[:search_h], cv2.COLOR_BGR2GRAY)
+        # 粗搜：金字塔顶层在整个搜索区域内匹配；模板缩得太矮时减少层数
+        levels = int(pyramid_levels)
+        while levels > 0 and (overlap_h >> levels) < PYRAMID_MIN_TEMPLATE_H:
+            levels -= 1
+        if levels > 0:
+            small_tpl, small_new = gray_tpl, gray_new
+            for _ in range(levels):
+                small_tpl = cv2.pyrDown(small_tpl)
+                small_new = cv2.pyrDown(small_new)
+            coarse_y, _ = _match_template_y(small_new, small_tpl)
+            # 精搜：原分辨率下粗搜位置上下各 2^(levels+1) 行的窄带
+            radius = 1 << (levels + 1)
+            y0 = max(0, (coarse_y << levels) - radius)
+            y1 = min(search_h, (coarse_y << levels) + radius + overlap_h)
+            match_y, max_val = _match_template_y(gray_new[y0:y1], gray_tpl)
+            match_y += y0
+        else:
+            match_y, max_val = _match_template_y(gray_new, gray_tpl)
         
         # 检查匹配质量
         if max_val >= threshold:
-            # 计算新内容的起始行
-            match_y = max_loc[1]  # 匹配位置的 Y 坐标
             # 新内容从 match_y + overlap_h 开始
             new_content_start = match_y + overlap_h
             return new_content_start, max_val
@@ -150,47 +252,164 @@ def _find_overlap_offset(base_img, new_img, overlap_ratio=OVERLAP_RATIO, thresho
         return 0, 0.0
 
 
-def _stitch_incremental(base_img, new_img, overlap_ratio=OVERLAP_RATIO, threshold=MATCH_CONFIDENCE_THRESHOLD):
+def _stitch_incremental(canvas, new_img, overlap_ratio=OVERLAP_RATIO, threshold=MATCH_CONFIDENCE_THRESHOLD):
     """
-    增量拼接：将新帧拼接到基准图底部（仅拼接新内容）。
+    增量拼接：将新帧的新内容追加到拼接画布底部（只拷贝新增行）。
     
     Args:
-        base_img: 基准图（已拼接的长图），numpy array (H, W, 3) BGR
+        canvas: 拼接画布 StitchCanvas（首帧时为 None；传入 ndarray 时自动包装）
         new_img: 新帧图，numpy array (H, W, 3) BGR
         overlap_ratio: 重叠区域比例
         threshold: 匹配阈值
     
     Returns:
-        (stitched_img, success): 
-            - stitched_img: 拼接后的图像，numpy array (H, W, 3) BGR
+        (canvas, success): 
+            - canvas: 拼接画布 StitchCanvas
             - success: 是否成功拼接（True/False）
     """
     # 第一次拼接
-    if base_img is None:
-        return new_img, True
+    if canvas is None:
+        return StitchCanvas.from_frame(new_img), True
+    if isinstance(canvas, np.ndarray):
+        canvas = StitchCanvas.from_frame(canvas)
     
-    # 查找重叠偏移量
-    new_content_start, confidence = _find_overlap_offset(base_img, new_img, overlap_ratio, threshold)
+    # 查找重叠偏移量：只以画布尾部固定高度窗口（即最近拼接的一帧）为基准，零拷贝视图
+    tail = canvas.tail(int(new_img.shape[0] * TAIL_WINDOW_RATIO))
+    new_content_start, confidence = _find_overlap_offset(tail, new_img, overlap_ratio, threshold)
     
     # 匹配失败
     if new_content_start == 0:
-        # 返回原图，不拼接
-        return base_img, False
+        return canvas, False
     
-    # 提取新内容
-    new_content = new_img[new_content_start:, :]
+    # 如果没有新内容（完全重叠），不拼接
+    if new_content_start >= new_img.shape[0]:
+        return canvas, False
     
-    # 如果没有新内容（完全重叠），返回原图
-    if new_content.shape[0] == 0:
-        return base_img, False
+    # 追加新内容
+    canvas.append(new_img[new_content_start:, :])
     
-    # 垂直拼接
-    stitched = np.vstack([base_img, new_content])
+    return canvas, True
+
+
+class FrameStitcher:
+    """
+    逐帧增量拼接：重复帧去重 + 重叠匹配 + 追加到画布。
+    实时长截图（capture_long_screenshot_opencv）与离线拼接（stitch_frames）共用同一套逻辑。
+    """
+
+    def __init__(self, overlap_ratio=OVERLAP_RATIO, threshold=MATCH_CONFIDENCE_THRESHOLD, change_detector=None):
+        self.overlap_ratio = overlap_ratio
+        self.threshold = threshold
+        # 帧变化检测器（名称或 ChangeDetector 实例），见 backend/frame_change.py
+        if change_detector is None or isinstance(change_detector, str):
+            change_detector = get_change_detector(change_detector or DEFAULT_CHANGE_DETECTOR)
+        self.change_detector = change_detector
+        self.canvas = None        # 拼接画布（StitchCanvas，BGR）
+        self.last_signature = None  # 上一帧的变化检测签名（用于去重，不保留整帧）
+        self.frame_count = 0      # 参与拼接的帧数（不含重复帧）
+        self.stitch_count = 0     # 成功拼接次数
+        self.last_success = None  # 最近一帧的匹配状态：True=成功, False=失败, None=初始/重复帧
+
+    def push(self, frame):
+        """
+        送入一帧 BGR 图像。
+        
+        Returns:
+            (start_y, rows): 本帧新追加的行在长图中的起始 y 及这些行（画布零拷贝视图）；
+            重复帧或匹配失败时返回 None。
+        """
+        signature = self.change_detector.signature(frame)
+        if self.last_signature is not None and self.change_detector.same(self.last_signature, signature):
+            self.last_success = None
+            return None
+        self.last_signature = signature
+        self.frame_count += 1
+        before = self.canvas.height if self.canvas is not None else 0
+        self.canvas, success = _stitch_incremental(self.canvas, frame, self.overlap_ratio, self.threshold)
+        self.last_success = success
+        if not success:
+            return None
+        self.stitch_count += 1
+        return before, self.canvas.rows(before)
+
+
+def _to_bgr(frame):
+    """统一帧格式为 (H, W, 3) BGR uint8：支持 PIL Image（RGB）、灰度与 BGRA 数组。"""
+    if isinstance(frame, Image.Image):
+        return cv2.cvtColor(np.asarray(frame.convert("RGB")), cv2.COLOR_RGB2BGR)
+    if frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
+
+def iter_frames(source, every=1):
+    """
+    把各种帧来源统一成 BGR 帧迭代器。
+    
+    Args:
+        source: 以下之一
+            - 图片目录：按文件名排序读取其中的 png/jpg/bmp
+            - 视频文件路径：用 cv2.VideoCapture 逐帧解码
+            - (N, H, W, C) ndarray，或 ndarray / PIL Image 的任意可迭代对象
+        every: 每隔几帧取一帧（视频帧率远高于滚动速度时可用来抽帧）
+    """
+    every = max(1, int(every))
+    if isinstance(source, str) and os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(FRAME_FILE_EXTS))
+        for i, name in enumerate(names):
+            if i % every:
+                continue
+            frame = cv2.imread(os.path.join(source, name), cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield frame
+        return
+    if isinstance(source, str):
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise ValueError(f"无法打开视频: {source}")
+        try:
+            i = 0
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if i % every == 0:
+                    yield frame
+                i += 1
+        finally:
+            cap.release()
+        return
+    for i, frame in enumerate(source):
+        if i % every == 0:
+            yield _to_bgr(frame)
+
+
+def stitch_frames(frames, overlap_ratio=OVERLAP_RATIO, threshold=MATCH_CONFIDENCE_THRESHOLD, stitcher=None):
+    """
+    离线增量拼接：对任意帧序列逐帧匹配，边拼边产出新增的行条带（不截屏、不 sleep）。
+    
+    Args:
+        frames: 帧来源，见 iter_frames（目录 / 视频路径 / ndarray 序列）
+        overlap_ratio: 重叠区域比例
+        threshold: 匹配阈值
+        stitcher: 可选 FrameStitcher；传入后可在迭代结束时读取 canvas 与统计
     
-    return stitched, True
+    Yields:
+        (start_y, strip): 新增条带在长图中的起始 y 与条带本身（BGR，画布零拷贝视图）
+    """
+    if not OPENCV_AVAILABLE:
+        raise RuntimeError("未安装 OpenCV，请安装: pip install opencv-contrib-python")
+    stitcher = stitcher or FrameStitcher(overlap_ratio, threshold)
+    for frame in iter_frames(frames):
+        appended = stitcher.push(frame)
+        if appended is not None:
+            yield appended
 
 
-def capture_long_screenshot_opencv(rect, stop_event, on_log=None, current_result_holder=None):
+def capture_long_screenshot_opencv(rect, stop_event, on_log=None, current_result_holder=None, preview_feed=None,
+                                   ocr_index=None):
     """
     使用增量拼接算法进行长截图（PixPin 风格）
     
@@ -198,7 +417,11 @@ def capture_long_screenshot_opencv(rect, stop_event, on_log=None, current_result
         rect: (x, y, width, height) 截图区域
         stop_event: threading.Event，用于停止截图
         on_log: 日志回调函数
-        current_result_holder: 实时预览容器 [PIL.Image]，同时用于传递匹配状态
+        current_result_holder: 实时预览容器 [PIL.Image]，同时用于传递匹配状态（整图预览，旧接口）
+        preview_feed: 增量预览通道 PreviewFeed（bgr=True）；传入后只发布新增行与版本号，
+            不再向 current_result_holder 写整张长图
+        ocr_index: 可选 IncrementalOcrIndex（bgr=True）；传入后每段新拼接的行在后台 OCR，
+            结束后由调用方 ocr_index.finish() 取整图识别结果
     
     Returns:
         PIL.Image: 拼接后的长图
@@ -211,83 +434,145 @@ def capture_long_screenshot_opencv(rect, stop_event, on_log=None, current_result
     if on_log:
         on_log("已记录首帧，请手动滚动内容…")
     
-    stitched_base = None  # 当前已拼接的长图（BGR）
-    last_capture = None   # 上一帧（用于去重）
-    frame_count = 0       # 总帧数
-    stitch_count = 0      # 成功拼接次数
+    stitcher = FrameStitcher()
+    state_lock = threading.Lock()
+    published = {"height": 0, "success": None, "frames": 0, "preview_height": 0}
     
     # 用于传递匹配状态的标志（存储在 current_result_holder 的第二个元素）
     # current_result_holder: [PIL.Image, match_status]
     # match_status: True=成功, False=失败, None=初始
     
-    try:
-        while not stop_event.is_set():
-            # 截取当前帧
-            current_frame = _capture_region_mss(rect)
-            
-            # 跳过相同帧（用户未滚动）
-            if last_capture is not None and _images_almost_same(last_capture, current_frame):
-                time.sleep(CAPTURE_INTERVAL)
-                continue
-            
-            frame_count += 1
-            
-            # 增量拼接
-            stitched_base, success = _stitch_incremental(stitched_base, current_frame)
-            
-            if success:
-                stitch_count += 1
-            
-            # 更新预览
-            if current_result_holder is not None and stitched_base is not None:
-                # BGR -> RGB -> PIL
-                preview_rgb = cv2.cvtColor(stitched_base, cv2.COLOR_BGR2RGB)
-                pil_preview = Image.fromarray(preview_rgb)
-                
-                # 更新预览图像和匹配状态
-                if len(current_result_holder) >= 2:
-                    current_result_holder[0] = pil_preview
-                    current_result_holder[1] = success  # 传递匹配状态
-                else:
-                    current_result_holder[0] = pil_preview
-            
-            last_capture = current_frame
-            
-            # 每 5 帧输出一次日志
-            if on_log and frame_count % 5 == 0:
-                on_log(f"已捕获 {frame_count} 帧，成功拼接 {stitch_count} 次")
-            
-            # 限制最大帧数
-            if frame_count >= MAX_FRAMES:
-                if on_log:
-                    on_log(f"已达到最大帧数 {MAX_FRAMES}，请点击完成")
-                break
-            
-            time.sleep(CAPTURE_INTERVAL)
+    def process(frame):
+        """匹配线程：去重 + 拼接，返回新增行数；重复帧返回 0，匹配失败返回 None。"""
+        appended = stitcher.push(frame)
+        if stitcher.last_success is None:
+            return 0  # 重复帧（用户未滚动）
+        if ocr_index is not None and appended is not None:
+            ocr_index.feed(*appended)
+        with state_lock:
+            published["height"] = stitcher.canvas.height
+            published["success"] = stitcher.last_success
+            published["frames"] = stitcher.stitch_count
+        if on_log and stitcher.frame_count % 5 == 0:
+            on_log(f"已捕获 {stitcher.frame_count} 帧，成功拼接 {stitcher.stitch_count} 次")
+        return appended[1].shape[0] if appended is not None else None
+    
+    def publish():
+        """预览线程：把已发布高度以内的画布转成预览（不会读到正在追加的行）。"""
+        with state_lock:
+            height, success, frames = published["height"], published["success"], published["frames"]
+        if height == 0:
+            return
+        if preview_feed is not None:
+            # 增量：只缩放上次发布之后新增的行
+            start = published["preview_height"]
+            if height > start:
+                preview_feed.append(stitcher.canvas.rows(start, height), stitcher.canvas.width, success, frames)
+                published["preview_height"] = height
+            else:
+                preview_feed.set_status(success, frames)
+            if current_result_holder is not None and len(current_result_holder) >= 2:
+                current_result_holder[1] = success
+            return
+        # BGR -> RGB -> PIL
+        preview_rgb = cv2.cvtColor(stitcher.canvas.rows(0, height), cv2.COLOR_BGR2RGB)
+        pil_preview = Image.fromarray(preview_rgb)
+        
+        # 更新预览图像和匹配状态
+        if len(current_result_holder) >= 2:
+            current_result_holder[0] = pil_preview
+            current_result_holder[1] = success  # 传递匹配状态
+        else:
+            current_result_holder[0] = pil_preview
+    
+    def should_stop():
+        # 限制最大帧数
+        if stitcher.frame_count >= MAX_FRAMES:
+            if on_log:
+                on_log(f"已达到最大帧数 {MAX_FRAMES}，请点击完成")
+            return True
+        return False
     
+    grabber = RegionGrabber(rect)
+    pipeline = CapturePipeline(
+        grab=grabber.grab,
+        process=process,
+        stop_event=stop_event,
+        frame_height=rect[3],
+        publish=publish if current_result_holder is not None or preview_feed is not None else None,
+        should_stop=should_stop,
+        initial_interval=CAPTURE_INTERVAL,
+        on_log=on_log,
+        close_grab=grabber.close,
+        release=grabber.release,
+    )
+    try:
+        pipeline.run()
     except Exception as e:
         if on_log:
             on_log(f"[捕获异常] {e}")
         return None
     
+    if on_log:
+        on_log(f"[流水线] {grabber.stats_line()}")
+        for line in pipeline.stats_lines():
+            on_log(f"[流水线] {line}")
+    
+    canvas = stitcher.canvas
     # 最终结果
-    if stitched_base is None:
+    if canvas is None:
         if on_log:
             on_log("未捕获到任何内容")
         return None
     
-    # 转换为 PIL Image (BGR -> RGB)
-    result_rgb = cv2.cvtColor(stitched_base, cv2.COLOR_BGR2RGB)
+    # 转换为 PIL Image (BGR -> RGB)，原地转换避免再复制一份长图
+    result_rgb = canvas.finish()
+    cv2.cvtColor(result_rgb, cv2.COLOR_BGR2RGB, dst=result_rgb)
     pil_result = Image.fromarray(result_rgb)
     
     if on_log:
         on_log(f"拼接完成，最终图像大小: {pil_result.width}x{pil_result.height}")
-        on_log(f"统计：捕获 {frame_count} 帧，成功拼接 {stitch_count} 次")
+        on_log(f"统计：捕获 {stitcher.frame_count} 帧，成功拼接 {stitcher.stitch_count} 次")
     
     return pil_result
 
 
 # 保持兼容性：提供旧接口名称
-def capture_long_screenshot_manual(rect, stop_event, on_log=None, current_result_holder=None):
+def capture_long_screenshot_manual(rect, stop_event, on_log=None, current_result_holder=None, preview_feed=None,
+                                   ocr_index=None):
     """兼容性接口，调用新的增量拼接实现"""
-    return capture_long_screenshot_opencv(rect, stop_event, on_log, current_result_holder)
+    return capture_long_screenshot_opencv(rect, stop_event, on_log, current_result_holder, preview_feed, ocr_index)
+
+
+def main(argv=None):
+    """命令行离线拼接：python -m backend.long_screenshot_opencv <帧目录|视频> -o out.png"""
+    parser = argparse.ArgumentParser(description="离线长截图拼接：对帧目录或录屏视频做增量拼接（无需显示器）")
+    parser.add_argument("source", help="帧图片目录，或录屏视频文件")
+    parser.add_argument("-o", "--output", default="long_screenshot.png", help="输出图片路径")
+    parser.add_argument("--every", type=int, default=1, help="每隔几帧取一帧")
+    parser.add_argument("--overlap-ratio", type=float, default=OVERLAP_RATIO, help="重叠区域比例")
+    parser.add_argument("--threshold", type=float, default=MATCH_CONFIDENCE_THRESHOLD, help="匹配置信度阈值")
+    parser.add_argument("--detector", default=DEFAULT_CHANGE_DETECTOR, help="帧变化检测器：row_hash / phash / absdiff")
+    args = parser.parse_args(argv)
+
+    stitcher = FrameStitcher(args.overlap_ratio, args.threshold, args.detector)
+    t0 = time.perf_counter()
+    for start_y, strip in stitch_frames(iter_frames(args.source, args.every), stitcher=stitcher):
+        print(f"[拼接] +{strip.shape[0]} 行 @ y={start_y}", flush=True)
+    if stitcher.canvas is None:
+        print("未读取到任何帧", file=sys.stderr)
+        return 1
+    result = stitcher.canvas.finish()
+    if not cv2.imwrite(args.output, result):
+        print(f"写入失败: {args.output}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - t0
+    print(
+        f"完成：{result.shape[1]}x{result.shape[0]} -> {args.output}，"
+        f"帧 {stitcher.frame_count}，拼接 {stitcher.stitch_count}，耗时 {elapsed:.2f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
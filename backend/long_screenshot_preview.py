@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+长截图增量预览：捕获侧只把「新追加的行」缩小后拼进一张常驻缩略图，并递增版本号；
+UI 侧按版本号判断是否需要重绘，不再每 250 ms 对整张长图 copy + convert + LANCZOS 缩放。
+UI 侧缩放到预览框时用 PreviewScaler 缓存已画过的行，每次只处理新增的行。
+"""
+import threading
+
+import numpy as np
+from PIL import Image
+
+from backend.stitch_canvas import StitchCanvas
+
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+# 缩略图宽度（像素），与预览面板画布宽度相当
+PREVIEW_THUMB_WIDTH = 288
+# PreviewScaler 缓存的行数上限（相对预览框高度的倍数），超出时缓存再对半缩小一级
+PREVIEW_CACHE_RATIO = 2
+
+
+def _resize_rows(rows, width, height):
+    """把一段行条带缩放到 (height, width)，优先用 OpenCV 的 INTER_AREA。"""
+    if OPENCV_AVAILABLE:
+        return cv2.resize(rows, (width, height), interpolation=cv2.INTER_AREA)
+    return np.asarray(Image.fromarray(rows).resize((width, height), Image.Resampling.BOX))
+
+
+class PreviewFeed:
+    """
+    捕获线程 → 预览 UI 的增量通道（线程安全）。
+    - append(rows, full_width, success, frames): 捕获侧调用，只处理新增的行
+    - set_status(success, frames): 只更新匹配状态（例如匹配失败、没有新增行时）
+    frames 为捕获侧累计的已拼接帧数；不传时 append 按一帧计、set_status 不计
+    - snapshot(since_version): UI 侧调用，版本未变时返回 None
+    """
+
+    def __init__(self, thumb_width=PREVIEW_THUMB_WIDTH, bgr=False):
+        self.thumb_width = int(thumb_width)
+        self._bgr = bgr  # 输入行是否为 BGR（OpenCV 拼接器）
+        self._lock = threading.Lock()
+        self._thumb = None        # 缩略图画布（StitchCanvas，RGB）
+        self._full_width = 0
+        self._full_height = 0
+        self.version = 0
+        self.success = None       # 最近一帧匹配状态：True / False / None
+        self.frame_count = 0      # 已拼接进长图的帧数（含首帧，不含重复帧与匹配失败的帧）
+
+    def append(self, rows, full_width=None, success=True, frames=None):
+        """追加原图中新拼接的 rows（(n, W, 3)），按累计高度换算本次应新增的缩略图行数。"""
+        full_width = full_width or rows.shape[1]
+        thumb_w = min(self.thumb_width, full_width)
+        with self._lock:
+            self._full_width = full_width
+            self._full_height += rows.shape[0]
+            current = self._thumb.height if self._thumb is not None else 0
+            target = int(round(self._full_height * thumb_w / full_width))
+            add = target - current
+            if add > 0:
+                small = _resize_rows(np.ascontiguousarray(rows), thumb_w, add)
+                if self._bgr:
+                    small = small[:, :, ::-1]
+                if self._thumb is None:
+                    self._thumb = StitchCanvas.from_frame(np.ascontiguousarray(small))
+                else:
+                    self._thumb.append(small)
+            self.success = success
+            self.frame_count = self.frame_count + 1 if frames is None else frames
+            self.version += 1
+
+    def set_status(self, success, frames=None):
+        with self._lock:
+            self.success = success
+            if frames is not None:
+                self.frame_count = frames
+            self.version += 1
+
+    def snapshot(self, since_version=-1):
+        """
+        版本号与 since_version 相同时返回 None；否则返回 dict：
+        version / success / frame_count / full_size (w, h) / thumb（RGB ndarray 视图，可能为 None）
+        """
+        with self._lock:
+            if self.version == since_version:
+                return None
+            return {
+                "version": self.version,
+                "success": self.success,
+                "frame_count": self.frame_count,
+                "full_size": (self._full_width, self._full_height),
+                "thumb": self._thumb.view() if self._thumb is not None else None,
+            }
+
+
+def _halve_rows(rows, level):
+    """纵向每 2^level 行取平均合成一行（行数须为 2^level 的整数倍）。"""
+    if level == 0:
+        return rows
+    n = 1 << level
+    return rows.reshape(rows.shape[0] // n, n, *rows.shape[1:]).mean(axis=1).astype(np.uint8)
+
+
+class PreviewScaler:
+    """
+    UI 侧：把只追加、不修改已有行的缩略图（如 PreviewFeed 的 thumb）缩放到预览框尺寸。
+    已画过的行按 2^level 行一组纵向平均后缓存，每次只处理新增的行；缓存超过 PREVIEW_CACHE_RATIO × 预览框高时
+    level 加一并从原缩略图重建缓存（只发生 log 次）。最后一步 LANCZOS 只作用于高度有上限的缓存，
+    耗时不随长图高度增长。缩略图宽度变化或变矮（新一次长截图）时自动重置。
+    """
+
+    def __init__(self, max_height):
+        self.max_height = max(1, int(max_height))
+        self.reset()
+
+    def reset(self):
+        self._width = None
+        self._level = 0
+        self._rows = 0       # 已并入缓存的缩略图行数（2^level 的整数倍）
+        self._cache = None   # 已缩小的行，(rows >> level, W, C) uint8
+
+    def _level_for(self, height):
+        level = 0
+        while (height >> level) > self.max_height * PREVIEW_CACHE_RATIO:
+            level += 1
+        return level
+
+    def scale(self, thumb, size):
+        """thumb: (H, W, 3) RGB ndarray；size: 显示尺寸 (w, h)。返回 PIL Image。"""
+        height, width = thumb.shape[:2]
+        if width != self._width or height < self._rows:
+            self.reset()
+            self._width = width
+        level = self._level_for(height)
+        usable = height >> level << level
+        if level != self._level:
+            # 升级：从原缩略图按新级数重建（与一次性缩放的结果一致）
+            self._level = level
+            self._cache = _halve_rows(np.ascontiguousarray(thumb[:usable]), level)
+        elif usable > self._rows:
+            new = _halve_rows(np.ascontiguousarray(thumb[self._rows:usable]), level)
+            self._cache = new if self._cache is None else np.concatenate((self._cache, new))
+        self._rows = usable
+        rows = self._cache if self._cache is not None else thumb[:0]
+        if usable < height:
+            # 不足一组的末尾几行先平均成一行画上，凑满一组后再进缓存
+            rows = np.concatenate((rows, thumb[usable:].mean(axis=0, keepdims=True).astype(np.uint8)))
+        img = Image.fromarray(np.ascontiguousarray(rows))
+        if img.size != tuple(size):
+            img = img.resize(tuple(size), Image.Resampling.LANCZOS)
+        return img
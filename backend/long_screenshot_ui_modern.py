@@ -21,9 +21,10 @@ def _set_window_click_through(hwnd):
         pass
 
 
-def run_long_screenshot_ui(rect, stop_event, result_holder, current_result_holder, done_action):
+def run_long_screenshot_ui(rect, stop_event, result_holder, current_result_holder, done_action, preview_feed=None):
     """
     显示现代化长截图界面：精美选区框 + 底部工具栏（右下角完成按钮）+ 实时预览。
+    preview_feed: 可选 PreviewFeed（增量缩略图）；不传时沿用 current_result_holder 整图预览。
     """
     try:
         import tkinter as tk
@@ -31,9 +32,11 @@ def run_long_screenshot_ui(rect, stop_event, result_holder, current_result_holde
     except ImportError:
         return
     try:
-        from PIL import Image, ImageTk
+        from PIL import ImageTk
     except ImportError:
         ImageTk = None
+    import numpy as np
+    from backend.long_screenshot_preview import PreviewScaler
 
     left, top, right, bottom = rect
     w_rect = right - left
@@ -246,76 +249,99 @@ def run_long_screenshot_ui(rect, stop_event, result_holder, current_result_holde
     photo_ref = [None]
     frame_count = [0]
     last_img_height = [0]
+    last_version = [-1]
+    # 缩放到预览框时缓存已画过的行（框内高度见 draw_preview 的 canvas_h）
+    scaler = PreviewScaler(PREVIEW_H - 108)
+    
+    def draw_preview(thumb, full_w, full_h, match_status):
+        """
+        绘制缩略图与状态；thumb 为只追加行的 RGB ndarray（缩略图或整图），full_w/full_h 为原长图尺寸。
+        缩放经 scaler，已画过的行不再重复缩放。
+        """
+        if match_status is True:
+            # 匹配成功，显示绿色
+            status_indicator.config(fg="#27ae60", text="●")
+        elif match_status is False:
+            # 匹配失败，显示红色
+            status_indicator.config(fg="#e74c3c", text="●")
+        elif full_h > last_img_height[0]:
+            # 备用方案：高度增加也视为成功
+            status_indicator.config(fg="#27ae60", text="●")
+        
+        if full_h > last_img_height[0]:
+            last_img_height[0] = full_h
+        
+        # 更新状态
+        status_label.config(text=f"已捕获 {frame_count[0]} 帧")
+        info_text.config(text=f"图像: {full_w} × {full_h} px")
+        
+        # 计算缩略图（按原图尺寸算显示大小，只缩放已经很小的 thumb）
+        canvas_w = PREVIEW_W - 40
+        canvas_h = PREVIEW_H - 108
+        r = min(canvas_w / full_w, canvas_h / full_h, 1.0)
+        nw, nh = max(int(full_w * r), 1), max(int(full_h * r), 1)
+        
+        photo = ImageTk.PhotoImage(scaler.scale(thumb, (nw, nh)))
+        photo_ref[0] = photo
+        prev_canvas.delete("all")
+        
+        # 计算画布上的偏移（居中）
+        canvas_x = (canvas_w - nw) // 2
+        canvas_y = (canvas_h - nh) // 2
+        
+        # 居中显示缩略图
+        prev_canvas.create_image(canvas_x + nw // 2, canvas_y + nh // 2, image=photo)
+        
+        # 绘制当前视口位置指示器（绿色矩形框）
+        if full_h > h_rect:
+            # 计算当前视口在长图中的相对位置
+            viewport_ratio = h_rect / full_h
+            indicator_h = max(int(nh * viewport_ratio), 15)  # 至少15px高
+            # 假设当前视口在底部（最新拼接的位置）
+            indicator_y = nh - indicator_h
+            
+            # 绘制半透明填充的矩形
+            prev_canvas.create_rectangle(
+                canvas_x + 1, 
+                canvas_y + indicator_y,
+                canvas_x + nw - 1,
+                canvas_y + indicator_y + indicator_h,
+                outline="#27ae60", 
+                width=3,
+                stipple="gray50"  # 半透明效果
+            )
+    
+    def update_feed_preview():
+        """增量预览：版本号未变直接跳过；只用捕获侧维护好的小缩略图重绘。"""
+        snap = preview_feed.snapshot(last_version[0])
+        if snap is None or snap["thumb"] is None:
+            return
+        last_version[0] = snap["version"]
+        frame_count[0] = snap["frame_count"]
+        full_w, full_h = snap["full_size"]
+        draw_preview(snap["thumb"], full_w, full_h, snap["success"])
+    
+    def update_holder_preview():
+        """旧接口：current_result_holder[0] 为整张 PIL 长图。"""
+        if not (current_result_holder and len(current_result_holder) > 0 and current_result_holder[0] is not None):
+            return
+        img = current_result_holder[0]
+        if img.height == last_img_height[0] and img.width > 0 and photo_ref[0] is not None:
+            # 长图没有变化时不重复缩放
+            return
+        # 检测匹配状态（从 current_result_holder[1] 获取）
+        match_status = current_result_holder[1] if len(current_result_holder) > 1 else None
+        frame_count[0] += 1
+        thumb = np.asarray(img if img.mode == "RGB" else img.convert("RGB"))
+        draw_preview(thumb, img.width, img.height, match_status)
     
     def update_preview():
-        if preview.winfo_exists() and current_result_holder and len(current_result_holder) > 0 and current_result_holder[0] is not None:
+        if preview.winfo_exists() and ImageTk is not None:
             try:
-                img = current_result_holder[0]
-                if img and ImageTk is not None:
-                    current_height = img.height
-                    
-                    # 检测匹配状态（从 current_result_holder[1] 获取）
-                    match_status = current_result_holder[1] if len(current_result_holder) > 1 else None
-                    
-                    if match_status is True:
-                        # 匹配成功，显示绿色
-                        status_indicator.config(fg="#27ae60", text="●")
-                    elif match_status is False:
-                        # 匹配失败，显示红色
-                        status_indicator.config(fg="#e74c3c", text="●")
-                    elif current_height > last_img_height[0]:
-                        # 备用方案：高度增加也视为成功
-                        status_indicator.config(fg="#27ae60", text="●")
-                        last_img_height[0] = current_height
-                    
-                    if current_height > last_img_height[0]:
-                        last_img_height[0] = current_height
-                    
-                    frame_count[0] += 1
-                    
-                    # 更新状态
-                    status_label.config(text=f"已捕获 {frame_count[0]} 帧")
-                    info_text.config(text=f"图像: {img.width} × {img.height} px")
-                    
-                    # 计算缩略图
-                    canvas_w = PREVIEW_W - 40
-                    canvas_h = PREVIEW_H - 108
-                    r = min(canvas_w / img.width, canvas_h / img.height, 1.0)
-                    nw, nh = int(img.width * r), int(img.height * r)
-                    
-                    thumb = img.copy()
-                    if thumb.mode != "RGB":
-                        thumb = thumb.convert("RGB")
-                    thumb = thumb.resize((nw, nh), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(thumb)
-                    photo_ref[0] = photo
-                    prev_canvas.delete("all")
-                    
-                    # 计算画布上的偏移（居中）
-                    canvas_x = (canvas_w - nw) // 2
-                    canvas_y = (canvas_h - nh) // 2
-                    
-                    # 居中显示缩略图
-                    prev_canvas.create_image(canvas_x + nw // 2, canvas_y + nh // 2, image=photo)
-                    
-                    # 绘制当前视口位置指示器（绿色矩形框）
-                    if img.height > h_rect:
-                        # 计算当前视口在长图中的相对位置
-                        viewport_ratio = h_rect / img.height
-                        indicator_h = max(int(nh * viewport_ratio), 15)  # 至少15px高
-                        # 假设当前视口在底部（最新拼接的位置）
-                        indicator_y = nh - indicator_h
-                        
-                        # 绘制半透明填充的矩形
-                        prev_canvas.create_rectangle(
-                            canvas_x + 1, 
-                            canvas_y + indicator_y,
-                            canvas_x + nw - 1,
-                            canvas_y + indicator_y + indicator_h,
-                            outline="#27ae60", 
-                            width=3,
-                            stipple="gray50"  # 半透明效果
-                        )
+                if preview_feed is not None:
+                    update_feed_preview()
+                else:
+                    update_holder_preview()
             except Exception as e:
                 pass
         if toolbar.winfo_exists():
@@ -78,9 +78,11 @@ class _MinimalWindow(QMainWindow):
             self._bridge = AppBridge(screenshot_handler=None, ocr_handler=None, parent=self)
         _log("创建 OCR/截图 处理器")
         if self._ocr is None:
-            from backend.ocr_engine import OcrHandler
-            self._ocr = OcrHandler()
+            from backend.ocr_engine import get_ocr_handler, warm_up_async
+            self._ocr = get_ocr_handler()
             self._bridge._ocr = self._ocr
+            # 后台预热 OCR 引擎，首次识别不再等待模型加载
+            warm_up_async(on_log=_log)
         if self._screenshot is None:
             from backend.screenshot import ScreenshotHandler
             self._screenshot = ScreenshotHandler(on_region_captured=self._on_screenshot_captured)
@@ -136,12 +138,8 @@ class _MinimalWindow(QMainWindow):
 
     def _on_screenshot_captured(self, pil_image):
         """区域截图完成（全屏简化版），转 base64 通过 signal 发给前端。"""
-        import base64
-        import io
-        buf = io.BytesIO()
-        pil_image.save(buf, format="PNG")
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-        self._bridge.screenshotFinished.emit(f"data:image/png;base64,{b64}")
+        from backend.image_codec import to_data_url
+        self._bridge.screenshotFinished.emit(to_data_url(pil_image))
 
     def _on_region_captured(self, data_url: str):
         """区域选区截图完成，发信号给前端并重新显示主窗口。"""
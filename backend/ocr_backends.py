@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+可插拔 OCR 后端：OcrHandler 只依赖 OcrBackend 协议（detect / recognize / warm_up），不再写死 RapidOCR。
+引擎配置仍是一个 dict（与原 engine_config 兼容），以下键由后端统一解释，其余键原样交给具体后端：
+- backend: 后端名，默认 "rapidocr"；内置 "stub"（不依赖模型的假后端，供离线调试与基准对照）
+- intra_op_num_threads / inter_op_num_threads: ONNX 线程数
+- providers: ONNX 执行提供程序，如 ["CPUExecutionProvider"] 或 [["CUDAExecutionProvider", {"device_id": 0}]]
+- graph_optimization_level: 会话图优化级别 "disabled" / "basic" / "extended" / "all"
+- enable_cpu_mem_arena: 是否启用 CPU 内存池
+未显式指定配置时读取环境变量 TOOLBOX_OCR_ENGINE（JSON），便于把基准选出的配置直接用上。
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+# 默认后端
+DEFAULT_BACKEND = "rapidocr"
+# 默认引擎配置（JSON）的环境变量
+OCR_ENGINE_ENV = "TOOLBOX_OCR_ENGINE"
+# 预热时送入引擎的小图尺寸（触发 ONNX 会话初始化与首次推理的内存分配）
+WARM_UP_IMAGE_SIZE = (64, 32)
+# 由后端统一解释的 ONNX 会话配置键（RapidOCR 构造参数不支持，构建后重建会话）
+SESSION_KEYS = ("providers", "graph_optimization_level", "enable_cpu_mem_arena")
+# 图优化级别名 -> onnxruntime.GraphOptimizationLevel 成员名
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+# RapidOCR 子模块 -> (模型路径构造参数, 包内 config.yaml 中的段名)
+RAPIDOCR_MODEL_PARTS = {
+    "text_det": ("det_model_path", "Det"),
+    "text_cls": ("cls_model_path", "Cls"),
+    "text_rec": ("rec_model_path", "Rec"),
+}
+# stub 后端：判定为文字像素的灰度阈值，以及每行返回的文本
+STUB_DARK_THRESHOLD = 128
+STUB_TEXT = "stub"
+
+
+def default_engine_config():
+    """环境变量 TOOLBOX_OCR_ENGINE 中的默认引擎配置；未设置或解析失败时为空 dict。"""
+    raw = os.environ.get(OCR_ENGINE_ENV)
+    if not raw:
+        return {}
+    try:
+        config = json.loads(raw)
+    except ValueError:
+        return {}
+    return config if isinstance(config, dict) else {}
+
+
+def config_key(config):
+    """引擎配置 -> 可哈希的键（列表转为元组），用于共享引擎与结果缓存。"""
+    def freeze(v):
+        if isinstance(v, (list, tuple)):
+            return tuple(freeze(x) for x in v)
+        if isinstance(v, dict):
+            return tuple(sorted((k, freeze(x)) for k, x in v.items()))
+        return v
+    return tuple(sorted((k, freeze(v)) for k, v in (config or {}).items()))
+
+
+class OcrBackend:
+    """
+    OCR 后端协议。图片均为 RGB uint8 ndarray（H, W, 3），框为 float32 (n, 4, 2) 四顶点坐标。
+    - detect(arr): 只做文字检测，返回框
+    - recognize(arr): 检测 + 识别，返回 OcrResult
+    - warm_up(): 对小图做一次推理，让首次真实识别不再付出初始化成本
+    实现可被多个线程同时调用。
+    """
+
+    name = ""
+
+    def __init__(self, config=None):
+        self.config = dict(config or {})
+
+    def detect(self, arr):
+        raise NotImplementedError
+
+    def recognize(self, arr):
+        raise NotImplementedError
+
+    def warm_up(self):
+        w, h = WARM_UP_IMAGE_SIZE
+        self.recognize(np.full((h, w, 3), 255, dtype=np.uint8))
+
+
+def _session_options(config):
+    """按配置构造 onnxruntime.SessionOptions。"""
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    opts.log_severity_level = 4
+    if config.get("intra_op_num_threads"):
+        opts.intra_op_num_threads = int(config["intra_op_num_threads"])
+    if config.get("inter_op_num_threads"):
+        opts.inter_op_num_threads = int(config["inter_op_num_threads"])
+    level = config.get("graph_optimization_level")
+    if level is not None:
+        opts.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[level])
+    if config.get("enable_cpu_mem_arena") is not None:
+        opts.enable_cpu_mem_arena = bool(config["enable_cpu_mem_arena"])
+    return opts
+
+
+def _provider_args(providers):
+    """providers 配置 -> (名称列表, 选项列表)；每项为名称或 (名称, 选项 dict)。"""
+    names, options = [], []
+    for p in providers:
+        if isinstance(p, str):
+            names.append(p)
+            options.append({})
+        else:
+            names.append(p[0])
+            options.append(dict(p[1]) if len(p) > 1 else {})
+    return names, options
+
+
+def _find_sessions(obj, depth=3, seen=None):
+    """在 RapidOCR 子模块里查找 onnxruntime.InferenceSession，产出 (持有对象, 属性名, 会话)。"""
+    import onnxruntime as ort
+    seen = set() if seen is None else seen
+    if depth == 0 or id(obj) in seen or not hasattr(obj, "__dict__"):
+        return
+    seen.add(id(obj))
+    for name, value in list(vars(obj).items()):
+        if isinstance(value, ort.InferenceSession):
+            yield obj, name, value
+        elif hasattr(value, "__dict__") and not isinstance(value, type):
+            yield from _find_sessions(value, depth - 1, seen)
+
+
+def _rapidocr_model_paths(kwargs):
+    """RapidOCR 各子模块的模型路径：构造参数优先，否则取包内 config.yaml 的默认值（相对包目录）。"""
+    import rapidocr_onnxruntime
+    import yaml
+    root = os.path.dirname(os.path.abspath(rapidocr_onnxruntime.__file__))
+    try:
+        with open(os.path.join(root, "config.yaml"), "r", encoding="utf-8") as f:
+            defaults = yaml.safe_load(f) or {}
+    except OSError:
+        defaults = {}
+    paths = {}
+    for part, (arg, section) in RAPIDOCR_MODEL_PARTS.items():
+        path = kwargs.get(arg) or (defaults.get(section) or {}).get("model_path")
+        if path and not os.path.isabs(path):
+            path = os.path.join(root, path)
+        paths[part] = path
+    return paths
+
+
+class RapidOcrBackend(OcrBackend):
+    """RapidOCR（onnxruntime）后端。未安装 rapidocr_onnxruntime 时构造抛 ImportError。"""
+
+    name = "rapidocr"
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        from rapidocr_onnxruntime import RapidOCR
+        kwargs = {k: v for k, v in self.config.items() if k != "backend" and k not in SESSION_KEYS}
+        self.engine = RapidOCR(**kwargs)
+        self.model_paths = {}  # 子模块名 -> 模型路径（重建会话时才需要）
+        if any(self.config.get(k) is not None for k in SESSION_KEYS):
+            self.model_paths = _rapidocr_model_paths(kwargs)
+            self._rebuild_sessions()
+
+    def _rebuild_sessions(self):
+        """RapidOCR 不开放会话选项：按配置用原模型重建检测 / 方向分类 / 识别三个会话。"""
+        import onnxruntime as ort
+        opts = _session_options(self.config)
+        names, options = (_provider_args(self.config["providers"]) if self.config.get("providers")
+                          else (None, None))
+        for name in RAPIDOCR_MODEL_PARTS:
+            part = getattr(self.engine, name, None)
+            if part is None:
+                continue
+            for holder, attr, sess in _find_sessions(part):
+                model = self.model_paths.get(name)
+                if not model:
+                    raise ValueError(f"找不到 RapidOCR {name} 的模型路径，无法按配置重建会话")
+                setattr(holder, attr, ort.InferenceSession(
+                    model, sess_options=opts,
+                    providers=names or sess.get_providers(), provider_options=options,
+                ))
+
+    def detect(self, arr):
+        boxes, _ = self.engine.text_det(arr)
+        if boxes is None or len(boxes) == 0:
+            return np.zeros((0, 4, 2), np.float32)
+        return np.asarray(boxes, dtype=np.float32).reshape(-1, 4, 2)
+
+    def recognize(self, arr):
+        from backend.ocr_result import OcrResult
+        result, _ = self.engine(arr)
+        return OcrResult.from_rapidocr(result, arr.shape[1], arr.shape[0])
+
+
+class StubOcrBackend(OcrBackend):
+    """
+    不依赖模型的假后端：按行投影找出深色像素的横向条带作为文字框，每个框返回固定文本。
+    用于离线调试 OCR 流水线（分块、缓存、前处理、异步任务）和基准里的开销对照。
+    可选配置 stub_delay（秒）：每次 recognize 额外等待，模拟引擎耗时。
+    """
+
+    name = "stub"
+
+    def detect(self, arr):
+        dark = (arr.min(axis=2) if arr.ndim == 3 else arr) < STUB_DARK_THRESHOLD
+        rows = dark.any(axis=1)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], rows.astype(np.int8), [0]))))
+        boxes = []
+        for y0, y1 in zip(edges[::2], edges[1::2]):
+            cols = np.flatnonzero(dark[y0:y1].any(axis=0))
+            x0, x1 = float(cols[0]), float(cols[-1] + 1)
+            boxes.append([[x0, y0], [x1, y0], [x1, y1], [x0, y1]])
+        return np.asarray(boxes, dtype=np.float32).reshape(-1, 4, 2)
+
+    def recognize(self, arr):
+        from backend.ocr_result import OcrResult
+        delay = self.config.get("stub_delay")
+        if delay:
+            time.sleep(float(delay))
+        boxes = self.detect(arr)
+        return OcrResult(boxes, [STUB_TEXT] * len(boxes), np.ones(len(boxes), np.float32),
+                         arr.shape[1], arr.shape[0])
+
+
+BACKENDS = {
+    RapidOcrBackend.name: RapidOcrBackend,
+    StubOcrBackend.name: StubOcrBackend,
+}
+
+
+def register_backend(name, cls):
+    """注册自定义后端（cls 以配置 dict 构造，实现 OcrBackend 协议）。"""
+    BACKENDS[name] = cls
+
+
+def create_backend(config=None):
+    """按配置中的 backend 名构造后端；依赖未安装时抛 ImportError，未知后端抛 ValueError。"""
+    config = dict(config or {})
+    name = config.get("backend", DEFAULT_BACKEND)
+    cls = BACKENDS.get(name)
+    if cls is None:
+        raise ValueError(f"未知 OCR 后端: {name}（可选：{', '.join(BACKENDS)}）")
+    return cls(config)
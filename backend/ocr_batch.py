@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+批量 OCR：把大量图片（文件路径、RGB ndarray 或 PIL Image）分发到进程池，
+每个工作进程常驻一个已预热的 OCR 引擎，结果按输入顺序流式返回。
+每个进程的 ONNX 线程数可调（intra_op_num_threads），避免「进程数 × 线程数」超过核数。
+
+命令行：python -m backend.ocr_batch <目录|图片...> [-o out.jsonl] [--workers N] [--threads T]
+"""
+import argparse
+import collections
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from PIL import Image
+
+from backend.ocr_backends import default_engine_config
+from backend.ocr_engine import OcrHandler, warm_up
+
+# 命令行扫描目录时识别的图片扩展名
+IMAGE_FILE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+# 每个工作进程最多预先排队的任务数（限制在途图片占用的内存）
+TASKS_PER_WORKER = 2
+
+# 工作进程内的 OcrHandler（由 _init_worker 创建）
+_worker_handler = None
+
+
+def default_workers(threads_per_worker=1):
+    """按核数与每进程线程数推算进程数。"""
+    return max(1, (os.cpu_count() or 1) // max(1, threads_per_worker))
+
+
+def _engine_config(threads_per_worker):
+    """默认引擎配置上覆盖每进程线程数。"""
+    config = default_engine_config()
+    if threads_per_worker:
+        config.update(intra_op_num_threads=int(threads_per_worker), inter_op_num_threads=1)
+    return config
+
+
+def _init_worker(engine_config):
+    """工作进程初始化：构建并预热引擎，之后该进程内所有任务复用。"""
+    global _worker_handler
+    _worker_handler = OcrHandler(engine_config)
+    try:
+        warm_up(engine_config)
+    except Exception:
+        pass  # 预热失败时首个任务再懒加载，错误随识别结果返回
+
+
+def _recognize_item(item, handler=None):
+    """识别单个输入：路径 / ndarray（RGB）/ PIL Image，返回文本。"""
+    handler = handler or _worker_handler or OcrHandler()
+    if isinstance(item, (str, os.PathLike)):
+        return handler.recognize_from_file(os.fspath(item))
+    if isinstance(item, Image.Image):
+        return handler.recognize_image(item)
+    return handler.recognize_image(Image.fromarray(item))
+
+
+def recognize_batch(items, workers=None, threads_per_worker=1, on_progress=None):
+    """
+    批量识别，按输入顺序逐个 yield (index, text)。
+    :param items: 可迭代的路径 / RGB ndarray / PIL Image（惰性消费，不会一次性全部读入）
+    :param workers: 进程数；None 按核数推算，0 表示在当前进程内顺序识别（使用共享引擎）
+    :param threads_per_worker: 每个进程的 ONNX intra-op 线程数
+    :param on_progress: 可选回调 (done, submitted)，每完成一张调用一次（可能来自后台线程）
+    """
+    progress = on_progress or (lambda done, submitted: None)
+    if workers is None:
+        workers = default_workers(threads_per_worker)
+    if workers <= 0:
+        handler = OcrHandler(_engine_config(threads_per_worker))
+        for i, item in enumerate(items):
+            text = _recognize_item(item, handler)
+            progress(i + 1, i + 1)
+            yield i, text
+        return
+
+    lock = threading.Lock()
+    counts = {"done": 0, "submitted": 0}
+
+    def on_done(_future):
+        with lock:
+            counts["done"] += 1
+            done, submitted = counts["done"], counts["submitted"]
+        progress(done, submitted)
+
+    pending = collections.deque()
+    max_pending = workers * TASKS_PER_WORKER
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_worker,
+        initargs=(_engine_config(threads_per_worker),),
+    ) as pool:
+        index = 0
+        for item in items:
+            with lock:
+                counts["submitted"] += 1
+            future = pool.submit(_recognize_item, item)
+            future.add_done_callback(on_done)
+            pending.append((index, future))
+            index += 1
+            # 在途任务达到上限时先按序交出最早的结果
+            while len(pending) >= max_pending:
+                i, f = pending.popleft()
+                yield i, f.result()
+        while pending:
+            i, f = pending.popleft()
+            yield i, f.result()
+
+
+def iter_image_paths(sources):
+    """展开命令行参数：目录按文件名排序取其中的图片，文件原样保留。"""
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(IMAGE_FILE_EXTS):
+                    yield os.path.join(source, name)
+        else:
+            yield source
+
+
+def main(argv=None):
+    """命令行批量识别：python -m backend.ocr_batch <目录|图片...> -o out.jsonl"""
+    parser = argparse.ArgumentParser(description="批量 OCR：多进程识别目录或图片列表，结果按顺序输出为 JSON Lines")
+    parser.add_argument("sources", nargs="+", help="图片目录或图片文件")
+    parser.add_argument("-o", "--output", default="-", help="输出 JSON Lines 路径，- 表示标准输出")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 核数 / 每进程线程数；0 为单进程")
+    parser.add_argument("--threads", type=int, default=1, help="每个进程的 ONNX intra-op 线程数")
+    args = parser.parse_args(argv)
+
+    paths = list(iter_image_paths(args.sources))
+    if not paths:
+        print("未找到图片", file=sys.stderr)
+        return 1
+    total = len(paths)
+
+    def on_progress(done, _submitted):
+        print(f"\r[OCR] {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        for i, text in recognize_batch(paths, args.workers, args.threads, on_progress):
+            out.write(json.dumps({"path": paths[i], "text": text}, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    print(f"\n完成：{total} 张，耗时 {elapsed:.2f}s，{total / max(elapsed, 1e-9):.2f} 张/秒", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
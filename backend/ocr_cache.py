@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 结果缓存：按「解码后像素内容哈希 + 引擎配置」寻址。
+同一张截图再次识别（AI 分析后再点识别、重新打开同一文件）直接返回，不再跑引擎。
+- 内存 LRU，按结果字节数设上限
+- 可选 SQLite 磁盘层（环境变量 TOOLBOX_OCR_CACHE_DB 指定路径，或 configure_ocr_cache(disk_path=...)）
+- 命中 / 未命中计数
+"""
+import collections
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# 内存层结果总字节上限
+OCR_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# 磁盘层最多保留的条目数（超出时按 rowid 删除最早写入的）
+OCR_CACHE_DISK_MAX_ITEMS = 5000
+# 指定磁盘层路径的环境变量
+OCR_CACHE_DB_ENV = "TOOLBOX_OCR_CACHE_DB"
+
+
+def content_key(arr, config_key=()):
+    """像素缓冲区（ndarray）+ 引擎配置 -> 缓存键（十六进制字符串）。"""
+    # sha1 在常见 CPU 上有硬件加速，4K 截图约 20 ms；这里只做内容寻址，不涉及安全
+    h = hashlib.sha1()
+    h.update(repr((arr.shape, arr.dtype.str, config_key)).encode("utf-8"))
+    h.update(memoryview(arr if arr.flags.c_contiguous else arr.copy()).cast("B"))
+    return h.hexdigest()
+
+
+def image_key(img, config_key=(), band_rows=1024):
+    """
+    PIL Image 版的 content_key：逐条带裁剪后哈希，不生成整图副本（超长截图分块识别用）。
+    结果与对整图 ndarray 调用 content_key 相同。
+    """
+    import numpy as np
+    w, h = img.size
+    first = np.asarray(img.crop((0, 0, w, min(band_rows, h))))
+    shape = (h,) + first.shape[1:]
+    hasher = hashlib.sha1()
+    hasher.update(repr((shape, first.dtype.str, config_key)).encode("utf-8"))
+    hasher.update(memoryview(np.ascontiguousarray(first)).cast("B"))
+    for y in range(band_rows, h, band_rows):
+        band = np.asarray(img.crop((0, y, w, min(y + band_rows, h))))
+        hasher.update(memoryview(np.ascontiguousarray(band)).cast("B"))
+    return hasher.hexdigest()
+
+
+class OcrCache:
+    """线程安全的两级缓存：内存 LRU（必有）+ SQLite（可选）。值为字符串。"""
+
+    def __init__(self, max_bytes=OCR_CACHE_MAX_BYTES, disk_path=None, disk_max_items=OCR_CACHE_DISK_MAX_ITEMS):
+        self.max_bytes = max_bytes
+        self.disk_max_items = disk_max_items
+        self._items = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_count = 0  # 磁盘层条目数（打开时统计一次，之后随写入 / 删除增减）
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_path:
+            self.open_disk(disk_path)
+
+    def open_disk(self, path):
+        """启用磁盘层；打开失败时只用内存层。"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS ocr_cache (key TEXT PRIMARY KEY, value TEXT, created REAL)")
+            # 写入顺序按 rowid 判断（时钟精度不够时 created 会相同）；旧版本按 created 建的索引不再使用
+            db.execute("DROP INDEX IF EXISTS ocr_cache_created")
+            db.commit()
+            count = db.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+        except (OSError, sqlite3.Error):
+            return False
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+            self._db = db
+            self._disk_count = count
+        return True
+
+    def _remember(self, key, value):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._items[key] = value
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def get(self, key):
+        """命中返回字符串，否则 None。"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return value
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT value FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row is not None:
+                    self._remember(key, row[0])
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            try:
+                # 先删后插：覆盖已有键时它成为最新写入的一条（新 rowid），且可知条目数是否增加
+                replaced = self._db.execute("DELETE FROM ocr_cache WHERE key = ?", (key,)).rowcount
+                self._db.execute(
+                    "INSERT INTO ocr_cache (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, time.time()),
+                )
+                count = self._disk_count + 1 - replaced
+                count -= self._evict_locked(count)
+                self._db.commit()
+                self._disk_count = count
+            except sqlite3.Error:
+                self._db.rollback()
+
+    def _evict_locked(self, count):
+        """磁盘层条目数 count 超过上限时按 rowid 删除最早写入的，返回删除的条数（未超限时不查询）。"""
+        if count <= self.disk_max_items:
+            return 0
+        return self._db.execute(
+            "DELETE FROM ocr_cache WHERE rowid IN (SELECT rowid FROM ocr_cache ORDER BY rowid LIMIT ?)",
+            (count - self.disk_max_items,),
+        ).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM ocr_cache")
+                    self._db.commit()
+                    self._disk_count = 0
+                except sqlite3.Error:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk": self._db is not None,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """进程内共享的 OCR 结果缓存；设置了 TOOLBOX_OCR_CACHE_DB 时同时启用磁盘层。"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OcrCache(disk_path=os.environ.get(OCR_CACHE_DB_ENV) or None)
+        return _cache
+
+
+def configure_ocr_cache(max_bytes=None, disk_path=None):
+    """调整共享缓存：内存上限、启用磁盘层。"""
+    cache = get_ocr_cache()
+    if max_bytes is not None:
+        cache.max_bytes = max_bytes
+    if disk_path:
+        cache.open_disk(disk_path)
+    return cache
@@ -1,14 +1,35 @@
 # -*- coding: utf-8 -*-
 """
 OCR：从图片（data URL 或文件）识别文字。
-使用 RapidOCR，仅 pip 安装即可；打包进 exe 后用户无需安装任何其它东西。
+默认使用 RapidOCR，仅 pip 安装即可；打包进 exe 后用户无需安装任何其它东西。
 注意：RapidOCR 仅支持 Python 3.6~3.12，打包时请使用 3.11 或 3.12。
+引擎通过 backend.ocr_backends 的后端协议接入，engine_config 中的 backend 键可切换后端。
 """
 import base64
+import concurrent.futures
 import io
+import threading
+import time
 
 from PIL import Image
 
+from backend.capture_pipeline import StageStats
+from backend.image_io import iter_frames
+from backend.ocr_backends import config_key, create_backend, default_engine_config
+from backend.ocr_cache import content_key, get_ocr_cache, image_key
+from backend.ocr_preprocess import PreprocessOptions, recognize_preprocessed
+from backend.ocr_result import OcrResult, merge_bands
+
+# 缓存值格式（OcrResult JSON），写入缓存键，格式变化时旧条目自然失效
+CACHE_FORMAT = "ocr_result/1"
+# 分块识别：每块高度、相邻块重叠高度（需大于最高的一行文字）、并行块数
+TILE_HEIGHT = 1536
+TILE_OVERLAP = 160
+TILE_WORKERS = 2
+# 高度超过该值且明显是竖长图时，自动改用分块识别（长截图）
+TILE_AUTO_MIN_HEIGHT = 4096
+TILE_AUTO_ASPECT = 2.5
+
 
 def _decode_data_url(data_url: str) -> bytes:
     """从 data:image/xxx;base64,... 解析出图片二进制。"""
@@ -20,63 +41,325 @@ def _decode_data_url(data_url: str) -> bytes:
     return base64.b64decode(data_url[i + 7:], validate=True)
 
 
-class OcrHandler:
-    """OCR 识别封装（RapidOCR）。未安装时返回友好提示，打包 exe 时带上 requirements-ocr 即可。"""
+_NOT_INSTALLED = False
+
 
-    _NOT_INSTALLED = False
+class OcrMetrics:
+    """引擎加载耗时与冷/热识别耗时统计（线程安全）。"""
 
     def __init__(self):
-        self._engine = None
+        self._lock = threading.Lock()
+        self.load_seconds = None    # 构建后端（加载模型、创建 ONNX 会话）耗时
+        self.warm_up_seconds = None  # 预热推理耗时
+        self.cold = StageStats("OCR 冷启动识别")  # 每个引擎的首次识别
+        self.warm = StageStats("OCR 热识别")
+        self._seen = set()
 
-    def _get_engine(self):
-        """懒加载 RapidOCR；未安装（如 3.13 环境）时返回 _NOT_INSTALLED。"""
-        if self._engine is None:
+    def mark_warm(self, engine_key):
+        """预热过的引擎之后的调用都算热识别。"""
+        with self._lock:
+            self._seen.add(engine_key)
+
+    def record_call(self, engine_key, seconds):
+        with self._lock:
+            first = engine_key not in self._seen
+            self._seen.add(engine_key)
+        (self.cold if first else self.warm).add(seconds)
+
+    def snapshot(self):
+        return {
+            "load_seconds": self.load_seconds,
+            "warm_up_seconds": self.warm_up_seconds,
+            "cold": self.cold.snapshot(),
+            "warm": self.warm.snapshot(),
+        }
+
+
+class _EngineRegistry:
+    """
+    进程内共享的 OCR 后端：按引擎配置懒加载，每种配置只构建一次。
+    构建在锁内完成，多个线程同时首次取用时只有一个真正加载，其余等待复用。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines = {}
+        self._building = {}  # key -> Lock，避免不同配置的加载互相阻塞
+        self.metrics = OcrMetrics()
+
+    @staticmethod
+    def key(config):
+        """config 为 None 时使用默认配置（环境变量 TOOLBOX_OCR_ENGINE）。"""
+        return config_key(default_engine_config() if config is None else config)
+
+    def get(self, config=None):
+        """取（必要时构建）后端；后端依赖未安装时返回 _NOT_INSTALLED。"""
+        key = self.key(config)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                return engine
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                engine = self._engines.get(key)
+            if engine is not None:
+                return engine
+            t0 = time.perf_counter()
             try:
-                from rapidocr_onnxruntime import RapidOCR
-                self._engine = RapidOCR()
+                engine = create_backend(dict(key))
+                self.metrics.load_seconds = time.perf_counter() - t0
             except ImportError:
-                self._engine = self._NOT_INSTALLED
-        return self._engine
+                engine = _NOT_INSTALLED
+            with self._lock:
+                self._engines[key] = engine
+            return engine
+
+    def warm_up(self, config=None):
+        """构建后端并对一张空白小图做一次推理，让首次真实识别不再付出初始化成本。返回是否成功。"""
+        engine = self.get(config)
+        if engine is _NOT_INSTALLED:
+            return False
+        t0 = time.perf_counter()
+        engine.warm_up()
+        self.metrics.warm_up_seconds = time.perf_counter() - t0
+        self.metrics.mark_warm(self.key(config))
+        return True
+
+
+_registry = _EngineRegistry()
+
+
+def get_ocr_engine(config=None):
+    """进程内共享的 OCR 后端（config 为引擎配置 dict，见 backend.ocr_backends）；未安装时返回 _NOT_INSTALLED。"""
+    return _registry.get(config)
+
+
+def get_ocr_metrics():
+    """引擎加载 / 预热 / 冷热识别耗时统计，以及结果缓存的命中情况。"""
+    metrics = _registry.metrics.snapshot()
+    metrics["cache"] = get_ocr_cache().stats()
+    return metrics
+
+
+def warm_up(config=None):
+    """同步预热共享引擎，返回是否成功（后端依赖未安装时为 False）。"""
+    return _registry.warm_up(config)
+
+
+def warm_up_async(config=None, on_log=None):
+    """
+    后台线程预热共享引擎（应用启动时调用），返回线程对象。
+    预热失败只记录日志，不影响之后按需懒加载。
+    """
+    log = on_log or (lambda msg: None)
+
+    def run():
+        try:
+            if _registry.warm_up(config):
+                m = _registry.metrics
+                log(f"OCR 引擎已预热：加载 {m.load_seconds or 0:.2f}s，预热推理 {m.warm_up_seconds:.2f}s")
+        except Exception as e:
+            log(f"[OCR 预热失败] {e}")
+
+    t = threading.Thread(target=run, name="ocr-warm-up", daemon=True)
+    t.start()
+    return t
+
+
+def _source_size(src):
+    """PIL Image 或 ndarray 的 (宽, 高)。"""
+    if isinstance(src, Image.Image):
+        return src.size
+    return src.shape[1], src.shape[0]
 
-    def _recognize_pil(self, img: Image.Image) -> str:
-        """PIL Image 用 RapidOCR 识别。"""
+
+class OcrHandler:
+    """OCR 识别封装（默认 RapidOCR 后端）。未安装时返回友好提示，打包 exe 时带上 requirements-ocr 即可。"""
+
+    _NOT_INSTALLED = _NOT_INSTALLED
+
+    def __init__(self, engine_config=None, cache=True, preprocess=None):
+        """
+        :param engine_config: 可选引擎配置（见 backend.ocr_backends）；相同配置的 OcrHandler 共享同一个引擎，
+            None 时使用默认配置
+        :param cache: True 使用共享的结果缓存，False 不缓存，也可传入 OcrCache 实例
+        :param preprocess: 默认前处理配置（PreprocessOptions / True / dict），None 表示直接识别原图
+        """
+        self._engine_config = default_engine_config() if engine_config is None else dict(engine_config)
+        self._preprocess = preprocess
+        if cache is True:
+            cache = get_ocr_cache()
+        self._cache = cache or None
+
+    def _get_engine(self):
+        """取共享的 OCR 后端；未安装（如 3.13 环境）时返回 _NOT_INSTALLED。"""
+        return _registry.get(self._engine_config)
+
+    def _run_engine(self, engine, arr, engine_key) -> OcrResult:
+        t0 = time.perf_counter()
+        result = engine.recognize(arr)
+        _registry.metrics.record_call(engine_key, time.perf_counter() - t0)
+        return result
+
+    def _recognize_tiles(self, engine, src, engine_key, tile_height, overlap, workers) -> OcrResult:
+        """
+        分块识别：按 tile_height 切成相邻重叠 overlap 的横向条带并行识别，再按重叠区中线合并去重。
+        src 为 RGB PIL 图（条带按需裁出）或 RGB ndarray（条带为行切片视图），
+        同时在途的条带不超过 workers 个，内存占用与图高无关。
+        """
+        import numpy as np
+        w, h = _source_size(src)
+        step = max(1, tile_height - overlap)
+        starts = list(range(0, max(h - overlap, 1), step))
+        half = overlap / 2
+
+        def run(y0):
+            y1 = min(y0 + tile_height, h)
+            band = src[y0:y1] if isinstance(src, np.ndarray) else np.asarray(src.crop((0, y0, w, y1)))
+            return self._run_engine(engine, band, engine_key)
+
+        bands = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ocr-tile") as pool:
+            pending = []
+            for k, y0 in enumerate(starts):
+                pending.append((k, y0, pool.submit(run, y0)))
+                if len(pending) >= workers:
+                    bands.append(self._band_entry(pending.pop(0), starts, half, h))
+            while pending:
+                bands.append(self._band_entry(pending.pop(0), starts, half, h))
+        return merge_bands(bands, w, h)
+
+    @staticmethod
+    def _band_entry(item, starts, half, h):
+        k, y0, future = item
+        keep_top = 0 if k == 0 else y0 + half
+        keep_bottom = h if k == len(starts) - 1 else starts[k + 1] + half
+        return future.result(), y0, keep_top, keep_bottom
+
+    def _recognize(self, src, tiled=None, tile_height=TILE_HEIGHT, overlap=TILE_OVERLAP,
+                   workers=TILE_WORKERS, preprocess=None) -> OcrResult:
+        """
+        用 OCR 后端识别，返回结构化结果（失败时 error 为提示文本）。
+        src 为 PIL Image 或 RGB uint8 ndarray（H, W, 3）；ndarray 直接交给引擎，
+        只有前处理需要 PIL 图时才从它构造（Image.fromarray 会复制一份像素）。
+        tiled=None 时按尺寸自动决定是否分块（竖长图）；
+        preprocess 为 PreprocessOptions / True / dict 时先做前处理（分块识别时不做），None 用 handler 默认配置。
+        """
         engine = self._get_engine()
+        width, height = _source_size(src)
         if engine is self._NOT_INSTALLED:
-            return "[OCR 未安装] 打包时请用 Python 3.11/3.12 并执行 pip install -r requirements-ocr.txt，打好的 exe 将自带 OCR。"
+            return OcrResult.failed(
+                "[OCR 未安装] 打包时请用 Python 3.11/3.12 并执行 pip install -r requirements-ocr.txt，打好的 exe 将自带 OCR。"
+            )
         try:
             import numpy as np
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-            arr = np.array(img)
-            result, _ = engine(arr)
-            if not result:
-                return ""
-            lines = []
-            for item in result:
-                if len(item) >= 2 and item[1]:
-                    lines.append(str(item[1]).strip())
-            return "\n".join(lines)
+            if isinstance(src, np.ndarray):
+                src = np.ascontiguousarray(src)
+            elif src.mode != "RGB":
+                src = src.convert("RGB")
+            if tiled is None:
+                tiled = height > TILE_AUTO_MIN_HEIGHT and height > TILE_AUTO_ASPECT * width
+            tile_key = (tile_height, overlap) if tiled else None
+            options = None if tiled else PreprocessOptions.coerce(self._preprocess if preprocess is None else preprocess)
+            engine_key = _registry.key(self._engine_config)
+            # PIL 图分块时按需裁剪条带，不生成整图副本；引擎只读输入，asarray 即可
+            arr = src if isinstance(src, np.ndarray) else None if tiled else np.asarray(src)
+            cache_key = None
+            if self._cache is not None:
+                config_key = (CACHE_FORMAT, engine_key, tile_key, options.key() if options else None)
+                cache_key = content_key(arr, config_key) if arr is not None else image_key(src, config_key)
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    return OcrResult.from_json(cached)
+            if tiled:
+                ocr_result = self._recognize_tiles(engine, src, engine_key, tile_height, overlap, workers)
+            elif options is not None:
+                img = Image.fromarray(arr) if isinstance(src, np.ndarray) else src
+                ocr_result = recognize_preprocessed(img, options, lambda a: self._run_engine(engine, a, engine_key))
+            else:
+                ocr_result = self._run_engine(engine, arr, engine_key)
+            if cache_key is not None and not ocr_result.error:
+                self._cache.put(cache_key, ocr_result.to_json())
+            return ocr_result
         except Exception as e:
-            return f"[OCR 错误] {e!s}"
+            return OcrResult.failed(f"[OCR 错误] {e!s}", width, height)
 
-    def recognize_from_data_url(self, data_url: str) -> str:
-        """从 base64 数据 URL 识别文字。"""
+    def recognize_image_result(self, img: Image.Image, tiled=None, preprocess=None) -> OcrResult:
+        """
+        识别内存中的 PIL Image，返回 OcrResult。
+        tiled=None 按尺寸自动决定是否分块，True / False 强制；preprocess 见 _recognize。
+        """
+        return self._recognize(img, tiled, preprocess=preprocess)
+
+    def recognize_tiled_result(self, img: Image.Image, tile_height=TILE_HEIGHT, overlap=TILE_OVERLAP,
+                               workers=TILE_WORKERS) -> OcrResult:
+        """强制分块识别（超长截图）：条带高 tile_height、重叠 overlap、并行 workers 块。"""
+        return self._recognize(img, True, tile_height, overlap, workers)
+
+    def recognize_data_url_result(self, data_url: str) -> OcrResult:
+        """从 base64 数据 URL 识别，返回 OcrResult。"""
         raw = _decode_data_url(data_url)
         if not raw:
-            return ""
+            return OcrResult()
         try:
             img = Image.open(io.BytesIO(raw))
-            return self._recognize_pil(img)
+            return self._recognize(img)
         except Exception as e:
-            return f"[OCR 错误] {e!s}"
+            return OcrResult.failed(f"[OCR 错误] {e!s}")
 
-    def recognize_from_file(self, path: str) -> str:
-        """从本地图片文件路径识别文字。"""
+    def recognize_array_result(self, arr, tiled=None, preprocess=None) -> OcrResult:
+        """识别 RGB uint8 ndarray（H, W, 3）：直接交给引擎，不转成 PIL 图（前处理时除外）。"""
+        return self._recognize(arr, tiled, preprocess=preprocess)
+
+    def recognize_file_result(self, path: str) -> OcrResult:
+        """
+        从本地图片文件识别，返回 OcrResult。
+        文件经 image_io 解码（memmap + imdecode，单份像素缓冲）；多帧 TIFF 逐页识别，
+        各页结果按页高依次向下平移后合并为一个结果。
+        """
         try:
-            with open(path, "rb") as f:
-                img = Image.open(io.BytesIO(f.read()))
-            return self._recognize_pil(img)
+            pages, offset, width = [], 0, 0
+            for frame in iter_frames(path):
+                h, w = frame.shape[:2]
+                result = self.recognize_array_result(frame)
+                del frame  # 下一页解码前释放本页像素
+                if result.error:
+                    return result
+                pages.append((result, offset, offset, offset + h))
+                offset += h
+                width = max(width, w)
+            if not pages:
+                return OcrResult.failed(f"[OCR 错误] 文件中没有可识别的图像: {path}")
+            if len(pages) == 1:
+                return pages[0][0]
+            return merge_bands(pages, width, offset)
         except FileNotFoundError:
-            return f"[OCR 错误] 文件不存在: {path}"
+            return OcrResult.failed(f"[OCR 错误] 文件不存在: {path}")
         except Exception as e:
-            return f"[OCR 错误] {e!s}"
+            return OcrResult.failed(f"[OCR 错误] {e!s}")
+
+    def recognize_image(self, img: Image.Image) -> str:
+        """识别内存中的 PIL Image（如图片仓库中的截图）。"""
+        return self.recognize_image_result(img).text
+
+    def recognize_from_data_url(self, data_url: str) -> str:
+        """从 base64 数据 URL 识别文字。"""
+        return self.recognize_data_url_result(data_url).text
+
+    def recognize_from_file(self, path: str) -> str:
+        """从本地图片文件路径识别文字。"""
+        return self.recognize_file_result(path).text
+
+
+_shared_handler = None
+_shared_handler_lock = threading.Lock()
+
+
+def get_ocr_handler():
+    """进程内共享的默认 OcrHandler（使用默认配置的共享引擎）。"""
+    global _shared_handler
+    with _shared_handler_lock:
+        if _shared_handler is None:
+            _shared_handler = OcrHandler()
+        return _shared_handler
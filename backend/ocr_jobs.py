@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+异步 OCR 任务：前端提交后立即拿到 job_id，识别在后台线程池执行，JS 调用不再被整段 OCR 阻塞。
+- 相同输入（同一句柄 + 同一前处理配置）在途时复用同一个任务，重复点击不会再起一次完整识别
+- poll(job_id) 查询状态；cancel(job_id) 取消（排队中的直接取消，执行中的丢弃结果）
+- 任务结束时回调 on_finished(job_dict)，由 Api 通过 window.evaluate_js 推给前端
+"""
+import collections
+import concurrent.futures
+import itertools
+import json
+import threading
+import time
+
+# 同时执行的 OCR 任务数
+OCR_JOB_WORKERS = 2
+# 保留的已结束任务数（供 poll 查询，超出时淘汰最早结束的）
+MAX_FINISHED_JOBS = 64
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, ERROR, CANCELLED)
+
+
+class OcrJob:
+    __slots__ = ("job_id", "key", "status", "result", "error", "created", "started", "finished", "future")
+
+    def __init__(self, job_id, key):
+        self.job_id = job_id
+        self.key = key
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    def to_dict(self):
+        elapsed = None
+        if self.started is not None:
+            elapsed = (self.finished or time.time()) - self.started
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "elapsed": elapsed,
+        }
+
+
+class OcrJobManager:
+    """
+    OCR 任务管理（线程安全）。
+    :param run: 回调 (payload) -> dict，在工作线程中执行识别，返回可 JSON 序列化的结果
+    :param on_finished: 可选回调 (job_dict)，任务结束（完成 / 失败 / 取消）时调用
+    """
+
+    def __init__(self, run, on_finished=None, workers=OCR_JOB_WORKERS):
+        self._run = run
+        self._on_finished = on_finished
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._inflight = {}                      # key -> job_id（排队中或执行中）
+        self._finished = collections.deque()     # 已结束任务的 job_id，按结束顺序
+        self._ids = itertools.count(1)
+
+    def submit(self, key, payload):
+        """提交任务并返回 job_id；相同 key 的任务在途时直接返回已有任务。"""
+        with self._lock:
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                return job_id
+            job = OcrJob(f"ocr-{next(self._ids)}", key)
+            self._jobs[job.job_id] = job
+            self._inflight[key] = job.job_id
+            job.future = self._pool.submit(self._execute, job, payload)
+            return job.job_id
+
+    def _execute(self, job, payload):
+        with self._lock:
+            if job.status != PENDING:
+                return
+            job.status = RUNNING
+            job.started = time.time()
+        try:
+            result, error = self._run(payload), None
+        except Exception as e:
+            result, error = None, f"[OCR 错误] {e!s}"
+        with self._lock:
+            if job.status == CANCELLED:
+                return  # 执行中被取消：丢弃结果（已在 cancel 中通知）
+            job.result = result
+            job.error = error
+            job.status = ERROR if error else DONE
+            self._finish_locked(job)
+        self._notify(job)
+
+    def _finish_locked(self, job):
+        job.finished = time.time()
+        if self._inflight.get(job.key) == job.job_id:
+            del self._inflight[job.key]
+        self._finished.append(job.job_id)
+        while len(self._finished) > MAX_FINISHED_JOBS:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def _notify(self, job):
+        if self._on_finished is not None:
+            try:
+                self._on_finished(job.to_dict())
+            except Exception:
+                pass
+
+    def poll(self, job_id):
+        """任务状态 dict；job_id 不存在时返回 None。"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def cancel(self, job_id):
+        """取消任务，返回是否取消成功（已结束的任务不能取消）。"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+            job.status = CANCELLED
+            if job.future is not None:
+                job.future.cancel()
+            self._finish_locked(job)
+        self._notify(job)
+        return True
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def js_event(name, detail):
+    """生成派发 window 自定义事件的 JS 片段（供 window.evaluate_js 使用）。"""
+    return f"window.dispatchEvent(new CustomEvent({json.dumps(name)}, {{detail: {json.dumps(detail, ensure_ascii=False)}}}))"
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 前处理：4K 全屏截图直接送引擎时，检测耗时主要花在分辨率上。
+- 按显示器 DPI 缩放自适应缩小（200% 缩放下文字像素高度翻倍，缩小一半仍清晰），并限制最长边
+- 可选转灰度（彩色背景 / 彩色文字统一成亮度）
+- 裁掉四周纯色边距
+- 用低成本的方差图找出空白区域，只识别有内容的纵向片段
+识别结果的文本框会映射回原图坐标。
+"""
+import sys
+
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+# 缩小后最长边上限（像素）
+PREPROCESS_MAX_SIDE = 2560
+# 最小缩放比例（避免把小字缩得无法识别）
+PREPROCESS_MIN_SCALE = 0.5
+# 方差图块大小（像素）与判定为空白的方差阈值（灰度方差）
+VARIANCE_BLOCK = 16
+BLANK_VARIANCE = 12.0
+# 内容片段上下各保留的边距，以及两个片段间距小于该值时合并（像素，缩放后）
+SEGMENT_PADDING = 8
+SEGMENT_MERGE_GAP = 48
+
+
+def display_scale():
+    """系统显示缩放比例（Windows 100% = 1.0，150% = 1.5）；其他平台或获取失败返回 1.0。"""
+    if sys.platform != "win32":
+        return 1.0
+    try:
+        import ctypes
+        dpi = ctypes.windll.user32.GetDpiForSystem()
+        return max(1.0, dpi / 96.0)
+    except Exception:
+        return 1.0
+
+
+class PreprocessOptions:
+    """
+    前处理配置（每次识别可单独指定）。
+    - downscale: 是否按 DPI / 最长边自适应缩小
+    - dpi_scale: 显示缩放比例，None 时自动获取
+    - max_side: 缩小后最长边上限
+    - grayscale: 是否转灰度
+    - crop_margins: 是否裁掉四周纯色边距
+    - skip_blank: 是否跳过空白区域，只识别有内容的纵向片段
+    """
+
+    __slots__ = ("downscale", "dpi_scale", "max_side", "grayscale", "crop_margins", "skip_blank")
+
+    def __init__(self, downscale=True, dpi_scale=None, max_side=PREPROCESS_MAX_SIDE, grayscale=False,
+                 crop_margins=True, skip_blank=True):
+        self.downscale = downscale
+        self.dpi_scale = dpi_scale
+        self.max_side = max_side
+        self.grayscale = grayscale
+        self.crop_margins = crop_margins
+        self.skip_blank = skip_blank
+
+    @classmethod
+    def coerce(cls, value):
+        """True -> 默认配置；dict -> 按键构造；None / False -> None（不做前处理）。"""
+        if value is None or value is False:
+            return None
+        if value is True:
+            return cls()
+        if isinstance(value, dict):
+            return cls(**value)
+        return value
+
+    def key(self):
+        """参与 OCR 结果缓存键的配置元组（dpi_scale 按实际取值）。"""
+        dpi = self.dpi_scale if self.dpi_scale is not None else display_scale()
+        return (self.downscale, dpi, self.max_side, self.grayscale, self.crop_margins, self.skip_blank)
+
+
+def _gray(arr):
+    if arr.ndim == 2:
+        return arr
+    if OPENCV_AVAILABLE:
+        return cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY)
+    return np.asarray(Image.fromarray(arr).convert("L"))
+
+
+def block_variance(gray, block=VARIANCE_BLOCK):
+    """
+    按 block × block 块计算灰度方差图，形状 (ceil(H / block), ceil(W / block))。
+    尺寸不是 block 整数倍时，最后一行 / 列块取图像底部 / 右侧的 block 个像素（与前一块部分重叠），
+    贴着边缘的内容（如裁边后的最后一行文字）不会被漏掉。
+    """
+    h, w = gray.shape
+    if h < block or w < block:
+        return np.full((1, 1), float(gray.var()), dtype=np.float32)
+    if h % block or w % block:
+        rows = np.r_[0:h - h % block, h - block:h] if h % block else slice(None)
+        cols = np.r_[0:w - w % block, w - block:w] if w % block else slice(None)
+        gray = gray[rows][:, cols]
+        h, w = gray.shape
+    hb, wb = h // block, w // block
+    g = gray.astype(np.float32)
+    if OPENCV_AVAILABLE:
+        # 块均值用 INTER_AREA 缩放求得：Var = E[x²] - E[x]²
+        mean = cv2.resize(g, (wb, hb), interpolation=cv2.INTER_AREA)
+        mean_sq = cv2.resize(g * g, (wb, hb), interpolation=cv2.INTER_AREA)
+        return np.maximum(mean_sq - mean * mean, 0)
+    return g.reshape(hb, block, wb, block).var(axis=(1, 3))
+
+
+def content_bbox(gray, tolerance=8):
+    """四周与左上角像素相差不超过 tolerance 的边距视为纯色边，返回内容区域 (x0, y0, x1, y1)。"""
+    bg = int(gray[0, 0])
+    mask = np.abs(gray.astype(np.int16) - bg) > tolerance
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def content_segments(gray, block=VARIANCE_BLOCK, threshold=BLANK_VARIANCE,
+                     padding=SEGMENT_PADDING, merge_gap=SEGMENT_MERGE_GAP):
+    """由方差图找出有内容的纵向片段 [(y0, y1)]；间距较小的片段合并，避免把一段文字切碎。"""
+    h = gray.shape[0]
+    busy = (block_variance(gray, block) > threshold).any(axis=1)
+    rows = np.flatnonzero(busy)
+    if rows.size == 0:
+        return []
+    segments = []
+    start = prev = int(rows[0])
+    for r in rows[1:]:
+        r = int(r)
+        if (r - prev - 1) * block > merge_gap:
+            segments.append((start, prev))
+            start = r
+        prev = r
+    segments.append((start, prev))
+    return [(max(0, a * block - padding), min(h, (b + 1) * block + padding)) for a, b in segments]
+
+
+def preprocess_scale(width, height, options):
+    """按 DPI 与最长边上限计算缩放比例（<= 1）。"""
+    if not options.downscale:
+        return 1.0
+    dpi = options.dpi_scale if options.dpi_scale is not None else display_scale()
+    scale = 1.0 / max(dpi, 1.0)
+    if options.max_side:
+        scale = min(scale, options.max_side / max(width, height))
+    return min(1.0, max(scale, PREPROCESS_MIN_SCALE))
+
+
+def recognize_preprocessed(img, options, recognize):
+    """
+    前处理后识别，返回原图坐标下的 OcrResult。
+    :param img: RGB PIL Image
+    :param options: PreprocessOptions
+    :param recognize: 回调 (RGB ndarray) -> OcrResult，对单个片段执行识别
+    """
+    from backend.ocr_result import OcrResult, merge_bands
+
+    width, height = img.size
+    scale = preprocess_scale(width, height, options)
+    if scale < 1.0:
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        img = img.resize(size, Image.Resampling.BOX)
+    arr = np.asarray(img)
+    gray = _gray(arr)
+    x0, y0 = 0, 0
+    if options.crop_margins:
+        bbox = content_bbox(gray)
+        if bbox is None:
+            return OcrResult(width=width, height=height)
+        x0, y0, x1, y1 = bbox
+        arr, gray = arr[y0:y1, x0:x1], gray[y0:y1, x0:x1]
+    if options.grayscale:
+        arr = np.repeat(gray[:, :, None], 3, axis=2)
+    segments = content_segments(gray) if options.skip_blank else [(0, arr.shape[0])]
+    bands = []
+    for top, bottom in segments:
+        part = recognize(np.ascontiguousarray(arr[top:bottom]))
+        if part.error:
+            return OcrResult.failed(part.error, width, height)
+        part = part.transformed(1.0 / scale, (x0 / scale, (y0 + top) / scale))
+        bands.append((part, 0, (y0 + top) / scale, (y0 + bottom) / scale))
+    return merge_bands(bands, width, height)
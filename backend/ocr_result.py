@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+结构化 OCR 结果：保留 RapidOCR 返回的文本框与置信度，而不只是拼好的文本。
+- 框 / 置信度 / 阅读顺序用 NumPy 数组紧凑存储，OcrLine 只是按下标取值的轻量视图
+- 可序列化为 JSON（缓存与前端传输都用它）
+- 按区域再查询：在已有结果里筛出落在矩形内的行，无需对子区域重新 OCR
+"""
+import json
+
+import numpy as np
+
+# 判断两行是否属于同一「视觉行」：纵向中心差小于行高中位数的该比例
+SAME_ROW_RATIO = 0.5
+# 区域查询时，文本框面积至少有该比例落在区域内才算命中
+REGION_MIN_OVERLAP = 0.5
+# 分块合并时，相邻块中文本相同且 IoU 超过该值的两行视为同一行
+SEAM_DUPLICATE_IOU = 0.5
+
+
+class OcrLine:
+    """单行识别结果（只读视图）：box 为 4 个 (x, y) 顶点，index 为阅读顺序。"""
+
+    __slots__ = ("box", "text", "score", "index")
+
+    def __init__(self, box, text, score, index):
+        self.box = box
+        self.text = text
+        self.score = score
+        self.index = index
+
+    @property
+    def bbox(self):
+        """外接矩形 (x, y, w, h)。"""
+        x0, y0 = self.box.min(axis=0)
+        x1, y1 = self.box.max(axis=0)
+        return float(x0), float(y0), float(x1 - x0), float(y1 - y0)
+
+    def to_dict(self):
+        return {"box": self.box.tolist(), "text": self.text, "score": self.score, "index": self.index}
+
+    def __repr__(self):
+        return f"OcrLine({self.index}, {self.text!r}, score={self.score:.3f})"
+
+
+def reading_order(boxes):
+    """
+    按阅读顺序排序：先按纵向中心分成视觉行（中心差 < 行高中位数 × SAME_ROW_RATIO），
+    行内再按左边界排序。返回每个框的阅读顺序下标（int32 数组）。
+    """
+    n = len(boxes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int32)
+    ys = boxes[:, :, 1]
+    centers = (ys.min(axis=1) + ys.max(axis=1)) / 2
+    heights = ys.max(axis=1) - ys.min(axis=1)
+    tol = max(float(np.median(heights)) * SAME_ROW_RATIO, 1.0)
+    lefts = boxes[:, :, 0].min(axis=1)
+    by_center = np.argsort(centers, kind="stable")
+    row_ids = np.empty(n, dtype=np.int64)
+    row, row_start = 0, centers[by_center[0]]
+    for i in by_center:
+        if centers[i] - row_start > tol:
+            row += 1
+            row_start = centers[i]
+        row_ids[i] = row
+    order = np.lexsort((lefts, row_ids))
+    index = np.empty(n, dtype=np.int32)
+    index[order] = np.arange(n, dtype=np.int32)
+    return index
+
+
+class OcrResult:
+    """
+    一张图的结构化识别结果。
+    - boxes: float32 (n, 4, 2)；scores: float32 (n,)；texts: list[str]；order: int32 (n,) 阅读顺序
+    - width / height: 原图尺寸
+    - error: 识别失败或未安装时的提示文本（与旧接口的 "[OCR 错误] ..." 一致），成功时为 None
+    """
+
+    __slots__ = ("boxes", "texts", "scores", "order", "width", "height", "error")
+
+    def __init__(self, boxes=None, texts=None, scores=None, width=0, height=0, order=None, error=None):
+        self.texts = list(texts or [])
+        n = len(self.texts)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(n, 4, 2) if n else np.zeros((0, 4, 2), np.float32)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(n) if n else np.zeros(0, np.float32)
+        self.order = np.asarray(order, dtype=np.int32) if order is not None else reading_order(self.boxes)
+        self.width = int(width)
+        self.height = int(height)
+        self.error = error
+
+    @classmethod
+    def from_rapidocr(cls, result, width, height):
+        """RapidOCR 输出 [[box, text, score], ...] -> OcrResult（跳过空文本）。"""
+        boxes, texts, scores = [], [], []
+        for item in result or ():
+            if len(item) >= 2 and item[1]:
+                boxes.append(item[0])
+                texts.append(str(item[1]).strip())
+                scores.append(float(item[2]) if len(item) >= 3 else 1.0)
+        return cls(boxes, texts, scores, width, height)
+
+    @classmethod
+    def failed(cls, message, width=0, height=0):
+        return cls(width=width, height=height, error=message)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def line(self, i):
+        return OcrLine(self.boxes[i], self.texts[i], float(self.scores[i]), int(self.order[i]))
+
+    @property
+    def lines(self):
+        """按阅读顺序排列的 OcrLine 列表。"""
+        return [self.line(i) for i in np.argsort(self.order, kind="stable")]
+
+    @property
+    def text(self):
+        """按阅读顺序逐行拼接的纯文本；失败时为 error。"""
+        if self.error:
+            return self.error
+        return "\n".join(self.texts[i] for i in np.argsort(self.order, kind="stable"))
+
+    def subset(self, mask):
+        """按布尔掩码取子集，阅读顺序在子集内重新编号。"""
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return OcrResult(width=self.width, height=self.height)
+        rank = np.empty(idx.size, dtype=np.int32)
+        rank[np.argsort(self.order[idx], kind="stable")] = np.arange(idx.size, dtype=np.int32)
+        return OcrResult(self.boxes[idx], [self.texts[i] for i in idx], self.scores[idx],
+                         self.width, self.height, order=rank)
+
+    def transformed(self, scale=1.0, offset=(0.0, 0.0)):
+        """框坐标先乘 scale 再平移 offset (dx, dy)，返回新结果（缩小 / 裁剪后识别时映射回原图）。"""
+        boxes = self.boxes * np.float32(scale) + np.asarray(offset, dtype=np.float32)
+        return OcrResult(boxes, self.texts, self.scores, self.width, self.height, order=self.order, error=self.error)
+
+    def in_region(self, x, y, w, h, min_overlap=REGION_MIN_OVERLAP):
+        """区域再查询：返回文本框面积至少 min_overlap 落在 (x, y, w, h) 内的行组成的新结果。"""
+        if not len(self):
+            return OcrResult(width=self.width, height=self.height, error=self.error)
+        x0, y0 = self.boxes[:, :, 0].min(axis=1), self.boxes[:, :, 1].min(axis=1)
+        x1, y1 = self.boxes[:, :, 0].max(axis=1), self.boxes[:, :, 1].max(axis=1)
+        ix = np.clip(np.minimum(x1, x + w) - np.maximum(x0, x), 0, None)
+        iy = np.clip(np.minimum(y1, y + h) - np.maximum(y0, y), 0, None)
+        area = np.maximum((x1 - x0) * (y1 - y0), 1e-6)
+        return self.subset(ix * iy / area >= min_overlap)
+
+    def to_dict(self):
+        """供前端 / 缓存使用的 dict（lines 按阅读顺序）。"""
+        return {
+            "width": self.width,
+            "height": self.height,
+            "error": self.error,
+            "text": self.text,
+            "lines": [ln.to_dict() for ln in self.lines],
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_dict(cls, data):
+        lines = data.get("lines") or []
+        return cls(
+            [ln["box"] for ln in lines],
+            [ln["text"] for ln in lines],
+            [ln["score"] for ln in lines],
+            data.get("width", 0),
+            data.get("height", 0),
+            order=[ln["index"] for ln in lines] if lines else None,
+            error=data.get("error"),
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
+
+    def __repr__(self):
+        status = f"error={self.error!r}" if self.error else f"{len(self)} 行"
+        return f"OcrResult({self.width}x{self.height}, {status})"
+
+
+def _iou(a, b):
+    """两组外接矩形 (x0, y0, x1, y1) 的 IoU 矩阵。"""
+    ix = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    iy = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = ix * iy
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def _extents(boxes):
+    return np.stack([boxes[:, :, 0].min(axis=1), boxes[:, :, 1].min(axis=1),
+                     boxes[:, :, 0].max(axis=1), boxes[:, :, 1].max(axis=1)], axis=1)
+
+
+def merge_bands(bands, width, height):
+    """
+    合并分块识别结果。bands 为 [(OcrResult, y_offset, keep_top, keep_bottom)]，
+    keep_top / keep_bottom 为该块「负责」的全图纵向范围（相邻块以重叠区中线为界）。
+    - 框平移回全图坐标，只保留纵向中心落在负责范围内的行：完整落在重叠区的行只算一次，
+      被块边缘截断的行（行高不超过重叠高度时）由另一块中完整的那一份负责
+    - 中心恰好贴着分界线、在两块中各被保留的同一行，按「文本相同且 IoU 高」再去重，保留置信度高的
+    任一块失败时返回该块的错误。
+    """
+    boxes, texts, scores, band_ids = [], [], [], []
+    for k, (result, dy, keep_top, keep_bottom) in enumerate(bands):
+        if result.error:
+            return OcrResult.failed(result.error, width, height)
+        if not len(result):
+            continue
+        b = result.boxes.copy()
+        b[:, :, 1] += dy
+        ys = b[:, :, 1]
+        centers = (ys.min(axis=1) + ys.max(axis=1)) / 2
+        for i in np.flatnonzero((centers >= keep_top) & (centers < keep_bottom)):
+            boxes.append(b[i])
+            texts.append(result.texts[i])
+            scores.append(float(result.scores[i]))
+            band_ids.append(k)
+    if not texts:
+        return OcrResult(width=width, height=height)
+    boxes = np.asarray(boxes, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    band_ids = np.asarray(band_ids)
+    keep = np.ones(len(texts), dtype=bool)
+    ext = _extents(boxes)
+    for k in np.unique(band_ids)[:-1]:
+        a = np.flatnonzero(band_ids == k)
+        b = np.flatnonzero(band_ids == k + 1)
+        if a.size == 0 or b.size == 0:
+            continue
+        iou = _iou(ext[a], ext[b])
+        for ia, ib in zip(*np.nonzero(iou > SEAM_DUPLICATE_IOU)):
+            i, j = a[ia], b[ib]
+            if keep[i] and keep[j] and texts[i] == texts[j]:
+                keep[j if scores[i] >= scores[j] else i] = False
+    idx = np.flatnonzero(keep)
+    return OcrResult(boxes[idx], [texts[i] for i in idx], scores[idx], width, height)
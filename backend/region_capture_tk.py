@@ -4,13 +4,13 @@
 类似微信截图。使用 tkinter（Python 自带）。
 在子进程中运行 tk，避免与 pywebview 主线程冲突。
 """
-import base64
-import io
 import sys
 import multiprocessing
 
 from PIL import ImageGrab
 
+from backend.image_codec import to_data_url
+
 
 def _run_and_put(queue: multiprocessing.Queue) -> None:
     """供子进程调用，将结果放入 queue。"""
@@ -26,17 +26,18 @@ def run_region_capture() -> str:
     return url or ""
 
 
-def run_region_capture_with_rect():
+def run_region_capture_with_rect(return_image=False):
     """
     显示全屏选区窗口，用户拖拽画矩形，松开后截取该区域。
     返回 (data_url, rect)：
-      - data_url: data:image/png;base64,... 或空字符串
+      - data_url: data:image/png;base64,... 或空字符串；return_image=True 时为 PIL Image 或 None（不做 PNG 编码）
       - rect: (left, top, right, bottom) 屏幕坐标，取消时为 None
     """
+    empty = None if return_image else ""
     try:
         import tkinter as tk
     except ImportError:
-        return "", None
+        return empty, None
 
     result = [None]  # data_url
     result_rect = [None]  # (left, top, right, bottom)
@@ -97,10 +98,10 @@ def run_region_capture_with_rect():
                 box = (sx1, sy1, sx2, sy2)
                 result_rect[0] = box
                 img = ImageGrab.grab(bbox=box)
-                buf = io.BytesIO()
-                img.save(buf, format="PNG")
-                b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-                result[0] = f"data:image/png;base64,{b64}"
+                if return_image:
+                    result[0] = img
+                else:
+                    result[0] = to_data_url(img)
         except Exception:
             pass
         # 延迟退出，让当前事件处理完再 quit/destroy，否则 mainloop 可能不退出
@@ -129,6 +130,8 @@ def run_region_capture_with_rect():
 
     root.after(100, root.focus_set)
     root.mainloop()
+    if return_image:
+        return result[0], result_rect[0]
     return (result[0] or "", result_rect[0])
 
 
@@ -2,12 +2,12 @@
 """
 截图功能：全屏截图、区域选择截图，返回 PIL Image 或 base64。
 """
-import base64
-import io
 import sys
 
 from PIL import ImageGrab
 
+from backend.image_codec import to_data_url
+
 
 def _get_scale_factor():
     """Windows 高 DPI 缩放因子（可选，后续可改为从 Qt 获取）。"""
@@ -38,19 +38,13 @@ class ScreenshotHandler:
     def capture_full_base64(self) -> str:
         """全屏截图，返回 data:image/png;base64,..."""
         img = self.capture_full_pil()
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-        return f"data:image/png;base64,{b64}"
+        return to_data_url(img)
 
     def capture_region_base64(self, x1: int, y1: int, x2: int, y2: int) -> str:
         """指定矩形区域截图，返回 data URL。坐标可为屏幕坐标。"""
         box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
         img = ImageGrab.grab(bbox=box)
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-        return f"data:image/png;base64,{b64}"
+        return to_data_url(img)
 
     def start_region_capture(self):
         """
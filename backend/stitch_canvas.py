@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+长截图拼接画布：预分配、按几何倍数扩容的行缓冲区。
+每次追加只拷贝新增的行（均摊 O(新增行数)），避免 vstack / Image.new + paste 每帧整图复制。
+"""
+import numpy as np
+
+# 初始容量（按首帧高度的倍数）
+INITIAL_CAPACITY_FRAMES = 4
+# 容量不足时的扩容倍数
+GROWTH_FACTOR = 1.5
+
+
+class StitchCanvas:
+    """
+    可增长的拼接画布，行优先存储 (H, W, C) uint8。
+    - append(rows): 追加新行，返回新行在长图中的起始 y
+    - tail(n): 末尾 n 行的零拷贝视图（用于模板匹配）
+    - view(): 当前全部内容的零拷贝视图
+    - finish(): 结束拼接，返回裁剪到实际高度的最终图像
+    """
+
+    def __init__(self, width, channels=3, dtype=np.uint8, initial_rows=0):
+        self._width = int(width)
+        self._channels = int(channels)
+        self._buf = np.empty((max(int(initial_rows), 1), self._width, self._channels), dtype=dtype)
+        self._height = 0
+        self.grow_count = 0  # 扩容次数（调试/统计用）
+
+    @classmethod
+    def from_frame(cls, frame):
+        """以首帧建画布，初始容量为首帧高度的 INITIAL_CAPACITY_FRAMES 倍。"""
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
+        h, w, c = frame.shape
+        canvas = cls(w, c, frame.dtype, initial_rows=h * INITIAL_CAPACITY_FRAMES)
+        canvas.append(frame)
+        return canvas
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def shape(self):
+        return (self._height, self._width, self._channels)
+
+    @property
+    def capacity(self):
+        return self._buf.shape[0]
+
+    def _reserve(self, rows):
+        """保证至少能容纳 rows 行，不足时按 GROWTH_FACTOR 扩容（只拷贝已用部分）。"""
+        if rows <= self._buf.shape[0]:
+            return
+        new_cap = max(rows, int(self._buf.shape[0] * GROWTH_FACTOR) + 1)
+        buf = np.empty((new_cap,) + self._buf.shape[1:], dtype=self._buf.dtype)
+        buf[:self._height] = self._buf[:self._height]
+        self._buf = buf
+        self.grow_count += 1
+
+    def append(self, rows):
+        """追加新行 (n, W, C)，返回这些行在长图中的起始 y。"""
+        if rows.ndim == 2:
+            rows = rows[:, :, None]
+        if rows.shape[1:] != self._buf.shape[1:]:
+            raise ValueError(f"行尺寸不匹配: {rows.shape[1:]} != {self._buf.shape[1:]}")
+        start = self._height
+        n = rows.shape[0]
+        self._reserve(start + n)
+        self._buf[start:start + n] = rows
+        self._height = start + n
+        return start
+
+    def tail(self, n):
+        """末尾 n 行的零拷贝视图（n 超过当前高度时返回全部）。"""
+        n = min(int(n), self._height)
+        return self._buf[self._height - n:self._height]
+
+    def rows(self, start, stop=None):
+        """[start, stop) 行的零拷贝视图。"""
+        stop = self._height if stop is None else min(stop, self._height)
+        return self._buf[start:stop]
+
+    def view(self):
+        """当前全部内容的零拷贝视图；后续 append 扩容后该视图不再跟随更新。"""
+        return self._buf[:self._height]
+
+    def finish(self):
+        """
+        结束拼接，返回最终图像（一次性物化）。
+        容量富余不多时直接返回视图，否则拷贝一份紧凑数组并释放大缓冲区。
+        """
+        if self._buf.shape[0] - self._height > self._height // 4:
+            self._buf = self._buf[:self._height].copy()
+        return self._buf[:self._height]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试共用的合成数据：模拟「文档页面」与用户手动滚动时连续截到的帧。
+不依赖屏幕与 OpenCV，只用 NumPy 生成，保证结果可复现。
+"""
+import numpy as np
+
+
+def make_document(width, height, seed=0):
+    """
+    生成一张类文档长图（RGB uint8）：白底 + 随机长度的「文字行」色块 + 少量插图块。
+    每行内容都不同，便于重叠匹配有唯一解。
+    """
+    rng = np.random.default_rng(seed)
+    doc = np.full((height, width, 3), 250, dtype=np.uint8)
+    y = 8
+    while y < height - 24:
+        line_h = int(rng.integers(10, 22))
+        if rng.random() < 0.08:
+            # 插图块：带噪声的彩色矩形
+            block_h = int(rng.integers(60, 160))
+            x0 = int(rng.integers(0, width // 3))
+            x1 = int(rng.integers(width // 2, width))
+            y1 = min(y + block_h, height)
+            color = rng.integers(40, 220, size=3)
+            noise = rng.integers(-20, 20, size=(y1 - y, x1 - x0, 1))
+            doc[y:y1, x0:x1] = np.clip(color + noise, 0, 255).astype(np.uint8)
+            y = y1 + 12
+            continue
+        x = int(rng.integers(8, 40))
+        end = int(rng.integers(width // 3, width - 8))
+        while x < end:
+            word_w = int(rng.integers(12, 80))
+            shade = int(rng.integers(0, 90))
+            doc[y:y + line_h, x:min(x + word_w, end)] = shade
+            x += word_w + int(rng.integers(6, 14))
+        y += line_h + int(rng.integers(6, 16))
+    return doc
+
+
+def scroll_frames(doc, frame_h, steps, seed=0, step_range=(0.05, 0.45)):
+    """
+    按随机滚动步长从 doc 上截取连续帧，返回 [(frame, top_y), ...]。
+    steps: 帧数；每次滚动 step_range 帧高（默认 5%~45%），偶尔不滚动（模拟用户停顿）。
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    y = 0
+    max_y = doc.shape[0] - frame_h
+    for _ in range(steps):
+        frames.append((np.ascontiguousarray(doc[y:y + frame_h]), y))
+        if rng.random() < 0.15:
+            continue
+        y = min(y + int(frame_h * rng.uniform(*step_range)), max_y)
+        if y >= max_y:
+            break
+    return frames
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+基准：AI 分析结果缓存与请求合并（backend/ai_cache.py、AiStreamManager），对本地模拟服务离线运行。
+- 首次分析：真实请求上游
+- 同一文本 + 提示词再次分析：缓存回放（内存层 / 重启后的磁盘层）
+- N 个相同请求同时发起：合并为一个上游请求，所有订阅者拿到完整且一致的回答
+输出各场景的首字耗时、完成耗时与上游请求数。
+
+用法：python benchmarks/bench_ai_cache.py [--tokens 2000] [--concurrent 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.ai_analysis import AiStreamManager, build_payload, request_key, stream_completion
+from backend.ai_cache import AiResponseCache
+from backend.llm_client import LlmClient, LlmConfig
+from mock_llm_server import start_mock_server
+
+TEXT = "\n".join(f"第 {i} 行 OCR 文本" for i in range(50))
+PROMPT = "总结上述文字的主要内容"
+
+
+def analyze(stream, cache, count=1):
+    """同时发起 count 个相同请求，等全部结束，返回每个的 (首字耗时, 完成耗时, 回答, 是否缓存)。"""
+    done = threading.Event()
+    results, lock = {}, threading.Lock()
+    t0 = time.perf_counter()
+
+    def on_event(event):
+        with lock:
+            r = results.setdefault(event["stream_id"], {"first": None, "parts": []})
+            if event["type"] == "delta":
+                if r["first"] is None:
+                    r["first"] = time.perf_counter() - t0
+                r["parts"].append(event["delta"])
+            else:
+                r["end"] = time.perf_counter() - t0
+                r["content"] = event.get("content")
+                r["cached"] = event.get("cached")
+                if sum("end" in x for x in results.values()) == count:
+                    done.set()
+
+    manager = AiStreamManager(on_event, stream=stream, cache=cache)
+    for _ in range(count):
+        manager.start(build_payload(TEXT, PROMPT), key=request_key(TEXT, PROMPT, model="mock"))
+    done.wait(120)
+    return [(r["first"], r["end"], "".join(r["parts"]), r["cached"]) for r in results.values()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--concurrent", type=int, default=5)
+    args = parser.parse_args()
+
+    server, url = start_mock_server(tokens=args.tokens, ttft=args.ttft, token_delay=args.token_delay)
+    client = LlmClient(LlmConfig(url=url, api_key="mock", model="mock"))
+    stream = lambda payload, cancel: stream_completion(payload, cancel, client)
+    options = server.options
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "ai_cache.sqlite3")
+        try:
+            print(f"{'场景':<28}{'首字':>10}{'完成':>10}{'上游请求':>10}{'缓存':>6}")
+
+            def row(name, results, before):
+                first = max(r[0] for r in results)
+                end = max(r[1] for r in results)
+                cached = "是" if all(r[3] for r in results) else "否"
+                print(f"{name:<28}{first * 1000:>7.0f} ms{end * 1000:>7.0f} ms{options.requests - before:>10}{cached:>6}")
+
+            cache = AiResponseCache(disk_path=db)
+            before = options.requests
+            cold = analyze(stream, cache)
+            row("首次分析", cold, before)
+            before = options.requests
+            row("再次分析（内存层）", analyze(stream, cache), before)
+
+            before = options.requests
+            row("重启后再次分析（磁盘层）", analyze(stream, AiResponseCache(disk_path=db)), before)
+
+            before = options.requests
+            results = analyze(stream, None, args.concurrent)
+            row(f"{args.concurrent} 个相同请求同时发起", results, before)
+            consistent = len({r[2] for r in results}) == 1 and results[0][2] == cold[0][2]
+            print(f"\n合并请求的回答一致：{'是' if consistent else '否'}")
+        finally:
+            client.close()
+            server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+基准：长文本 AI 分析，整段单请求 vs 按 OCR 行分块 map-reduce（backend/ai_chunking.py），对本地模拟服务离线运行。
+模拟服务按输入字数增加首 token 等待（--prefill-per-kchar），输入超过 --max-input-chars 时返回 400（上下文超长）。
+- 单请求（不限长度）：首字耗时与完成耗时
+- 单请求（有上下文上限）：是否失败
+- 分块：经 AiStreamManager 推送的各阶段进度、汇总首字耗时与完成耗时、各请求输入字数
+输出各方式的首字 / 完成耗时与上游请求数。
+
+用法：python benchmarks/bench_ai_chunking.py [--lines 2000] [--workers 4] [--budget 3000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.ai_analysis import AiStreamManager, build_payload, describe_error, stream_completion
+from backend.ai_chunking import estimate_tokens, map_reduce_stream, split_lines
+from backend.llm_client import LlmClient, LlmConfig
+from mock_llm_server import start_mock_server
+
+PROMPT = "总结上述文字的主要内容"
+
+
+def make_text(lines):
+    """模拟长截图 OCR 结果：每行一条聊天 / 文章内容。"""
+    return "\n".join(f"第 {i} 行：长截图识别出的文字内容，包含若干中文与 ASCII text {i}" for i in range(lines))
+
+
+def single(client, text):
+    """整段单请求，返回 (首字耗时, 完成耗时, 错误)。"""
+    t0 = time.perf_counter()
+    first = None
+    try:
+        for _ in stream_completion(build_payload(text, PROMPT), client=client):
+            if first is None:
+                first = time.perf_counter() - t0
+    except Exception as e:
+        return first, time.perf_counter() - t0, describe_error(e).splitlines()[0]
+    return first, time.perf_counter() - t0, None
+
+
+def chunked(client, text, budget, workers):
+    """经 AiStreamManager 分块分析，返回 (首字耗时, 完成耗时, 错误, 进度事件列表)。"""
+    done = threading.Event()
+    result = {"first": None, "progress": [], "error": None}
+    t0 = time.perf_counter()
+
+    def on_event(event):
+        now = time.perf_counter() - t0
+        if event["type"] == "progress":
+            result["progress"].append((now, event["stage"], event["done"], event["total"]))
+        elif event["type"] == "delta":
+            if result["first"] is None:
+                result["first"] = now
+        else:
+            result["end"] = now
+            result["error"] = event.get("error")
+            done.set()
+
+    manager = AiStreamManager(on_event)
+    manager.start(None, stream=lambda _, cancel, progress: map_reduce_stream(
+        text, PROMPT, cancel=cancel, progress=progress, client=client, budget=budget, workers=workers))
+    done.wait(600)
+    return result["first"], result.get("end"), result["error"], result["progress"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=2000, help="OCR 文本行数")
+    parser.add_argument("--budget", type=int, default=3000, help="每块 token 预算")
+    parser.add_argument("--workers", type=int, default=4, help="并发分块请求数")
+    parser.add_argument("--tokens", type=int, default=100, help="每次回答的 token 数")
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--prefill-per-kchar", type=float, default=0.15, help="每 1000 字输入增加的首 token 等待（秒）")
+    parser.add_argument("--max-input-chars", type=int, default=32000, help="模拟的上下文上限（字）")
+    args = parser.parse_args()
+
+    text = make_text(args.lines)
+    chunks = split_lines(text, args.budget)
+    print(f"文本 {args.lines} 行 / {len(text)} 字 / 估算 {estimate_tokens(text)} token，"
+          f"按 {args.budget} token 切成 {len(chunks)} 块")
+
+    server, url = start_mock_server(tokens=args.tokens, ttft=args.ttft, token_delay=args.token_delay,
+                                    prefill_per_kchar=args.prefill_per_kchar)
+    client = LlmClient(LlmConfig(url=url, api_key="mock", model="mock", max_connections=args.workers))
+    options = server.options
+    try:
+        print(f"\n{'方式':<26}{'首字':>10}{'完成':>10}{'上游请求':>10}  结果")
+
+        def row(name, first, end, error, before):
+            first = f"{first:>8.2f} s" if first is not None else f"{'-':>10}"
+            end = f"{end:>8.2f} s" if end is not None else f"{'-':>10}"
+            print(f"{name:<26}{first}{end}{options.requests - before:>10}  {error or '成功'}")
+
+        before = options.requests
+        row("整段单请求（不限长度）", *single(client, text), before)
+
+        options.max_input_chars = args.max_input_chars
+        before = options.requests
+        row(f"整段单请求（上限 {args.max_input_chars} 字）", *single(client, text), before)
+
+        before = options.requests
+        first, end, error, progress = chunked(client, text, args.budget, args.workers)
+        row(f"分块 map-reduce（{args.workers} 并发）", first, end, error, before)
+        sizes = options.input_chars[before:]
+
+        print("\n进度事件：")
+        for at, stage, done, total in progress:
+            print(f"  {at:>6.2f} s  {stage:<9}{done}/{total}")
+        print(f"\n各请求输入字数：最大 {max(sizes)}，最小 {min(sizes)}（上限 {args.max_input_chars}）")
+    finally:
+        client.close()
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+基准：AI 分析整段返回 vs 边收边推（backend/ai_analysis.py），对本地模拟服务（mock_llm_server.py）离线运行。
+- 整段返回：旧行为，收完全部 token 才有第一屏文字
+- 流式推送：AiStreamManager 首个片段到达即推送，记录前端可见首字时间、推送次数与完成时间
+- 取消：首字后立即取消，记录从取消到收到 cancelled 事件的耗时
+
+用法：python benchmarks/bench_ai_stream.py [--tokens 2000] [--ttft 0.3] [--token-delay 0.005] [--runs 3]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.ai_analysis import AiStreamManager, build_payload, stream_completion
+from backend.llm_client import LlmClient, LlmConfig
+from mock_llm_server import start_mock_server
+
+TEXT = "第 1 行 OCR 文本\n第 2 行 OCR 文本"
+
+
+def run_buffered(client):
+    t0 = time.perf_counter()
+    content = "".join(stream_completion(build_payload(TEXT), client=client))
+    elapsed = time.perf_counter() - t0
+    return {"first": elapsed, "total": elapsed, "pushes": 1, "length": len(content)}
+
+
+def run_streaming(client, cancel_after_first=False):
+    events, done = [], threading.Event()
+    t0 = time.perf_counter()
+
+    def on_event(event):
+        events.append((time.perf_counter() - t0, event))
+        if event["type"] != "delta":
+            done.set()
+        elif cancel_after_first and len(events) == 1:
+            # 模拟前端点击「停止」：从另一个线程取消
+            threading.Thread(target=manager.cancel, args=(event["stream_id"],)).start()
+
+    manager = AiStreamManager(on_event, stream=lambda payload, cancel: stream_completion(payload, cancel, client))
+    manager.start(build_payload(TEXT))
+    done.wait(120)
+    deltas = [(t, e) for t, e in events if e["type"] == "delta"]
+    last_t, last = events[-1]
+    return {
+        "first": deltas[0][0] if deltas else float("nan"),
+        "total": last_t,
+        "pushes": len(deltas),
+        "length": sum(len(e["delta"]) for _, e in deltas),
+        "type": last["type"],
+        "cancel_latency": last_t - deltas[0][0] if cancel_after_first and deltas else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    server, url = start_mock_server(tokens=args.tokens, ttft=args.ttft, token_delay=args.token_delay)
+    client = LlmClient(LlmConfig(url=url, api_key="mock"))
+    try:
+        print(f"模拟服务：{args.tokens} token，首 token {args.ttft:.2f}s，之后每 token {args.token_delay * 1000:.1f} ms")
+        print(f"{'方式':<12}{'首屏文字':>12}{'完成':>10}{'推送次数':>10}{'字符数':>10}")
+        for name, run in (("整段返回", run_buffered), ("流式推送", run_streaming)):
+            for _ in range(args.runs):
+                r = run(client)
+                print(f"{name:<12}{r['first']:>10.3f} s{r['total']:>8.2f} s{r['pushes']:>10}{r['length']:>10}")
+        r = run_streaming(client, cancel_after_first=True)
+        print(f"\n首字后取消：结束事件 {r['type']}，取消生效耗时 {r['cancel_latency'] * 1000:.0f} ms")
+    finally:
+        client.close()
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
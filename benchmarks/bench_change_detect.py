@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+基准：backend/frame_change.py 各帧变化检测器的成本与准确度。
+- 成本：1080p / 4K 单帧签名耗时 + 签名比较耗时
+- 准确度：合成滚动序列上的误判率
+    误报（FP）：未滚动的帧对（完全相同 / 光标闪烁 / 轻微噪声）被判为「有变化」
+    漏报（FN）：滚动了 1~64 px 的帧对被判为「几乎相同」（会丢内容）
+
+用法：python benchmarks/bench_change_detect.py [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from backend.frame_change import get_change_detector
+from _synthetic import make_document
+
+CONFIGS = [
+    ("row_hash", {}),
+    ("row_hash", {"rows": 16}),
+    ("phash", {}),
+    ("phash", {"hash_size": 16}),
+    ("absdiff", {}),
+    ("absdiff", {"stride": 8}),
+    ("absdiff", {"stride": 1}),
+]
+SCROLL_STEPS = (1, 2, 4, 8, 16, 64)
+
+
+def _legacy_same(a, b, threshold=0.98):
+    """旧实现：整帧转 int32 求绝对差，作为成本对照。"""
+    diff = np.sum(np.abs(a.astype(np.int32) - b.astype(np.int32)))
+    return 1.0 - diff / (a.size * 255) >= threshold
+
+
+def make_pairs(width, height, seed=0):
+    """返回 (静止帧对列表, 滚动帧对列表)，帧为 BGR uint8。"""
+    rng = np.random.default_rng(seed)
+    doc = make_document(width, height * 3, seed=seed)
+    base = np.ascontiguousarray(doc[height:2 * height])
+    static = [(base, base.copy())]
+    # 光标闪烁：一个 2x18 的竖条出现/消失
+    blink = base.copy()
+    blink[height // 2:height // 2 + 18, width // 3:width // 3 + 2] = 0
+    static.append((base, blink))
+    # 轻微噪声（如缩放/压缩带来的 ±2 抖动）
+    noise = np.clip(base.astype(np.int16) + rng.integers(-2, 3, size=base.shape), 0, 255).astype(np.uint8)
+    static.append((base, noise))
+    scrolled = [(base, np.ascontiguousarray(doc[height + k:2 * height + k])) for k in SCROLL_STEPS]
+    return static, scrolled
+
+
+def time_it(fn, repeat):
+    fn()  # 预热
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    sizes = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+    data = {label: make_pairs(w, h) for label, (w, h) in sizes.items()}
+
+    print(f"{'检测器':<28}{'1080p 签名':>12}{'4K 签名':>12}{'比较':>10}{'误报':>8}{'漏报':>8}")
+    for name, opts in CONFIGS:
+        det = get_change_detector(name, **opts)
+        label = name + (" " + ",".join(f"{k}={v}" for k, v in opts.items()) if opts else "")
+        costs = []
+        for size in sizes:
+            frame = data[size][0][0][0]
+            costs.append(time_it(lambda: det.signature(frame), args.repeat))
+        sig = det.signature(data["1080p"][0][0][0])
+        cmp_ms = time_it(lambda: det.same(sig, sig), args.repeat)
+        fp = fn = total_static = total_scroll = 0
+        for static, scrolled in data.values():
+            for a, b in static:
+                total_static += 1
+                fp += not det.frames_same(a, b)
+            for a, b in scrolled:
+                total_scroll += 1
+                fn += det.frames_same(a, b)
+        print(f"{label:<30}{costs[0]:>9.2f} ms{costs[1]:>9.2f} ms{cmp_ms:>7.3f} ms"
+              f"{fp:>5}/{total_static}{fn:>5}/{total_scroll}")
+
+    for size, (static, _) in data.items():
+        a, b = static[0]
+        print(f"旧实现（整帧 int32）{size}: {time_it(lambda: _legacy_same(a, b), max(1, args.repeat // 4)):.2f} ms / 次比较")
+
+
+if __name__ == "__main__":
+    main()
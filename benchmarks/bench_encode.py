@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+基准：backend/image_codec.py 截图编码的耗时与体积。
+- 旧实现：PIL 默认 PNG（compress_level=6）
+- PNG compress_level=1 单线程 / 多线程分块
+- JPEG / WebP 预览
+- 缓存命中（同一张图重复取用）
+
+用法：python benchmarks/bench_encode.py [--repeat 5] [--workers 4]
+"""
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from PIL import Image
+
+from backend import image_codec
+from _synthetic import make_document
+
+
+def _legacy_png(img):
+    """旧实现：img.save(format="PNG") + base64。"""
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue())
+
+
+def time_it(fn, repeat):
+    out = fn()  # 预热
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4, help="多线程 PNG 的分块数")
+    args = parser.parse_args()
+
+    sizes = {"1080p": (1920, 1080), "4K": (3840, 2160), "长图 1080x8000": (1080, 8000)}
+    print(f"{'编码方式':<30}" + "".join(f"{label:>24}" for label in sizes))
+    images = {}
+    for label, (w, h) in sizes.items():
+        doc = make_document(w, h, seed=1)
+        images[label] = Image.fromarray(np.ascontiguousarray(doc[:, :, ::-1]))
+
+    cases = [
+        ("旧实现 PNG level 6 + base64", lambda img: _legacy_png(img)),
+        ("PNG level 1", lambda img: image_codec.encode_image(img, threaded=False, use_cache=False)),
+        (f"PNG level 1 多线程 x{args.workers}",
+         lambda img: image_codec._encode_png_threaded(img, image_codec.PNG_COMPRESS_LEVEL, args.workers)),
+        ("JPEG q85", lambda img: image_codec.encode_image(img, "jpeg", use_cache=False)),
+        ("WebP q85", lambda img: image_codec.encode_image(img, "webp", use_cache=False)),
+        ("to_data_url（缓存命中）", lambda img: image_codec.to_data_url(img)),
+    ]
+    for name, fn in cases:
+        cells = []
+        for img in images.values():
+            ms, out = time_it(lambda: fn(img), args.repeat)
+            size = len(out) / 1024
+            cells.append(f"{ms:>9.1f} ms {size:>8.0f} KB")
+        print(f"{name:<30}" + "".join(f"{c:>24}" for c in cells))
+    print(f"编码缓存: {image_codec.encode_cache_stats()}")
+    print(f"（本机 CPU 数 {os.cpu_count()}，自动多线程阈值 {image_codec.THREADED_ENCODE_MIN_PIXELS} 像素）")
+
+
+if __name__ == "__main__":
+    main()
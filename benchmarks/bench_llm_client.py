@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+基准：AI 接口请求延迟，每次新建连接（旧 urllib 方式）vs LlmClient 长连接池（backend/llm_client.py）。
+对本地模拟服务（mock_llm_server.py）离线运行，用 --connect-delay 模拟远端建连（DNS / TCP / TLS）耗时。
+- 顺序请求：首字节耗时与完整耗时的平均值 / p95、服务端新建连接数
+- 并发请求：--concurrency 个线程同时发请求，连接池并发上限 --max-connections
+- 重试：前两个请求返回 503，统计重试后成功的耗时
+
+用法：python benchmarks/bench_llm_client.py [--requests 20] [--connect-delay 0.08] [--concurrency 8]
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from backend.ai_analysis import build_payload
+from backend.llm_client import LlmClient, LlmConfig, iter_sse_content
+from mock_llm_server import start_mock_server
+
+TEXT = "第 1 行 OCR 文本\n第 2 行 OCR 文本"
+
+
+def urllib_stream(url):
+    """旧实现：每次 urllib.request.urlopen 新建连接。返回 (首字节耗时, 完整耗时)。"""
+    t0 = time.perf_counter()
+    req = urllib.request.Request(url, data=json.dumps({**build_payload(TEXT), "stream": True}).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    first = None
+    with urllib.request.urlopen(req, timeout=120) as response:
+        for _ in iter_sse_content(response):
+            if first is None:
+                first = time.perf_counter() - t0
+    return first, time.perf_counter() - t0
+
+
+def pooled_stream(client):
+    t0 = time.perf_counter()
+    first = None
+    for _ in client.stream_chat(build_payload(TEXT)):
+        if first is None:
+            first = time.perf_counter() - t0
+    return first, time.perf_counter() - t0
+
+
+def report(name, samples, connections):
+    first = np.array([s[0] for s in samples]) * 1000
+    total = np.array([s[1] for s in samples]) * 1000
+    print(f"{name:<24}{first.mean():>9.1f}{np.percentile(first, 95):>9.1f}"
+          f"{total.mean():>9.1f}{np.percentile(total, 95):>9.1f}{connections:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--connect-delay", type=float, default=0.08, help="模拟每个新连接的建连耗时（秒）")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-connections", type=int, default=4)
+    args = parser.parse_args()
+
+    server, url = start_mock_server(tokens=args.tokens, ttft=args.ttft, token_delay=0.001,
+                                    connect_delay=args.connect_delay)
+    client = LlmClient(LlmConfig(url=url, api_key="mock", max_connections=args.max_connections))
+    options = server.options
+    try:
+        print(f"模拟服务：首 token {args.ttft * 1000:.0f} ms，建连 {args.connect_delay * 1000:.0f} ms，"
+              f"{args.requests} 次请求（单位 ms）")
+        print(f"{'方式':<24}{'首字节':>9}{'p95':>9}{'完整':>9}{'p95':>9}{'新连接':>8}")
+        for name, run in (("urllib 每次新建", lambda: urllib_stream(url)), ("LlmClient 长连接", lambda: pooled_stream(client))):
+            before = options.connections
+            samples = [run() for _ in range(args.requests)]
+            report(name, samples, options.connections - before)
+
+        for name, run in (("urllib 并发", lambda: urllib_stream(url)), ("LlmClient 并发", lambda: pooled_stream(client))):
+            before = options.connections
+            t0 = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(args.concurrency) as pool:
+                samples = list(pool.map(lambda _: run(), range(args.requests)))
+            wall = time.perf_counter() - t0
+            report(f"{name}（{wall:.2f}s）", samples, options.connections - before)
+
+        options.fail_first = options.requests + 2
+        retries = client.retries
+        t0 = time.perf_counter()
+        content = "".join(client.stream_chat(build_payload(TEXT)))
+        print(f"\n前两次 503 后重试成功：{(time.perf_counter() - t0) * 1000:.0f} ms，"
+              f"重试 {client.retries - retries} 次，收到 {len(content)} 字符")
+    finally:
+        client.close()
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+基准：识别前图片加载的耗时与峰值内存（backend/image_io.py）。
+- 超长 PNG：旧路径「读入 bytes → BytesIO → PIL → convert('RGB') → np.array」vs image_io.decode_file
+- 多页 TIFF：一次性载入全部页 vs image_io.iter_frames 逐页流式
+- 端到端：OcrHandler.recognize_file_result（stub 后端、不缓存），含加载、分块 / 逐页识别与结果合并
+每种方式在单独子进程中运行，用 resource 统计峰值 RSS 增量（Linux / macOS）；
+测试文件也在子进程中生成，避免父进程的内存峰值被 fork 出的子进程继承。
+不需要 OCR 模型。
+
+用法：python benchmarks/bench_load_rss.py [--height 30000] [--pages 12]
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from PIL import Image
+
+WIDTH = 1080
+PAGE_SIZE = (2480, 3508)  # A4 @ 300 DPI
+
+
+def make_files(tmp, height, pages, seed=0):
+    """生成测试文件：带噪点的超长 PNG（避免压缩率过高）与多页 TIFF。"""
+    rng = np.random.default_rng(seed)
+    row = rng.integers(0, 255, (1, WIDTH, 3), dtype=np.uint8)
+    arr = np.repeat(row, height, axis=0)
+    arr[::7] = 255 - arr[::7]
+    png = os.path.join(tmp, "long.png")
+    Image.fromarray(arr).save(png, compress_level=1)
+    del arr
+    frames = [Image.fromarray(rng.integers(200, 255, (PAGE_SIZE[1], PAGE_SIZE[0], 3), dtype=np.uint8))
+              for _ in range(pages)]
+    tif = os.path.join(tmp, "pages.tif")
+    frames[0].save(tif, save_all=True, append_images=frames[1:], compression="raw")
+    return png, tif
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _legacy_decode(path):
+    with open(path, "rb") as f:
+        img = Image.open(io.BytesIO(f.read()))
+    return np.array(img.convert("RGB"))
+
+
+def _legacy_frames(path):
+    with Image.open(path) as img:
+        pages = []
+        for i in range(img.n_frames):
+            img.seek(i)
+            pages.append(np.array(img.convert("RGB")))
+    return pages
+
+
+def run_one(path, mode):
+    """子进程内加载一次，输出 JSON；每帧做一次求和，模拟交给引擎处理。"""
+    from backend import image_io
+    base_rss = _peak_rss_mb()
+    t0 = time.perf_counter()
+    checksum, frames = 0, 0
+    if mode == "ocr":
+        from backend.ocr_engine import OcrHandler
+        result = OcrHandler({"backend": "stub"}, cache=False).recognize_file_result(path)
+        if result.error:
+            raise RuntimeError(result.error)
+        checksum, frames = len(result.texts), "-"
+    elif mode == "legacy":
+        pages = _legacy_frames(path) if path.endswith(".tif") else [_legacy_decode(path)]
+        for arr in pages:
+            checksum += int(arr[::64, ::64].sum())
+            frames += 1
+    else:
+        source = image_io.iter_frames(path) if path.endswith(".tif") else [image_io.decode_file(path)]
+        for arr in source:
+            checksum += int(arr[::64, ::64].sum())
+            frames += 1
+            del arr
+    print(json.dumps({
+        "seconds": time.perf_counter() - t0,
+        "frames": frames,
+        "checksum": checksum,
+        "rss_mb": _peak_rss_mb() - base_rss,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--height", type=int, default=30000, help="超长 PNG 高度")
+    parser.add_argument("--pages", type=int, default=12, help="TIFF 页数")
+    parser.add_argument("--_child", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--_make", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._child:
+        run_one(*args._child)
+        return 0
+    if args._make:
+        make_files(args._make, args.height, args.pages)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run([sys.executable, __file__, "--height", str(args.height), "--pages", str(args.pages),
+                        "--_make", tmp], check=True, cwd=ROOT)
+        png, tif = os.path.join(tmp, "long.png"), os.path.join(tmp, "pages.tif")
+        print(f"{'文件':<12}{'方式':>8}{'大小(MB)':>10}{'耗时':>10}{'帧数':>6}{'峰值RSS增量':>14}")
+        for path in (png, tif):
+            size = os.path.getsize(path) / 1e6
+            checksums = set()
+            for mode in ("legacy", "image_io", "ocr"):
+                out = subprocess.run([sys.executable, __file__, "--_child", path, mode],
+                                     capture_output=True, text=True, cwd=ROOT)
+                try:
+                    r = json.loads(out.stdout.strip().splitlines()[-1])
+                except (ValueError, IndexError):
+                    print(f"{os.path.basename(path):<12}{mode:>8}  子进程失败: {out.stderr.strip()[-200:]}")
+                    continue
+                if mode != "ocr":
+                    checksums.add(r["checksum"])
+                print(f"{os.path.basename(path):<12}{mode:>8}{size:>10.1f}{r['seconds']:>8.2f} s"
+                      f"{r['frames']:>6}{r['rss_mb']:>11.0f} MB")
+            if len(checksums) > 1:
+                print(f"  警告：{os.path.basename(path)} 两种方式解码结果不一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+基准：比较 OCR 后端与 ONNX 会话配置（backend/ocr_backends.py），为本机挑出最快的 CPU 配置。
+固定图片集（固定随机种子合成）：1920x1080 截图若干张 + 1080x4000 长图一张。
+配置网格：后端 × intra-op 线程数 × inter-op 线程数 × enable_cpu_mem_arena × 图优化级别，
+每个配置在单独子进程中运行（线程池与内存池互不影响），统计：
+- 构建耗时、预热耗时
+- 逐张识别耗时的平均值 / p95（每张先跑一次丢弃，再计时 --repeat 次）
+- 识别行数（确认各配置结果一致）与进程峰值 RSS
+最后给出最快配置对应的 TOOLBOX_OCR_ENGINE 环境变量取值。
+
+rapidocr 后端需要安装 rapidocr_onnxruntime（pip install -r requirements-ocr.txt），未安装时只跑 stub。
+用法：python benchmarks/bench_ocr_backends.py [--backends rapidocr stub] [--intra 1 2 4] [--inter 1]
+      [--arena on off] [--graph all extended] [--repeat 3]
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+WORDS = ("screen capture stitch overlap template match render window buffer pixel scroll "
+         "long image text line score box engine cache thread queue frame canvas preview").split()
+
+
+def make_image_set(screens=4, seed=0):
+    """返回 RGB ndarray 列表：screens 张 1920x1080 截图 + 1 张 1080x4000 长图。"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for size in [(1920, 1080)] * screens + [(1080, 4000)]:
+        img = Image.new("RGB", size, (250, 250, 250))
+        draw = ImageDraw.Draw(img)
+        for y in range(24, size[1] - 32, 36):
+            if rng.random() < 0.3:
+                continue  # 留出空行，接近真实页面
+            text = " ".join(rng.choice(WORDS, size=int(rng.integers(4, 12))))
+            draw.text((int(rng.integers(16, 200)), y), text, fill=(20, 20, 20))
+        images.append(np.asarray(img))
+    return images
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_one(config, repeat):
+    """子进程内：构建后端、预热、逐张计时，输出 JSON。"""
+    from backend.ocr_backends import create_backend
+    images = make_image_set()
+    t0 = time.perf_counter()
+    try:
+        backend = create_backend(config)
+    except ImportError as e:
+        print(json.dumps({"error": f"未安装: {e}"}))
+        return
+    load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    backend.warm_up()
+    warm = time.perf_counter() - t0
+    times, lines = [], 0
+    for arr in images:
+        lines += len(backend.recognize(arr))  # 首次不计时
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            backend.recognize(arr)
+            times.append(time.perf_counter() - t0)
+    print(json.dumps({
+        "load": load,
+        "warm_up": warm,
+        "mean": float(np.mean(times)),
+        "p95": float(np.percentile(times, 95)),
+        "lines": lines,
+        "rss_mb": _peak_rss_mb(),
+    }))
+
+
+def build_configs(args):
+    configs = []
+    for backend in args.backends:
+        if backend == "stub":
+            configs.append({"backend": "stub"})
+            continue
+        for intra, inter, arena, graph in itertools.product(args.intra, args.inter, args.arena, args.graph):
+            configs.append({
+                "backend": backend,
+                "intra_op_num_threads": intra,
+                "inter_op_num_threads": inter,
+                "enable_cpu_mem_arena": arena == "on",
+                "graph_optimization_level": graph,
+            })
+    return configs
+
+
+def describe(config):
+    if config["backend"] == "stub":
+        return "stub"
+    return (f"{config['backend']} intra={config['intra_op_num_threads']} inter={config['inter_op_num_threads']} "
+            f"arena={'on' if config['enable_cpu_mem_arena'] else 'off'} graph={config['graph_optimization_level']}")
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=["rapidocr", "stub"])
+    parser.add_argument("--intra", type=int, nargs="+", default=sorted({1, min(2, cpus), min(4, cpus), cpus}))
+    parser.add_argument("--inter", type=int, nargs="+", default=[1])
+    parser.add_argument("--arena", nargs="+", choices=("on", "off"), default=["on", "off"])
+    parser.add_argument("--graph", nargs="+", choices=("disabled", "basic", "extended", "all"), default=["all"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--_child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._child:
+        run_one(json.loads(args._child), args.repeat)
+        return 0
+
+    print(f"{'配置':<58}{'构建':>8}{'预热':>8}{'平均':>10}{'p95':>10}{'行数':>7}{'峰值RSS':>10}")
+    results, missing = [], set()
+    for config in build_configs(args):
+        if config["backend"] in missing:
+            continue
+        out = subprocess.run(
+            [sys.executable, __file__, "--repeat", str(args.repeat), "--_child", json.dumps(config)],
+            capture_output=True, text=True, cwd=ROOT,
+        )
+        try:
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            print(f"{describe(config):<58}  子进程失败: {out.stderr.strip()[-200:]}")
+            continue
+        if r.get("error"):
+            print(f"{config['backend']:<58}  {r['error']}，跳过该后端")
+            missing.add(config["backend"])
+            continue
+        results.append((config, r))
+        print(f"{describe(config):<58}{r['load']:>7.2f}s{r['warm_up']:>7.2f}s{r['mean'] * 1000:>7.0f} ms"
+              f"{r['p95'] * 1000:>7.0f} ms{r['lines']:>7}{r['rss_mb']:>7.0f} MB")
+
+    real = [(c, r) for c, r in results if c["backend"] != "stub"]
+    if real:
+        best, r = min(real, key=lambda item: item[1]["mean"])
+        print(f"\n最快配置：{describe(best)}（平均 {r['mean'] * 1000:.0f} ms）")
+        value = json.dumps(best, separators=(",", ":"))
+        print(f"set TOOLBOX_OCR_ENGINE={value}" if sys.platform == "win32" else f"export TOOLBOX_OCR_ENGINE='{value}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+基准：OCR 前处理（backend/ocr_preprocess.py）对 4K 全屏截图的耗时与准确度影响。
+固定语料：若干张 3840x2160 合成「桌面截图」，大片空白 + 几块文字段落（固定随机种子），
+对比直接识别原图与各前处理配置：
+- 平均耗时
+- 准确度：实际文字行中被完整识别出来的比例，以及字符相似度（difflib）
+
+需要安装 rapidocr_onnxruntime（pip install -r requirements-ocr.txt）。
+用法：python benchmarks/bench_ocr_preprocess.py [--images 4] [--dpi 1.5]
+"""
+import argparse
+import difflib
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from backend.ocr_engine import OcrHandler, warm_up
+from backend.ocr_preprocess import PreprocessOptions
+
+WORDS = ("screen capture stitch overlap template match render window buffer pixel scroll "
+         "long image text line score box engine cache thread queue frame canvas preview").split()
+
+
+def make_corpus(count, size=(3840, 2160), seed=0, font_size=28):
+    """返回 [(PIL Image, [行文本])]：浅色背景，随机位置放 2~4 个文字段落。"""
+    rng = np.random.default_rng(seed)
+    font = ImageFont.load_default(size=font_size)
+    corpus = []
+    for _ in range(count):
+        img = Image.new("RGB", size, (246, 246, 248))
+        draw = ImageDraw.Draw(img)
+        lines = []
+        for _ in range(int(rng.integers(2, 5))):
+            x = int(rng.integers(80, size[0] // 2))
+            y = int(rng.integers(80, size[1] - 400))
+            for k in range(int(rng.integers(3, 8))):
+                text = " ".join(rng.choice(WORDS, size=int(rng.integers(3, 8))))
+                draw.text((x, y + k * int(font_size * 1.6)), text, fill=(30, 30, 30), font=font)
+                lines.append(text)
+        corpus.append((img, lines))
+    return corpus
+
+
+def score(result, truth):
+    """(完整命中行比例, 字符相似度)。"""
+    found = set(result.texts)
+    exact = sum(1 for t in truth if t in found) / max(len(truth), 1)
+    ratio = difflib.SequenceMatcher(None, " ".join(sorted(truth)), " ".join(sorted(result.texts))).ratio()
+    return exact, ratio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--dpi", type=float, default=1.5, help="模拟的显示缩放比例")
+    args = parser.parse_args()
+
+    if not warm_up():
+        print("rapidocr_onnxruntime 未安装，无法运行该基准", file=sys.stderr)
+        return 1
+    corpus = make_corpus(args.images)
+    configs = [
+        ("原图", None),
+        ("缩小", PreprocessOptions(dpi_scale=args.dpi, crop_margins=False, skip_blank=False)),
+        ("裁边 + 跳过空白", PreprocessOptions(downscale=False)),
+        ("全部（默认）", PreprocessOptions(dpi_scale=args.dpi)),
+        ("全部 + 灰度", PreprocessOptions(dpi_scale=args.dpi, grayscale=True)),
+    ]
+    handler = OcrHandler(cache=False)
+    print(f"{'配置':<20}{'平均耗时':>12}{'整行命中':>10}{'字符相似度':>12}")
+    for name, options in configs:
+        times, exacts, ratios = [], [], []
+        for img, truth in corpus:
+            t0 = time.perf_counter()
+            result = handler.recognize_image_result(img, tiled=False, preprocess=options or False)
+            times.append(time.perf_counter() - t0)
+            exact, ratio = score(result, truth)
+            exacts.append(exact)
+            ratios.append(ratio)
+        print(f"{name:<20}{np.mean(times) * 1000:>9.0f} ms{np.mean(exacts):>10.1%}{np.mean(ratios):>12.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
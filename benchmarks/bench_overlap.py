@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+基准：backend/long_screenshot.py 的重叠搜索（_find_overlap）与重复帧判断（_images_almost_same）
+在 1080p / 4K 选区下的单帧耗时。
+
+用法：python benchmarks/bench_overlap.py [--frames 30]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from backend.long_screenshot import (
+    OVERLAP_SEARCH_HEIGHT,
+    _find_overlap,
+    _images_almost_same,
+)
+from _synthetic import make_document, scroll_frames
+
+SIZES = {
+    "1080p": (1920, 1080),
+    "4K": (3840, 2160),
+}
+
+
+def run(label, width, height, n_frames):
+    doc = make_document(width, height * 8, seed=1)
+    frames = scroll_frames(doc, height, n_frames, seed=2)
+    costs = []
+    hits = 0
+    checked = 0
+    for (prev, prev_y), (cur, cur_y) in zip(frames, frames[1:]):
+        t0 = time.perf_counter()
+        same = _images_almost_same(prev, cur)
+        if not same:
+            overlap_y, _ = _find_overlap(prev, cur)
+        costs.append(time.perf_counter() - t0)
+        if same:
+            continue
+        # 期望值：prev 底部 search_h 条在 cur 中的位置（按 OVERLAP_STEP 对齐前的真值）
+        expected = height - OVERLAP_SEARCH_HEIGHT - (cur_y - prev_y)
+        checked += 1
+        if expected >= 0 and abs(overlap_y - expected) < 4:
+            hits += 1
+    ms = np.array(costs) * 1000
+    print(
+        f"{label:>6} {width}x{height}: 帧数 {len(ms)}, 平均 {ms.mean():.1f} ms, "
+        f"p95 {np.percentile(ms, 95):.1f} ms, 最大 {ms.max():.1f} ms, "
+        f"重叠命中 {hits}/{checked}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=30, help="每种尺寸的帧数")
+    args = parser.parse_args()
+    for label, (w, h) in SIZES.items():
+        run(label, w, h, args.frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+基准：前端静态资源服务，旧 HTTPServer + SimpleHTTPRequestHandler vs backend/http_serve.create_server。
+在临时目录生成一份模拟的 Vite dist（index.html + 带哈希的 assets/ 下 JS / CSS / 图片），对两种服务：
+- 冷启动加载：先取 index.html，再用 --parallel 个连接（模拟 WebView 的并发连接数）拉取全部资源
+- 再次加载：旧服务没有缓存头，WebView 逐个带 If-Modified-Since 校验；新服务 assets/ 为 immutable，只校验 index.html
+- 压测：--clients 个客户端持续请求随机资源 --seconds 秒，统计吞吐与延迟
+输出各场景耗时、请求数、传输字节数（请求带 Accept-Encoding: gzip, br）。
+
+用法：python benchmarks/bench_static_server.py [--assets 40] [--parallel 6] [--loads 20] [--clients 8]
+"""
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import http.client
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from backend.http_serve import create_server
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def make_dist(root, assets, seed=0):
+    """生成模拟 dist，返回 index.html 引用的资源路径列表。"""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(root, "assets"))
+    words = ["const", "function", "return", "export", "import", "this", "value", "props", "render", "=>", "{", "}"]
+    paths = []
+    for i in range(assets):
+        kind = ("js", "js", "css", "png")[i % 4]
+        if kind == "png":
+            data = rng.randbytes(rng.randint(8, 80) * 1024)
+        else:
+            size = rng.randint(4, 200) * 1024
+            text = " ".join(rng.choice(words) for _ in range(size // 5))
+            data = text.encode("utf-8")
+        name = f"chunk{i}-{hashlib.sha1(data).hexdigest()[:8]}.{kind}"
+        with open(os.path.join(root, "assets", name), "wb") as f:
+            f.write(data)
+        paths.append(f"/assets/{name}")
+    links = "\n".join(f'<script type="module" src=".{p}"></script>' for p in paths)
+    with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html><html><head><meta charset=\"utf-8\">{links}</head><body><div id=\"app\"></div></body></html>")
+    return paths
+
+
+class Browser:
+    """按 host 保持若干连接的简易客户端，记录每个路径的校验信息以模拟再次加载。"""
+
+    def __init__(self, port):
+        self.port = port
+        self._local = threading.local()
+        self.validators = {}  # path -> (etag, last_modified, cache_control)
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._conns = []
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def close(self):
+        for conn in self._conns:
+            conn.close()
+
+    def get(self, path, revalidate=False):
+        """返回 (状态码, 传输的正文字节数)；连接被服务端关闭（HTTP/1.0）时下次请求自动重连。"""
+        headers = {"Accept-Encoding": "gzip, br"}
+        if revalidate and path in self.validators:
+            etag, modified, _ = self.validators[path]
+            if etag:
+                headers["If-None-Match"] = etag
+            elif modified:
+                headers["If-Modified-Since"] = modified
+        conn = self._conn()
+        if conn.sock is None:
+            with self._lock:
+                self.connections += 1
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        if response.will_close:
+            conn.close()
+        if response.status == 200:
+            self.validators[path] = (response.getheader("ETag"), response.getheader("Last-Modified"),
+                                     response.getheader("Cache-Control") or "")
+        return response.status, len(body)
+
+    def load(self, paths, parallel, pool, warm=False):
+        """加载一次页面，返回 (耗时, 请求数, 字节数)。warm 时跳过 immutable 资源，其余带校验头。"""
+        t0 = time.perf_counter()
+        status, nbytes = self.get("/index.html", revalidate=warm)
+        todo = [p for p in paths if not (warm and "immutable" in self.validators.get(p, ("", "", ""))[2])]
+        results = list(pool.map(lambda p: self.get(p, revalidate=warm), todo))
+        return time.perf_counter() - t0, 1 + len(todo), nbytes + sum(r[1] for r in results)
+
+
+def hammer(port, paths, clients, seconds):
+    """clients 个客户端持续请求随机资源，返回 (请求数, 每次延迟数组)。"""
+    deadline = time.perf_counter() + seconds
+    latencies, lock = [], threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        browser = Browser(port)
+        local = []
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            browser.get(rng.choice(paths))
+            local.append(time.perf_counter() - t0)
+        browser.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(latencies), np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--assets", type=int, default=40, help="assets/ 下的资源数")
+    parser.add_argument("--parallel", type=int, default=6, help="每次页面加载的并发连接数")
+    parser.add_argument("--loads", type=int, default=20, help="页面加载次数")
+    parser.add_argument("--clients", type=int, default=8, help="压测客户端数")
+    parser.add_argument("--seconds", type=float, default=3.0, help="压测时长")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dist:
+        paths = make_dist(dist, args.assets)
+        size = sum(os.path.getsize(os.path.join(dist, p.lstrip("/"))) for p in paths)
+        print(f"模拟 dist：{len(paths)} 个资源，共 {size / 1024:.0f} KB；并发连接 {args.parallel}，加载 {args.loads} 次")
+        print(f"\n{'服务':<26}{'场景':<10}{'平均':>9}{'p95':>9}{'请求':>6}{'传输':>10}{'新连接':>8}")
+
+        t0 = time.perf_counter()
+        new_server = create_server(dist, 0)
+        preload = time.perf_counter() - t0
+        old_server = HTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=dist))
+        servers = (("SimpleHTTPRequestHandler", old_server), ("create_server", new_server))
+        for _, server in servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            for name, server in servers:
+                port = server.server_address[1]
+                with concurrent.futures.ThreadPoolExecutor(args.parallel) as pool:
+                    for scene, warm in (("冷启动", False), ("再次加载", True)):
+                        samples, connections = [], 0
+                        for _ in range(args.loads):
+                            browser = Browser(port)
+                            if warm:
+                                browser.load(paths, args.parallel, pool)
+                                browser.connections = 0
+                            samples.append(browser.load(paths, args.parallel, pool, warm=warm))
+                            connections += browser.connections
+                            browser.close()
+                        wall = np.array([s[0] for s in samples]) * 1000
+                        print(f"{name:<26}{scene:<10}{wall.mean():>6.1f} ms{np.percentile(wall, 95):>6.1f} ms"
+                              f"{samples[0][1]:>6}{samples[0][2] / 1024:>8.0f} KB{connections // args.loads:>8}")
+            print(f"\n压测：{args.clients} 个客户端，{args.seconds:.0f} 秒")
+            for name, server in servers:
+                count, latency = hammer(server.server_address[1], paths, args.clients, args.seconds)
+                print(f"{name:<26}{count / args.seconds:>8.0f} req/s   平均 {latency.mean():.1f} ms   "
+                      f"p95 {np.percentile(latency, 95):.1f} ms")
+            print(f"\ncreate_server 预加载：{len(new_server.bundle)} 个文件，内存 {new_server.bundle.nbytes / 1024:.0f} KB，"
+                  f"耗时 {preload * 1000:.0f} ms")
+        finally:
+            for _, server in servers:
+                server.shutdown()
+                server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
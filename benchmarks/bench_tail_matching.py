@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+基准：合成滚动文档上的增量拼接（backend/long_screenshot_opencv._stitch_incremental），
+按帧序号分段统计单帧匹配+拼接耗时，验证耗时不随长图总高度增长，并核对拼接结果与原文档一致。
+
+用法：python benchmarks/bench_tail_matching.py [--width 1280] [--height 720] [--frames 150]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from backend.long_screenshot_opencv import OVERLAP_RATIO, _stitch_incremental
+from _synthetic import make_document, scroll_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--bucket", type=int, default=25, help="每多少帧汇总一次")
+    args = parser.parse_args()
+
+    # 每帧滚动落在重叠匹配可接受的范围内（新帧顶部 2 × 重叠高度内搜索）
+    step_range = (1 - 2 * OVERLAP_RATIO, 1 - OVERLAP_RATIO)
+    doc = make_document(args.width, int(args.height * args.frames * step_range[1]) + args.height, seed=3)
+    frames = scroll_frames(doc, args.height, args.frames, seed=4, step_range=step_range)
+    canvas = None
+    costs = []
+    fails = 0
+    for frame, _ in frames:
+        t0 = time.perf_counter()
+        canvas, ok = _stitch_incremental(canvas, frame)
+        costs.append(time.perf_counter() - t0)
+        fails += not ok
+    costs = np.array(costs[1:]) * 1000  # 首帧只建画布，不计
+    print(f"帧尺寸 {args.width}x{args.height}，共 {len(frames)} 帧，未拼接 {fails} 帧（含未滚动帧）")
+    for i in range(0, len(costs), args.bucket):
+        part = costs[i:i + args.bucket]
+        print(f"  帧 {i + 1:>4}-{i + len(part):<4} 平均 {part.mean():6.2f} ms  p95 {np.percentile(part, 95):6.2f} ms")
+
+    result = canvas.finish()
+    same = np.array_equal(result, doc[:result.shape[0]])
+    print(f"最终长图 {result.shape[1]}x{result.shape[0]}，扩容 {canvas.grow_count} 次，与原文档一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
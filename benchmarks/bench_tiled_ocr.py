@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+基准：超长截图整图识别 vs 分块识别（OcrHandler.recognize_tiled_result）。
+合成若干高度的「文字长图」（每行一条带编号的文字），比较：
+- 耗时与吞吐（行像素 / 秒）
+- 识别到的行数 / 实际行数（整图识别时引擎会整体缩小，长图越高漏得越多）
+- 进程峰值 RSS 增量（Linux / macOS，用 resource 统计；每种方式单独子进程运行）
+
+需要安装 rapidocr_onnxruntime（pip install -r requirements-ocr.txt）。
+用法：python benchmarks/bench_tiled_ocr.py [--heights 2000 8000 20000] [--workers 2]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+LINE_PITCH = 36
+WIDTH = 1080
+
+
+def make_text_image(height, width=WIDTH):
+    """白底黑字长图，每行一句「第 N 行 ...」，返回 (PIL Image, 行数)。"""
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    n = 0
+    for y in range(10, height - LINE_PITCH, LINE_PITCH):
+        draw.text((24, y), f"Line {n:05d} the quick brown fox jumps over the lazy dog", fill=(20, 20, 20))
+        n += 1
+    return img, n
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_one(height, mode, workers):
+    """子进程内执行一次识别，输出 JSON。"""
+    from backend.ocr_engine import OcrHandler, warm_up
+    if not warm_up():
+        print(json.dumps({"error": "rapidocr_onnxruntime 未安装"}))
+        return
+    img, n = make_text_image(height)
+    base_rss = _peak_rss_mb()
+    handler = OcrHandler(cache=False)
+    t0 = time.perf_counter()
+    if mode == "tiled":
+        result = handler.recognize_tiled_result(img, workers=workers)
+    else:
+        result = handler.recognize_image_result(img, tiled=False)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "seconds": elapsed,
+        "lines": len(result),
+        "expected": n,
+        "rss_mb": _peak_rss_mb() - base_rss,
+        "error": result.error,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--heights", type=int, nargs="+", default=[2000, 8000, 20000])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--_child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._child:
+        run_one(int(args._child[0]), args._child[1], args.workers)
+        return 0
+
+    print(f"{'高度':>8}{'方式':>8}{'耗时':>10}{'吞吐(Mpx/s)':>14}{'识别行数':>12}{'峰值RSS增量':>14}")
+    for height in args.heights:
+        for mode in ("whole", "tiled"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--workers", str(args.workers), "--_child", str(height), mode],
+                capture_output=True, text=True, cwd=ROOT,
+            )
+            try:
+                r = json.loads(out.stdout.strip().splitlines()[-1])
+            except (ValueError, IndexError):
+                print(f"{height:>8}{mode:>8}  子进程失败: {out.stderr.strip()[-200:]}")
+                continue
+            if r.get("error"):
+                print(f"{height:>8}{mode:>8}  {r['error']}")
+                if "未安装" in r["error"]:
+                    return 1
+                continue
+            mpx = WIDTH * height / 1e6 / max(r["seconds"], 1e-9)
+            print(f"{height:>8}{mode:>8}{r['seconds']:>8.2f} s{mpx:>14.2f}"
+                  f"{r['lines']:>6}/{r['expected']:<5}{r['rss_mb']:>11.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
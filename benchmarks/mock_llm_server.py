@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟的 OpenAI 兼容 chat/completions 服务（离线测试 / 基准用）。
+- stream=true 时按 SSE 逐 token 输出：等待 ttft 秒后发首个 token，之后每 token_delay 秒一个
+- stream=false 时等价于收完全部 token 后一次返回 JSON
+- HTTP/1.1 keep-alive（流式响应用 chunked 编码），统计新建连接数，便于验证连接复用
+- fail_first=N 时前 N 个请求返回 fail_status（默认 503，带 Retry-After: 0），用于验证重试
+- connect_delay 秒：每个新连接处理首个请求前的等待，模拟远端建连（DNS / TCP / TLS）耗时
+- prefill_per_kchar 秒：每 1000 字输入额外增加的首 token 等待，模拟长输入的预填充耗时；
+  max_input_chars：输入超过该字数时返回 400（上下文超长）
+回答内容为确定性的 "tok0 tok1 ..."，便于校验拼接结果。
+
+代码中：server, url = start_mock_server(tokens=200, ttft=0.3, token_delay=0.01)；用完 server.shutdown()
+命令行：python benchmarks/mock_llm_server.py --port 8799 --tokens 500
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOptions:
+    """模拟服务参数（可在运行中修改，下一次请求生效）。"""
+
+    def __init__(self, tokens=200, ttft=0.3, token_delay=0.01, fail_first=0, fail_status=503, connect_delay=0.0,
+                 prefill_per_kchar=0.0, max_input_chars=0):
+        self.tokens = tokens
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.connect_delay = connect_delay
+        self.prefill_per_kchar = prefill_per_kchar
+        self.max_input_chars = max_input_chars
+        self.input_chars = []  # 每个请求的输入字数（按到达顺序）
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+def reply_tokens(options):
+    return [f"tok{i} " for i in range(options.tokens)]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = MockOptions()
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.options.lock:
+            self.options.connections += 1
+        if self.options.connect_delay:
+            time.sleep(self.options.connect_delay)
+
+    def _send_json(self, status, obj, headers=()):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        options = self.options
+        chars = sum(len(m.get("content") or "") for m in body.get("messages") or [])
+        with options.lock:
+            options.requests += 1
+            options.input_chars.append(chars)
+            fail = options.requests <= options.fail_first
+        if fail:
+            self._send_json(options.fail_status, {"error": {"message": "mock overloaded"}}, [("Retry-After", "0")])
+            return
+        if options.max_input_chars and chars > options.max_input_chars:
+            self._send_json(400, {"error": {"message": f"context length exceeded: {chars} > {options.max_input_chars}"}})
+            return
+        tokens = reply_tokens(options)
+        ttft = options.ttft + options.prefill_per_kchar * chars / 1000
+        if not body.get("stream"):
+            time.sleep(ttft + options.token_delay * max(len(tokens) - 1, 0))
+            self._send_json(200, {
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": "stop"}],
+            })
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            time.sleep(ttft)
+            for i, tok in enumerate(tokens):
+                if i:
+                    time.sleep(options.token_delay)
+                chunk = {"choices": [{"index": 0, "delta": {"content": tok}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # 客户端取消
+
+
+def start_mock_server(port=0, **options):
+    """后台线程启动模拟服务，返回 (server, chat/completions URL)。"""
+    handler = type("Handler", (MockHandler,), {"options": MockOptions(**options)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.options = handler.options
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+    server, url = start_mock_server(args.port, tokens=args.tokens, ttft=args.ttft, token_delay=args.token_delay)
+    print(f"模拟服务已启动：{url}（Ctrl+C 退出）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
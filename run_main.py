@@ -273,8 +273,8 @@ if __name__ == "__main__":
 
     def do_ocr(data_url):
         try:
-            from backend.ocr_engine import OcrHandler
-            ocr = OcrHandler()
+            from backend.ocr_engine import get_ocr_handler
+            ocr = get_ocr_handler()
             text = ocr.recognize_from_data_url(data_url)
             result_edit.setPlainText(text or "(无文字)")
         except Exception as e:
@@ -296,8 +296,8 @@ if __name__ == "__main__":
         if not path:
             return
         try:
-            from backend.ocr_engine import OcrHandler
-            ocr = OcrHandler()
+            from backend.ocr_engine import get_ocr_handler
+            ocr = get_ocr_handler()
             text = ocr.recognize_from_file(path)
             result_edit.setPlainText(text or "(无文字)")
         except Exception as e:
@@ -68,7 +68,6 @@ def _start_global_f1(window_ref: list, minimized_state: list) -> None:
 
 
 def main() -> None:
-    import http.server
     import webview
 
     # 可选：先打包前端再启动（同一方法内完成）
@@ -92,11 +91,15 @@ def main() -> None:
     from backend.api_webview import Api
     api = Api(on_log=_on_log)
 
-    # 本地 HTTP 服务
+    # 后台预热 OCR 引擎（加载模型、创建 ONNX 会话），首次识别不再等待数秒
+    from backend.ocr_engine import warm_up_async
+    warm_up_async(on_log=_on_log)
+
+    # 本地 HTTP 服务（静态前端 + /_img/ 截图句柄）
+    from backend.http_serve import create_server
     port = 8765
     os.chdir(STATIC_DIR)
-    server = http.server.HTTPServer(("127.0.0.1", port), http.server.SimpleHTTPRequestHandler)
-    server.allow_reuse_address = True
+    server = create_server(STATIC_DIR, port)
 
     def serve():
         server.serve_forever()
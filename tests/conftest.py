@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# benchmarks 不是包：与各基准脚本一样把目录加入 sys.path，直接 import mock_llm_server
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""分块分析：按行切块、各块要点按原文顺序汇总、取消时中断所有在途的分块请求。"""
+import re
+import threading
+import time
+
+import pytest
+
+from backend.ai_analysis import AiCancelled, CancelEvent
+from backend.ai_chunking import ASCII_CHARS_PER_TOKEN, estimate_tokens, map_reduce_stream, split_lines
+from backend.llm_client import LlmCancelled, LlmClient, LlmConfig
+from mock_llm_server import start_mock_server
+
+
+class ScriptedClient:
+    """
+    按请求内容作答的客户端：分块请求返回「要点N」，块号越小完成得越晚（完成顺序与原文相反）；
+    流式汇总请求原样吐回汇总消息。
+    """
+
+    def __init__(self, block=False):
+        self.block = block
+        self.lock = threading.Lock()
+        self.map_payloads = []
+        self.in_flight = 0
+        self.cancelled = 0
+        self.reduce_payload = None
+
+    def complete(self, payload, cancel=None):
+        index, total = map(int, re.search(r"第 (\d+)/(\d+) 部分", payload["messages"][1]["content"]).groups())
+        with self.lock:
+            self.map_payloads.append(payload)
+            self.in_flight += 1
+        try:
+            if self.block:
+                if cancel.wait(5):
+                    with self.lock:
+                        self.cancelled += 1
+                    raise LlmCancelled()
+            else:
+                time.sleep(0.01 * (total - index))
+            return f"要点{index}"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def stream_chat(self, payload, cancel=None):
+        self.reduce_payload = payload
+        yield payload["messages"][1]["content"]
+
+
+def _text(lines, width=40):
+    return "\n".join(f"{i:04d} " + "x" * width for i in range(lines))
+
+
+def test_split_lines_respects_budget_and_lines():
+    text = _text(50)
+    chunks = split_lines(text, budget=60)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) + chunk.count("\n") + 1 <= 60 for chunk in chunks)
+    assert "\n".join(chunks) == text  # 只在行边界切开，顺序不变
+
+
+def test_split_lines_long_line_and_blank():
+    long_line = "字" * 250
+    chunks = [c.strip() for c in split_lines(f"\n\n{long_line}\n\n", budget=100)]
+    assert "".join(chunks) == long_line
+    assert [len(c) for c in chunks] == [100, 100, 50]
+    ascii_chunks = split_lines("a" * 1000, budget=100)
+    assert all(len(c) <= 100 * ASCII_CHARS_PER_TOKEN for c in ascii_chunks)
+    assert split_lines("\n \n", budget=100) == []
+
+
+def test_short_text_single_request():
+    client = ScriptedClient()
+    stages = []
+    out = "".join(map_reduce_stream("短文本", "总结", client=client, progress=lambda **f: stages.append(f["stage"])))
+    assert client.map_payloads == [] and stages == ["reduce"]
+    assert "短文本" in out and "总结" in out
+
+
+def test_reduce_keeps_chunk_order():
+    client = ScriptedClient()
+    progress = []
+    text = _text(60)
+    total = len(split_lines(text, budget=100))
+    out = "".join(map_reduce_stream(text, "总结", client=client, budget=100, workers=4,
+                                    progress=lambda **f: progress.append(f)))
+    assert len(client.map_payloads) == total
+    # 各块完成顺序与原文相反，汇总里的要点仍按原文顺序
+    notes = re.findall(r"第 (\d+) 部分要点：\n要点(\d+)", out)
+    assert notes == [(str(i), str(i)) for i in range(1, total + 1)]
+    map_events = [f for f in progress if f["stage"] == "map"]
+    assert [f["done"] for f in map_events] == list(range(total + 1))
+    finished = [f["chunk"] for f in map_events[1:]]
+    assert sorted(finished) == list(range(total)) and finished != sorted(finished)
+    assert progress[-1] == {"stage": "reduce", "done": 0, "total": 1}
+
+
+def test_cancel_aborts_all_in_flight_chunks():
+    client = ScriptedClient(block=True)
+    cancel = CancelEvent()
+    text = _text(40)
+    total = len(split_lines(text, budget=100))
+    errors = []
+
+    def consume():
+        try:
+            list(map_reduce_stream(text, cancel=cancel, client=client, budget=100, workers=total))
+        except AiCancelled as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=consume)
+    worker.start()
+    for _ in range(500):
+        if client.in_flight == total:
+            break
+        time.sleep(0.01)
+    assert client.in_flight == total
+    cancel.cancel()
+    worker.join(2)
+    assert not worker.is_alive() and len(errors) == 1
+    assert client.cancelled == total and client.in_flight == 0
+    assert client.reduce_payload is None
+
+
+def test_cancel_before_start():
+    cancel = CancelEvent()
+    cancel.set()
+    client = ScriptedClient()
+    with pytest.raises(AiCancelled):
+        list(map_reduce_stream(_text(40), cancel=cancel, client=client, budget=100))
+    assert client.map_payloads == []
+
+
+def test_cancel_interrupts_real_connections():
+    # 模拟服务每个分块请求要 5 s 才返回：取消应打断所有在途连接，而不是等它们读完
+    server, url = start_mock_server(tokens=2, ttft=5.0, token_delay=0.0)
+    client = LlmClient(LlmConfig(url=url, api_key="mock", max_connections=4, max_retries=0))
+    cancel = CancelEvent()
+    threading.Timer(0.3, cancel.cancel).start()
+    t0 = time.perf_counter()
+    try:
+        with pytest.raises(AiCancelled):
+            list(map_reduce_stream(_text(40), cancel=cancel, client=client, budget=100, workers=4))
+        assert time.perf_counter() - t0 < 2
+        assert server.options.requests == 4
+    finally:
+        client.close()
+        server.shutdown()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""AiStreamManager 对本地模拟服务：片段合并推送、首字耗时、相同请求合并、取消与出错。"""
+import queue
+import threading
+
+import pytest
+
+from backend.ai_analysis import AiMetrics, AiStreamManager, stream_completion
+from backend.llm_client import LlmClient, LlmConfig
+from mock_llm_server import reply_tokens, start_mock_server
+
+TERMINAL = ("done", "error", "cancelled")
+
+
+class Events:
+    """收集 on_event 回调的事件，按 stream_id 等待结束事件。"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.seen = []
+
+    def __call__(self, event):
+        self.queue.put(event)
+
+    def wait(self, type_=None, timeout=10):
+        """等到下一个（指定类型的）事件，返回它。"""
+        while True:
+            event = self.queue.get(timeout=timeout)
+            self.seen.append(event)
+            if type_ is None or event["type"] == type_:
+                return event
+
+    def until_end(self, stream_id, timeout=10):
+        while True:
+            event = self.wait(timeout=timeout)
+            if event["stream_id"] == stream_id and event["type"] in TERMINAL:
+                return event
+
+    def of(self, stream_id, type_):
+        return [e for e in self.seen if e["stream_id"] == stream_id and e["type"] == type_]
+
+
+@pytest.fixture
+def llm():
+    server, url = start_mock_server(tokens=200, ttft=0.0, token_delay=0.0)
+    client = LlmClient(LlmConfig(url=url, api_key="mock", max_retries=0))
+    events = Events()
+    manager = AiStreamManager(events, stream=lambda payload, cancel: stream_completion(payload, cancel, client))
+    yield server, manager, events
+    client.close()
+    server.shutdown()
+
+
+def test_chunks_coalesced_and_content_complete(llm):
+    server, manager, events = llm
+    server.options.token_delay = 0.002  # 约 0.4 s 吐完 200 个 token，按 50 ms 合并应只推十来次
+    stream_id = manager.start({"messages": []})
+    done = events.until_end(stream_id)
+    expected = "".join(reply_tokens(server.options))
+    deltas = events.of(stream_id, "delta")
+    assert done["type"] == "done" and done["content"] == expected and not done["cached"]
+    assert "".join(e["delta"] for e in deltas) == expected
+    assert 1 <= len(deltas) <= 40
+    assert "ttft" in deltas[0] and all("ttft" not in e for e in deltas[1:])
+
+
+def test_ttft_recorded(llm):
+    server, manager, events = llm
+    server.options.ttft = 0.2
+    stream_id = manager.start({"messages": []})
+    first = events.wait("delta")
+    done = events.until_end(stream_id)
+    assert 0.15 <= first["ttft"] < done["elapsed"]
+    assert done["ttft"] == first["ttft"]
+    snapshot = manager.metrics.snapshot()
+    assert snapshot["ttft"]["count"] == 1 and snapshot["total"]["count"] == 1
+    assert snapshot["ttft"]["avg_ms"] == pytest.approx(first["ttft"] * 1000)
+
+
+def test_same_key_shares_upstream(llm):
+    server, manager, events = llm
+    server.options.ttft = 0.2
+    first = manager.start({"messages": []}, key="k")
+    second = manager.start({"messages": []}, key="k")
+    ends = {e["stream_id"]: e for e in (events.until_end(first), events.until_end(second))}
+    assert ends[first]["content"] == ends[second]["content"] == "".join(reply_tokens(server.options))
+    assert server.options.requests == 1
+    assert manager.metrics.snapshot()["coalesced"] == 1
+
+
+def test_cancel_stops_stream(llm):
+    server, manager, events = llm
+    server.options.tokens, server.options.token_delay = 1000, 0.01  # 约 10 s，取消后不应等到结束
+    stream_id = manager.start({"messages": []})
+    events.wait("delta")
+    assert manager.cancel(stream_id)
+    assert not manager.cancel(stream_id)
+    assert events.until_end(stream_id)["type"] == "cancelled"
+    with pytest.raises(queue.Empty):
+        events.wait(timeout=0.3)  # 取消后不再有 delta / done / error
+    assert manager.metrics.snapshot()["cancelled"] == 1
+    # 上游连接已归还：下一次请求正常完成
+    server.options.tokens, server.options.token_delay = 5, 0.0
+    assert events.until_end(manager.start({"messages": []}))["type"] == "done"
+
+
+def test_http_error_reported(llm):
+    server, manager, events = llm
+    server.options.fail_first, server.options.fail_status = 1, 400
+    stream_id = manager.start({"messages": []})
+    end = events.until_end(stream_id)
+    assert end["type"] == "error" and "HTTP 错误 400" in end["error"]
+    assert not events.of(stream_id, "delta")
+
+
+def test_empty_answer_is_error(llm):
+    server, manager, events = llm
+    server.options.tokens = 0
+    end = events.until_end(manager.start({"messages": []}))
+    assert end["type"] == "error" and end["error"] == "AI 返回了空结果"
+
+
+def test_metrics_counters_thread_safe():
+    metrics = AiMetrics()
+
+    def bump():
+        for _ in range(10000):
+            metrics.count("coalesced")
+
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert metrics.snapshot()["coalesced"] == 80000
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""长截图流水线：自适应截屏间隔对重复帧 / 匹配失败的反应，提前结束时截屏线程立即退出。"""
+import threading
+import time
+
+import pytest
+
+from backend.capture_pipeline import (IDLE_BACKOFF, MAX_CAPTURE_INTERVAL, MIN_CAPTURE_INTERVAL, MISS_SPEEDUP,
+                                      TARGET_SCROLL_FRACTION, AdaptiveInterval, CapturePipeline)
+
+
+def test_duplicate_frame_backs_off():
+    pacer = AdaptiveInterval(0.2, 1000)
+    pacer.observe(0, now=1.0)
+    assert pacer.interval == pytest.approx(0.2 * IDLE_BACKOFF)
+
+
+def test_match_failure_speeds_up():
+    pacer = AdaptiveInterval(0.2, 1000)
+    pacer.observe(None, now=1.0)
+    assert pacer.interval == pytest.approx(0.2 * MISS_SPEEDUP)
+    for i in range(10):
+        pacer.observe(None, now=1.0 + i)
+    assert pacer.interval == MIN_CAPTURE_INTERVAL
+
+
+def test_velocity_after_failure_measured_from_last_success():
+    pacer = AdaptiveInterval(0.2, 1000)
+    pacer.observe(100, now=1.0)
+    pacer.observe(None, now=1.1)
+    pacer.observe(600, now=1.3)  # 0.3 s 内滚过 600 行（含失败期间）
+    assert pacer.interval == pytest.approx(max(1000 * TARGET_SCROLL_FRACTION / 2000, MIN_CAPTURE_INTERVAL))
+
+
+def test_halt_wakes_capture_loop():
+    frames = iter(range(1000))
+    processed = []
+    pipeline = CapturePipeline(
+        grab=lambda: next(frames), process=lambda f: processed.append(f) or 0, stop_event=threading.Event(),
+        frame_height=100, should_stop=lambda: len(processed) >= 1, initial_interval=MAX_CAPTURE_INTERVAL)
+    t0 = time.perf_counter()
+    pipeline.run()
+    assert pipeline.halted
+    assert time.perf_counter() - t0 < MAX_CAPTURE_INTERVAL / 2
+
+
+def test_stop_event_ends_pipeline():
+    stop = threading.Event()
+    pipeline = CapturePipeline(grab=lambda: None, process=lambda f: 0, stop_event=stop, frame_height=100,
+                               initial_interval=MAX_CAPTURE_INTERVAL)
+    threading.Timer(0.05, stop.set).start()
+    t0 = time.perf_counter()
+    pipeline.run()
+    assert not pipeline.halted
+    assert time.perf_counter() - t0 < 0.05 + MAX_CAPTURE_INTERVAL / 2
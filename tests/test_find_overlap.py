@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""_find_overlap 与逐个偏移全分辨率比较的基线结果完全一致（含重复行、低纹理内容）。"""
+import numpy as np
+import pytest
+
+from backend.long_screenshot import OVERLAP_SEARCH_HEIGHT, OVERLAP_STEP, _find_overlap
+
+
+def brute_force(top, bottom, step=OVERLAP_STEP, search_h=OVERLAP_SEARCH_HEIGHT, metric="sad"):
+    """基线：逐个候选偏移算全分辨率得分，取最小、同分取最小 y。"""
+    h1, h2 = top.shape[0], bottom.shape[0]
+    strip = top[h1 - search_h:].astype(np.int64)
+    best_y, best_score = 0, float("inf")
+    for y0 in range(0, min(h2 - search_h + 1, h1), step):
+        d = strip - bottom[y0:y0 + search_h]
+        score = float((d * d).sum() if metric == "ssd" else np.abs(d).sum())
+        if score < best_score:
+            best_y, best_score = y0, score
+    return best_y, best_score
+
+
+def repetitive_page(height, width, period, seed, noise=3):
+    """周期性重复的行（列表项 / 表格）+ 轻微噪声，粗筛得分在很多偏移上几乎相同。"""
+    rng = np.random.default_rng(seed)
+    tile = rng.integers(200, 256, size=(period, width, 3))
+    tile[period // 3:period // 3 + 2, 10:width - 10] = 40
+    page = np.tile(tile, (height // period + 1, 1, 1))[:height]
+    return np.clip(page + rng.integers(-noise, noise + 1, size=page.shape), 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("metric", ["sad", "ssd"])
+@pytest.mark.parametrize("seed", range(6))
+def test_matches_brute_force_on_repetitive_content(metric, seed):
+    rng = np.random.default_rng(100 + seed)
+    page = repetitive_page(900, 128, period=int(rng.integers(6, 40)), seed=seed)
+    top_y = int(rng.integers(0, 200))
+    shift = int(rng.integers(20, 200))
+    top = page[top_y:top_y + 400]
+    bottom = page[top_y + shift:top_y + shift + 400].copy()
+    bottom[int(rng.integers(0, 380)):][:6] ^= 1  # 不是逐像素完全重合，走粗筛 + 复核路径
+    assert _find_overlap(top, bottom, metric=metric) == brute_force(top, bottom, metric=metric)
+
+
+@pytest.mark.parametrize("metric", ["sad", "ssd"])
+def test_matches_brute_force_on_low_texture(metric):
+    rng = np.random.default_rng(7)
+    top = np.clip(235 + rng.integers(-2, 3, size=(360, 96, 3)), 0, 255).astype(np.uint8)
+    bottom = np.clip(235 + rng.integers(-2, 3, size=(360, 96, 3)), 0, 255).astype(np.uint8)
+    assert _find_overlap(top, bottom, metric=metric) == brute_force(top, bottom, metric=metric)
+
+
+def test_exact_scroll():
+    page = repetitive_page(800, 64, period=17, seed=1, noise=40)
+    top, bottom = page[:300], page[100:400]
+    assert _find_overlap(top, bottom) == brute_force(top, bottom)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+帧变化检测器在合成帧对上的判定：静止帧对（完全相同 / 光标闪烁 / 轻微噪声）与滚动 1~64 px 的帧对。
+每个检测器判错的帧对逐一列出，判错的集合有任何变化（变好或变坏）都会失败，需要同步更新下表。
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from backend.frame_change import DEFAULT_CHANGE_DETECTOR, get_change_detector
+
+SIZES = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+SCROLL_STEPS = (1, 2, 4, 8, 16, 64)
+# (检测器, 参数) -> (被误判为「有变化」的静止帧对, 被误判为「几乎相同」的滚动帧对)，元素为 (尺寸, 帧对类型 / 滚动行数)
+EXPECTED_ERRORS = {
+    ("absdiff", ()): (set(), set()),
+    ("absdiff", (("stride", 8),)): (set(), set()),
+    ("absdiff", (("stride", 1),)): (set(), set()),
+    ("phash", ()): (set(), set()),
+    # 16×16 网格太粗：4K 下滚动 1~2 px 在缩小后几乎看不出
+    ("phash", (("hash_size", 16),)): (set(), {("1080p", 1), ("4K", 1), ("4K", 2)}),
+    # 逐字节哈希：±2 的噪声会改变所有抽样行；抽样行恰落在行间空白时滚动 1 px 看不出
+    ("row_hash", ()): ({("1080p", "noise"), ("4K", "noise")}, {("1080p", 1), ("4K", 1)}),
+    ("row_hash", (("rows", 16),)): ({("1080p", "noise"), ("4K", "noise")}, set()),
+}
+
+
+def make_document(width, height, seed=0):
+    """白底 + 随机长度、随机灰度的「文字行」（BGR uint8），每行内容都不同。"""
+    rng = np.random.default_rng(seed)
+    doc = np.full((height, width, 3), 250, dtype=np.uint8)
+    y = 8
+    while y < height - 24:
+        line_h = int(rng.integers(10, 22))
+        x = int(rng.integers(8, 40))
+        end = int(rng.integers(width // 3, width - 8))
+        while x < end:
+            word_w = int(rng.integers(12, 80))
+            doc[y:y + line_h, x:min(x + word_w, end)] = int(rng.integers(0, 90))
+            x += word_w + int(rng.integers(6, 14))
+        y += line_h + int(rng.integers(6, 16))
+    return doc
+
+
+def make_pairs(width, height, seed=0):
+    """返回 ({类型: 静止帧对}, {滚动行数: 滚动帧对})。"""
+    rng = np.random.default_rng(seed)
+    doc = make_document(width, height * 3, seed=seed)
+    base = np.ascontiguousarray(doc[height:2 * height])
+    # 光标闪烁：一个 2x18 的竖条出现/消失
+    blink = base.copy()
+    blink[height // 2:height // 2 + 18, width // 3:width // 3 + 2] = 0
+    # 轻微噪声（如缩放 / 压缩带来的 ±2 抖动）
+    noise = np.clip(base.astype(np.int16) + rng.integers(-2, 3, size=base.shape), 0, 255).astype(np.uint8)
+    static = {"identical": (base, base.copy()), "cursor_blink": (base, blink), "noise": (base, noise)}
+    scrolled = {k: (base, np.ascontiguousarray(doc[height + k:2 * height + k])) for k in SCROLL_STEPS}
+    return static, scrolled
+
+
+@pytest.fixture(scope="module")
+def pairs():
+    return {label: make_pairs(w, h) for label, (w, h) in SIZES.items()}
+
+
+def _errors(det, pairs):
+    fp, fn = set(), set()
+    for label, (static, scrolled) in pairs.items():
+        fp |= {(label, kind) for kind, (a, b) in static.items() if not det.frames_same(a, b)}
+        fn |= {(label, step) for step, (a, b) in scrolled.items() if det.frames_same(a, b)}
+    return fp, fn
+
+
+@pytest.mark.parametrize("name, options", list(EXPECTED_ERRORS), ids=lambda v: str(v))
+def test_error_pairs_match_table(pairs, name, options):
+    fp, fn = _errors(get_change_detector(name, **dict(options)), pairs)
+    expected_fp, expected_fn = EXPECTED_ERRORS[(name, options)]
+    assert fp == expected_fp, f"{name} {options} 误报 {sorted(fp)}，预期 {sorted(expected_fp)}"
+    assert fn == expected_fn, f"{name} {options} 漏报 {sorted(fn)}，预期 {sorted(expected_fn)}"
+
+
+@pytest.mark.parametrize("name, options", list(EXPECTED_ERRORS), ids=lambda v: str(v))
+def test_hard_limits(pairs, name, options):
+    # 所有检测器：完全相同与光标闪烁不算变化，滚动 4 px 及以上一定算变化
+    fp, fn = _errors(get_change_detector(name, **dict(options)), pairs)
+    assert not {kind for _, kind in fp} & {"identical", "cursor_blink"}
+    assert all(step < 4 for _, step in fn)
+
+
+def test_default_detector_has_no_errors(pairs):
+    assert _errors(get_change_detector(DEFAULT_CHANGE_DETECTOR), pairs) == (set(), set())
+
+
+def test_absdiff_signature_does_not_alias_frame():
+    det = get_change_detector("absdiff", stride=1)
+    frame = np.full((40, 30, 3), 100, dtype=np.uint8)
+    sig = det.signature(frame)
+    frame[:] = 0  # 截屏缓冲区被复用
+    assert not det.same(sig, det.signature(frame))
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""本地 HTTP 服务：/_img/ 截图路由的 GET 与 HEAD；静态资源的协商缓存、immutable、压缩协商与目录重定向。"""
+import gzip
+import http.client
+import threading
+
+import pytest
+from PIL import Image
+
+from backend.http_serve import IMMUTABLE_CACHE, REVALIDATE_CACHE, create_server
+from backend.image_store import get_image_store
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "index.html").write_text("<html></html>", encoding="utf-8")
+    server = create_server(str(tmp_path), 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, method, path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        conn.request(method, path, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_head_store_image_matches_get(server):
+    handle = get_image_store().put(Image.new("RGB", (32, 16), (200, 10, 10)))
+    path = f"/_img/{handle}.png"
+    status, headers, body = _request(server, "GET", path)
+    assert status == 200 and body
+    head_status, head_headers, head_body = _request(server, "HEAD", path)
+    assert head_status == 200 and head_body == b""
+    assert head_headers["Content-Type"] == headers["Content-Type"]
+    assert head_headers["Content-Length"] == str(len(body))
+
+
+def test_head_missing_store_image(server):
+    status, _, _ = _request(server, "HEAD", "/_img/" + "0" * 32 + ".png")
+    assert status == 404
+
+
+HASHED_JS = "assets/index-3f9a1c2bd7.js"
+JS = ("export const data = [" + ",".join(str(i) for i in range(600)) + "];\n").encode("utf-8")
+CSS = ("body { margin: 0; }\n" * 100).encode("utf-8")
+CSS_BR = b"pretend-brotli-bytes"
+
+
+@pytest.fixture
+def dist(tmp_path):
+    (tmp_path / "index.html").write_text("<html>root</html>", encoding="utf-8")
+    (tmp_path / "assets").mkdir()
+    (tmp_path / HASHED_JS).write_bytes(JS)
+    (tmp_path / "assets" / "app.css").write_bytes(CSS)
+    (tmp_path / "assets" / "app.css.br").write_bytes(CSS_BR)
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "index.html").write_text("<html>docs</html>", encoding="utf-8")
+    server = create_server(str(tmp_path), 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_etag_if_none_match(dist):
+    status, headers, body = _request(dist, "GET", "/")
+    assert status == 200 and body == b"<html>root</html>"
+    etag = headers["ETag"]
+    for value in (etag, f'"other", W/{etag}', "*"):
+        status, headers_304, body = _request(dist, "GET", "/index.html", {"If-None-Match": value})
+        assert status == 304 and body == b""
+        assert headers_304["ETag"] == etag and headers_304["Cache-Control"] == REVALIDATE_CACHE
+    status, _, body = _request(dist, "GET", "/index.html", {"If-None-Match": '"stale"'})
+    assert status == 200 and body == b"<html>root</html>"
+
+
+def test_cache_control_immutable_for_hashed_assets(dist):
+    _, headers, _ = _request(dist, "GET", "/" + HASHED_JS)
+    assert headers["Cache-Control"] == IMMUTABLE_CACHE
+    for path in ("/", "/assets/app.css"):
+        assert _request(dist, "GET", path)[1]["Cache-Control"] == REVALIDATE_CACHE
+
+
+def test_gzip_negotiation(dist):
+    status, headers, body = _request(dist, "GET", "/" + HASHED_JS, {"Accept-Encoding": "gzip, deflate"})
+    assert status == 200 and headers["Content-Encoding"] == "gzip" and headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == JS and int(headers["Content-Length"]) == len(body) < len(JS)
+    status, headers, body = _request(dist, "GET", "/" + HASHED_JS)
+    assert "Content-Encoding" not in headers and body == JS
+    assert headers["Content-Type"] == "application/javascript; charset=utf-8"
+    # 太小的文件不压缩，也不带 Vary
+    _, headers, body = _request(dist, "GET", "/", {"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in headers and "Vary" not in headers and body == b"<html>root</html>"
+
+
+def test_precompressed_br_preferred(dist):
+    _, headers, body = _request(dist, "GET", "/assets/app.css", {"Accept-Encoding": "gzip, br;q=1.0"})
+    assert headers["Content-Encoding"] == "br" and body == CSS_BR
+    _, headers, body = _request(dist, "GET", "/assets/app.css", {"Accept-Encoding": "gzip"})
+    assert headers["Content-Encoding"] == "gzip" and gzip.decompress(body) == CSS
+    _, headers, body = _request(dist, "HEAD", "/assets/app.css", {"Accept-Encoding": "br"})
+    assert body == b"" and headers["Content-Length"] == str(len(CSS_BR))
+
+
+def test_directory_redirects_to_trailing_slash(dist):
+    status, headers, body = _request(dist, "GET", "/docs")
+    assert status == 301 and headers["Location"] == "/docs/" and body == b""
+    status, headers, _ = _request(dist, "GET", "/docs?tab=1")
+    assert status == 301 and headers["Location"] == "/docs/?tab=1"
+    assert _request(dist, "HEAD", "/assets")[0] == 301
+    status, _, body = _request(dist, "GET", "/docs/")
+    assert status == 200 and body == b"<html>docs</html>"
+
+
+def test_missing_and_escaping_paths(dist):
+    assert _request(dist, "GET", "/nope")[0] == 404
+    assert _request(dist, "GET", "/docs/nope.html")[0] == 404
+    assert _request(dist, "GET", "/../secret")[0] == 404
+    assert _request(dist, "GET", "/%2e%2e/secret")[0] == 404
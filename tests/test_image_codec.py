@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""图片编码：各模式 PNG 往返无损（多线程分块路径与 PIL 路径），其他格式可解码。"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend import image_codec
+from backend.image_codec import THREADED_PNG_MODES, encode_image
+
+SIZE = (37, 23)  # 奇数尺寸，分块边界不整齐
+
+
+def _make(mode, seed=0):
+    rng = np.random.default_rng(seed)
+    w, h = SIZE
+    if mode == "I;16":
+        img = Image.fromarray(rng.integers(0, 65536, (h, w), dtype=np.uint16))
+        assert img.mode == "I;16"
+        return img
+    if mode == "1":
+        return Image.fromarray(rng.integers(0, 2, (h, w), dtype=np.uint8) * 255).convert("1")
+    if mode == "P":
+        img = Image.frombytes("P", SIZE, rng.integers(0, 16, (h, w), dtype=np.uint8).tobytes())
+        img.putpalette([v for i in range(16) for v in (i * 16, 255 - i * 16, i * 8)])
+        return img
+    bands = len(Image.new(mode, (1, 1)).getbands())
+    data = rng.integers(0, 256, (h, w, bands), dtype=np.uint8)
+    return Image.fromarray(data[:, :, 0] if bands == 1 else data, mode)
+
+
+def _decode(data):
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
+
+def _assert_same(decoded, img):
+    assert decoded.mode == img.mode
+    assert decoded.size == img.size
+    assert np.array_equal(np.asarray(decoded), np.asarray(img))
+    if img.mode == "P":
+        assert decoded.getpalette()[:48] == img.getpalette()[:48]
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L", "LA", "P", "I;16", "1"])
+@pytest.mark.parametrize("threaded", [False, True])
+def test_png_round_trip(mode, threaded, monkeypatch):
+    monkeypatch.setattr(image_codec, "ENCODE_WORKERS", 3)  # 单核机器上也走多线程路径
+    img = _make(mode)
+    _assert_same(_decode(encode_image(img, "png", threaded=threaded, use_cache=False)), img)
+
+
+@pytest.mark.parametrize("mode", THREADED_PNG_MODES)
+@pytest.mark.parametrize("workers", [1, 2, 5, 64])
+def test_threaded_png_parts(mode, workers):
+    img = _make(mode, seed=workers)
+    _assert_same(_decode(image_codec._encode_png_threaded(img, 1, workers)), img)
+
+
+@pytest.mark.parametrize("fmt", ["jpeg", "webp", "bmp"])
+def test_other_formats_decode(fmt):
+    img = _make("RGBA")
+    decoded = _decode(encode_image(img, fmt, use_cache=False))
+    assert decoded.size == img.size
+    assert image_codec.mime_type(fmt) == Image.MIME[decoded.format]
+
+
+def test_cache_returns_same_bytes():
+    img = _make("RGB")
+    first = encode_image(img, "png")
+    assert encode_image(img, "png") is first
+    assert encode_image(img, "png", compress_level=9) is not first
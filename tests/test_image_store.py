@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""图片仓库：缓存的编码结果计入总字节，淘汰 / discard 时扣回。"""
+import numpy as np
+from PIL import Image
+
+from backend.image_store import ImageStore, _image_nbytes
+
+
+def _noise(w=64, h=64, seed=0):
+    return Image.fromarray(np.random.default_rng(seed).integers(0, 256, (h, w, 3), dtype=np.uint8))
+
+
+def test_encoded_bytes_counted_and_released():
+    store = ImageStore()
+    img = _noise()
+    handle = store.put(img)
+    png, _ = store.encoded(handle, "png")
+    bmp, _ = store.encoded(handle, "bmp")
+    assert store._bytes == _image_nbytes(img) + len(png) + len(bmp)
+    store.encoded(handle, "png")  # 命中缓存不重复计入
+    assert store._bytes == _image_nbytes(img) + len(png) + len(bmp)
+    store.discard(handle)
+    assert store._bytes == 0
+
+
+def test_encoded_bytes_trigger_eviction():
+    pixels = _image_nbytes(_noise())
+    store = ImageStore(max_bytes=pixels * 2 + 1024)
+    first, second = store.put(_noise(seed=1)), store.put(_noise(seed=2))
+    store.encoded(second, "bmp")  # 未压缩的 bmp 约等于像素字节，超出上限
+    assert store.get(first) is None and store.get(second) is not None
+    assert store._bytes == pixels + len(store.encoded(second, "bmp")[0])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""LlmClient：未配置时的报错；并发名额在连接归还时一并归还；排队等名额时可取消。"""
+import threading
+import time
+
+import pytest
+
+from backend.ai_analysis import describe_error
+from backend.llm_client import AI_ENV_KEYS, LlmCancelled, LlmClient, LlmConfig, LlmError, LlmNotConfigured
+from mock_llm_server import start_mock_server
+
+
+def test_unconfigured_raises_on_request():
+    client = LlmClient(LlmConfig.load(environ={}))  # 构造不报错，请求时才报
+    with pytest.raises(LlmNotConfigured) as info:
+        list(client.stream_chat({"messages": []}))
+    assert info.value.missing == ["url", "api_key"]
+    message = describe_error(info.value)
+    assert AI_ENV_KEYS["url"] in message and AI_ENV_KEYS["api_key"] in message
+
+
+def test_env_provides_url_and_key():
+    config = LlmConfig.load(environ={AI_ENV_KEYS["url"]: "http://127.0.0.1:1/v1/chat/completions",
+                                     AI_ENV_KEYS["api_key"]: "k"})
+    assert config.missing() == []
+    with pytest.raises(LlmNotConfigured) as info:
+        LlmClient(LlmConfig(url="http://127.0.0.1:1/")).complete({"messages": []})
+    assert info.value.missing == ["api_key"]
+
+
+@pytest.fixture
+def server():
+    server, url = start_mock_server(tokens=20, ttft=0.0, token_delay=0.0)
+    client = LlmClient(LlmConfig(url=url, api_key="mock", max_connections=1, max_retries=0))
+    yield server, client
+    client.close()
+    server.shutdown()
+
+
+def _slot_free(client):
+    if not client._pool.slots.acquire(timeout=2):
+        return False
+    client._pool.slots.release()
+    return True
+
+
+def test_closed_generator_releases_slot(server):
+    _, client = server
+    chunks = client.stream_chat({"messages": []})
+    next(chunks)
+    assert not client._pool.slots.acquire(blocking=False)  # 迭代中占着名额
+    chunks.close()
+    assert _slot_free(client)
+    assert client.complete({"messages": []})
+
+
+def test_error_releases_slot(server):
+    srv, client = server
+    srv.options.fail_first, srv.options.fail_status = 1, 400
+    with pytest.raises(LlmError):
+        client.complete({"messages": []})
+    assert _slot_free(client)
+
+
+
+def test_cancel_while_waiting_for_slot(server):
+    _, client = server
+    holder = client.stream_chat({"messages": []})
+    next(holder)  # 唯一的并发名额被占着
+    cancel = threading.Event()
+    errors = []
+
+    def waiter():
+        try:
+            client.complete({"messages": []}, cancel=cancel)
+        except LlmCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    assert thread.is_alive()  # 排队等名额
+    cancel.set()
+    thread.join(1)
+    assert not thread.is_alive() and len(errors) == 1
+    assert not client._pool.slots.acquire(blocking=False)  # 取消的请求没有占走名额
+    holder.close()
+    assert _slot_free(client)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""merge_bands：分块结果平移回全图、重叠区只算一次、接缝处重复行去重、空输入与失败块。"""
+import numpy as np
+
+from backend.ocr_result import OcrResult, merge_bands
+
+WIDTH, HEIGHT = 400, 540
+# 两块：0-300 与 240-540，重叠 60 行，以 270 为界
+TOP_DY, BOTTOM_DY, SEAM = 0, 240, 270
+
+
+def rect(x, y, w, h):
+    return [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+
+
+def band(items, dy, keep_top, keep_bottom, height=300):
+    """items: [(text, x, y0, y1, score)]，y 为全图坐标，换算成块内坐标。"""
+    result = OcrResult([rect(x, y0 - dy, 100, y1 - y0) for _, x, y0, y1, _ in items], [t for t, *_ in items],
+                       [s for *_, s in items], WIDTH, height)
+    return result, dy, keep_top, keep_bottom
+
+
+def spans(result):
+    return [(line.text, float(line.box[:, 1].min()), float(line.box[:, 1].max())) for line in result.lines]
+
+
+def test_empty_input():
+    merged = merge_bands([], WIDTH, HEIGHT)
+    assert len(merged) == 0 and merged.error is None and (merged.width, merged.height) == (WIDTH, HEIGHT)
+    empty = OcrResult(width=WIDTH, height=300)
+    assert len(merge_bands([(empty, 0, 0, SEAM), (empty, 240, SEAM, HEIGHT)], WIDTH, HEIGHT)) == 0
+
+
+def test_offsets_applied_and_reading_order():
+    merged = merge_bands([
+        band([("甲", 10, 20, 40, 0.9)], TOP_DY, 0, SEAM),
+        band([("乙", 10, 400, 420, 0.9), ("丙", 200, 402, 422, 0.9)], BOTTOM_DY, SEAM, HEIGHT),
+    ], WIDTH, HEIGHT)
+    assert spans(merged) == [("甲", 20, 40), ("乙", 400, 420), ("丙", 402, 422)]
+    assert merged.text == "甲\n乙\n丙"
+
+
+def test_line_inside_overlap_counted_once():
+    # 完整落在重叠区 240-300 的两行，两块都识别到
+    top = band([("上", 10, 245, 260, 0.9), ("下", 10, 280, 295, 0.9)], TOP_DY, 0, SEAM)
+    bottom = band([("上", 10, 245, 260, 0.8), ("下", 10, 280, 295, 0.8)], BOTTOM_DY, SEAM, HEIGHT)
+    merged = merge_bands([top, bottom], WIDTH, HEIGHT)
+    assert spans(merged) == [("上", 245, 260), ("下", 280, 295)]
+    # 各行由中心所在的块负责
+    assert merged.scores.tolist() == [np.float32(0.9), np.float32(0.8)]
+
+
+def test_truncated_line_taken_from_complete_band():
+    # 285-315 的行在上块底边被截成 285-300，在下块中完整
+    top = band([("被截断", 10, 285, 300, 0.5)], TOP_DY, 0, SEAM)
+    bottom = band([("完整行", 10, 285, 315, 0.9)], BOTTOM_DY, SEAM, HEIGHT)
+    assert spans(merge_bands([top, bottom], WIDTH, HEIGHT)) == [("完整行", 285, 315)]
+    # 对称：235-265 在下块顶边被截成 240-265，由上块的完整框负责
+    top = band([("完整行", 10, 235, 265, 0.9)], TOP_DY, 0, SEAM)
+    bottom = band([("被截断", 10, 240, 265, 0.5)], BOTTOM_DY, SEAM, HEIGHT)
+    assert spans(merge_bands([top, bottom], WIDTH, HEIGHT)) == [("完整行", 235, 265)]
+
+
+def test_duplicate_at_seam_keeps_higher_score():
+    # 同一行中心正好跨在分界线两侧（269.5 / 270），两块各保留一份
+    top = band([("接缝", 10, 261, 278, 0.7)], TOP_DY, 0, SEAM)
+    bottom = band([("接缝", 10, 262, 278, 0.95)], BOTTOM_DY, SEAM, HEIGHT)
+    merged = merge_bands([top, bottom], WIDTH, HEIGHT)
+    assert spans(merged) == [("接缝", 262, 278)]
+    assert merged.scores.tolist() == [np.float32(0.95)]
+    merged = merge_bands([band([("接缝", 10, 261, 278, 0.95)], TOP_DY, 0, SEAM), bottom], WIDTH, HEIGHT)
+    assert spans(merged) == [("接缝", 261, 278)]
+
+
+def test_seam_neighbours_with_different_text_kept():
+    top = band([("左", 10, 261, 278, 0.9)], TOP_DY, 0, SEAM)
+    bottom = band([("右", 10, 262, 278, 0.9), ("远处", 200, 262, 278, 0.9)], BOTTOM_DY, SEAM, HEIGHT)
+    merged = merge_bands([top, bottom], WIDTH, HEIGHT)
+    assert sorted(t for t, *_ in spans(merged)) == sorted(["左", "右", "远处"])
+
+
+def test_failed_band_returns_error():
+    ok = band([("甲", 10, 20, 40, 0.9)], TOP_DY, 0, SEAM)
+    failed = (OcrResult.failed("[OCR 错误] boom"), BOTTOM_DY, SEAM, HEIGHT)
+    merged = merge_bands([ok, failed], WIDTH, HEIGHT)
+    assert merged.error == "[OCR 错误] boom" and (merged.width, merged.height) == (WIDTH, HEIGHT)
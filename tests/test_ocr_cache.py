@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""OCR 缓存磁盘层：超出条目上限时按 rowid 删除最早写入的（与时钟精度无关），写入时不再 COUNT(*)。"""
+from backend import ocr_cache
+from backend.ocr_cache import OcrCache
+
+
+def _disk_keys(cache):
+    return [row[0] for row in cache._db.execute("SELECT key FROM ocr_cache ORDER BY rowid")]
+
+
+def test_disk_trim_keeps_newest(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_cache.time, "time", lambda: 1000.0)  # 所有条目写入时间相同
+    cache = OcrCache(disk_path=str(tmp_path / "ocr.db"), disk_max_items=5)
+    for i in range(12):
+        cache.put(f"k{i}", f"v{i}")
+    assert _disk_keys(cache) == [f"k{i}" for i in range(7, 12)]
+    cache.put("k11", "again")  # 覆盖已有键不触发裁剪
+    assert _disk_keys(cache) == [f"k{i}" for i in range(7, 12)]
+    cache.put("k7", "again")  # 覆盖的键成为最新写入的一条
+    cache.put("k12", "v12")
+    assert _disk_keys(cache) == ["k9", "k10", "k11", "k7", "k12"]
+
+
+def test_put_keeps_running_count(tmp_path):
+    path = str(tmp_path / "ocr.db")
+    cache = OcrCache(disk_path=path, disk_max_items=4)
+    for i in range(3):
+        cache.put(f"k{i}", "v")
+    statements = []
+    cache._db.set_trace_callback(statements.append)
+    for i in range(3, 8):
+        cache.put(f"k{i}", "v")
+    assert not any("COUNT(" in sql.upper() for sql in statements)
+    assert cache._disk_count == 4 and len(_disk_keys(cache)) == 4
+    # 重新打开时从已有条目数接着计
+    reopened = OcrCache(disk_path=path, disk_max_items=4)
+    assert reopened._disk_count == 4
+    reopened.put("k8", "v")
+    assert _disk_keys(reopened) == ["k5", "k6", "k7", "k8"]
+    reopened.clear()
+    assert reopened._disk_count == 0
+
+
+def test_trim_scans_rowid_without_sort(tmp_path):
+    cache = OcrCache(disk_path=str(tmp_path / "ocr.db"))
+    plan = cache._db.execute("EXPLAIN QUERY PLAN SELECT rowid FROM ocr_cache ORDER BY rowid LIMIT 1").fetchall()
+    assert not any("TEMP B-TREE" in row[-1] for row in plan)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""OcrHandler 文件 / 数组识别：数组直接交给引擎，零页文件给出明确错误。"""
+import numpy as np
+from PIL import Image
+
+from backend import ocr_engine
+from backend.ocr_backends import StubOcrBackend, register_backend
+from backend.ocr_engine import OcrHandler
+
+
+class RecordingBackend(StubOcrBackend):
+    """记录每次送入引擎的数组。"""
+
+    name = "recording"
+    seen = []
+
+    def recognize(self, arr):
+        RecordingBackend.seen.append(arr)
+        return super().recognize(arr)
+
+
+register_backend(RecordingBackend.name, RecordingBackend)
+
+
+def _text_image(h=200, w=300):
+    arr = np.full((h, w, 3), 255, dtype=np.uint8)
+    arr[40:60, 20:200] = 0
+    arr[120:140, 20:150] = 0
+    return arr
+
+
+def test_array_passed_to_engine_without_copy():
+    RecordingBackend.seen.clear()
+    arr = _text_image()
+    result = OcrHandler({"backend": "recording"}, cache=False).recognize_array_result(arr)
+    assert len(result) == 2 and not result.error
+    assert np.shares_memory(RecordingBackend.seen[-1], arr)
+
+
+def test_tiled_array_bands_are_views():
+    RecordingBackend.seen.clear()
+    arr = _text_image(h=900)
+    handler = OcrHandler({"backend": "recording"}, cache=False)
+    handler._recognize(arr, True, tile_height=300, overlap=60)
+    assert len(RecordingBackend.seen) == 4
+    assert all(np.shares_memory(band, arr) for band in RecordingBackend.seen)
+
+
+def test_file_result_matches_image_result(tmp_path):
+    path = tmp_path / "page.png"
+    Image.fromarray(_text_image()).save(path)
+    handler = OcrHandler({"backend": "stub"}, cache=False)
+    from_file = handler.recognize_file_result(str(path))
+    from_image = handler.recognize_image_result(Image.open(path))
+    assert from_file.to_dict() == from_image.to_dict()
+
+
+def test_file_without_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_engine, "iter_frames", lambda path: iter(()))
+    result = OcrHandler({"backend": "stub"}, cache=False).recognize_file_result(str(tmp_path / "empty.tif"))
+    assert result.error and "没有可识别的图像" in result.error
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 流水线（stub 后端，不需要模型）：分块识别 + 接缝合并、结果缓存、前处理坐标映射、
+异步任务 OcrJobManager、批量识别 recognize_batch。
+"""
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.ocr_backends import OCR_ENGINE_ENV, StubOcrBackend, register_backend
+from backend.ocr_batch import recognize_batch
+from backend.ocr_cache import OcrCache
+from backend.ocr_engine import OcrHandler
+from backend.ocr_jobs import CANCELLED, DONE, ERROR, OcrJobManager
+from backend.ocr_preprocess import PreprocessOptions
+
+STUB = {"backend": "stub"}
+
+
+class CountingBackend(StubOcrBackend):
+    """统计 recognize 调用次数的 stub 后端。"""
+
+    name = "counting"
+    calls = 0
+
+    def recognize(self, arr):
+        CountingBackend.calls += 1
+        return super().recognize(arr)
+
+
+class FailingBackend(StubOcrBackend):
+    name = "failing"
+
+    def recognize(self, arr):
+        raise RuntimeError("engine crashed")
+
+
+register_backend(CountingBackend.name, CountingBackend)
+register_backend(FailingBackend.name, FailingBackend)
+
+
+def lines_image(height, rows, width=400, margin=30):
+    """
+    白底上的「文字行」：每 3 列交替的黑色竖纹横条（像字形一样有纹理，前处理不会当成空白），
+    stub 后端把每个横条识别为一行；rows 为 [(y0, y1)]，各行宽度不同便于区分。
+    """
+    arr = np.full((height, width, 3), 255, dtype=np.uint8)
+    stripes = (np.arange(width) - margin) // 3 % 2 == 0
+    for i, (y0, y1) in enumerate(rows):
+        cols = stripes.copy()
+        cols[:margin] = False
+        cols[width - margin - (i * 7) % 120:] = False
+        arr[y0:y1, cols] = 0
+    return arr
+
+
+def boxes_of(result):
+    return sorted(tuple(line.box.ravel().tolist()) for line in result.lines)
+
+
+# 条带高 300、重叠 60：条带起点 0 / 240 / 480 / 720，分界线 270 / 510 / 750
+TILE, OVERLAP = 300, 60
+SEAM_ROWS = [(20, 36), (230, 246), (262, 278), (290, 306), (500, 516), (505 + 40, 561), (740, 760), (930, 946)]
+
+
+def test_tiled_matches_whole_image():
+    img = Image.fromarray(lines_image(960, SEAM_ROWS))
+    handler = OcrHandler(STUB, cache=False)
+    whole = handler.recognize_image_result(img, tiled=False)
+    tiled = handler.recognize_tiled_result(img, tile_height=TILE, overlap=OVERLAP, workers=2)
+    assert len(whole) == len(SEAM_ROWS)
+    assert boxes_of(tiled) == boxes_of(whole)
+    assert tiled.text == whole.text
+    assert (tiled.width, tiled.height) == (400, 960)
+
+
+def test_tiled_array_and_pil_agree():
+    arr = lines_image(960, SEAM_ROWS)
+    handler = OcrHandler(STUB, cache=False)
+    from_pil = handler.recognize_tiled_result(Image.fromarray(arr), tile_height=TILE, overlap=OVERLAP)
+    from_arr = handler._recognize(arr, True, tile_height=TILE, overlap=OVERLAP)
+    assert boxes_of(from_pil) == boxes_of(from_arr)
+
+
+def test_cache_hit_skips_engine():
+    cache = OcrCache()
+    handler = OcrHandler({"backend": "counting"}, cache=cache)
+    arr = lines_image(200, [(40, 60), (120, 140)])
+    CountingBackend.calls = 0
+    first = handler.recognize_array_result(arr)
+    second = handler.recognize_array_result(arr.copy())  # 内容相同的另一份缓冲区
+    assert CountingBackend.calls == 1
+    assert second.to_dict() == first.to_dict()
+    assert cache.stats()["hits"] == 1
+    # 前处理配置不同 -> 不同缓存键
+    handler.recognize_array_result(arr, preprocess=PreprocessOptions(downscale=False))
+    assert CountingBackend.calls > 1
+    # PIL 分块（image_key）与 ndarray（content_key）对同一内容命中同一条缓存
+    calls = CountingBackend.calls
+    handler.recognize_image_result(Image.fromarray(arr), tiled=True)
+    handler.recognize_array_result(arr, tiled=True)
+    assert CountingBackend.calls == calls + 1
+
+
+def test_failed_result_not_cached():
+    cache = OcrCache()
+    handler = OcrHandler({"backend": "failing"}, cache=cache)
+    result = handler.recognize_array_result(lines_image(100, [(10, 20)]))
+    assert result.error == "[OCR 错误] engine crashed"
+    assert cache.stats()["items"] == 0
+
+
+@pytest.mark.parametrize("options", [
+    PreprocessOptions(downscale=False),
+    PreprocessOptions(downscale=False, grayscale=True),
+    PreprocessOptions(downscale=False, crop_margins=False, skip_blank=True),
+])
+def test_preprocess_maps_back_exactly(options):
+    # 上下大片空白：裁边与跳过空白都会生效
+    arr = lines_image(1200, [(300, 320), (340, 356), (900, 920)])
+    handler = OcrHandler(STUB, cache=False)
+    plain = handler.recognize_array_result(arr)
+    pre = handler.recognize_array_result(arr, preprocess=options)
+    assert boxes_of(pre) == boxes_of(plain)
+
+
+def test_preprocess_downscale_maps_back_to_original_size():
+    arr = lines_image(1200, [(300, 320), (340, 360), (900, 920)])
+    handler = OcrHandler(STUB, cache=False)
+    plain = handler.recognize_array_result(arr)
+    pre = handler.recognize_array_result(arr, preprocess=PreprocessOptions(dpi_scale=2.0))
+    assert (pre.width, pre.height) == (400, 1200)
+    assert len(pre) == len(plain)
+    assert np.abs(np.sort(pre.boxes, axis=0) - np.sort(plain.boxes, axis=0)).max() <= 2
+
+
+def _job_manager(run, **kwargs):
+    finished, done = [], threading.Event()
+
+    def on_finished(job):
+        finished.append(job)
+        done.set()
+
+    return OcrJobManager(run, on_finished=on_finished, **kwargs), finished, done
+
+
+def test_job_manager_runs_and_notifies():
+    handler = OcrHandler(STUB, cache=False)
+    arr = lines_image(200, [(40, 60), (120, 140)])
+    manager, finished, done = _job_manager(lambda payload: handler.recognize_array_result(payload).to_dict())
+    try:
+        job_id = manager.submit("img-1", arr)
+        assert done.wait(5)
+        job = manager.poll(job_id)
+        assert job["status"] == DONE and len(job["result"]["lines"]) == 2
+        assert finished == [job]
+    finally:
+        manager.shutdown()
+
+
+def test_job_manager_dedupes_and_cancels():
+    gate = threading.Event()
+
+    def run(payload):
+        gate.wait(5)
+        if payload == "boom":
+            raise RuntimeError("broken")
+        return {"text": payload}
+
+    manager, finished, _ = _job_manager(run, workers=1)
+    try:
+        running = manager.submit("a", "first")
+        assert manager.submit("a", "again") == running  # 在途时复用
+        queued = manager.submit("b", "second")
+        failing = manager.submit("c", "boom")
+        assert manager.cancel(queued)
+        assert manager.poll(queued)["status"] == CANCELLED
+        assert not manager.cancel(queued)
+        gate.set()
+        for _ in range(500):
+            if manager.poll(failing)["status"] == ERROR:
+                break
+            threading.Event().wait(0.01)
+        assert manager.poll(running)["status"] == DONE
+        assert "broken" in manager.poll(failing)["error"]
+        assert [job["status"] for job in finished] == [CANCELLED, DONE, ERROR]
+        assert manager.submit("a", "third") != running  # 结束后同一 key 重新提交
+    finally:
+        gate.set()
+        manager.shutdown()
+
+
+@pytest.fixture
+def stub_env(monkeypatch):
+    monkeypatch.setenv(OCR_ENGINE_ENV, '{"backend": "stub"}')
+
+
+def _batch_inputs(tmp_path):
+    arrays = [lines_image(120, [(10 + 20 * k, 20 + 20 * k) for k in range(n)]) for n in (1, 2, 3, 4)]
+    path = tmp_path / "three.png"
+    Image.fromarray(arrays[2]).save(path)
+    return [arrays[0], Image.fromarray(arrays[1]), str(path), arrays[3]]
+
+
+def test_batch_in_process_keeps_order(stub_env, tmp_path):
+    progress = []
+    results = list(recognize_batch(_batch_inputs(tmp_path), workers=0,
+                                   on_progress=lambda done, submitted: progress.append(done)))
+    assert [i for i, _ in results] == [0, 1, 2, 3]
+    assert [text.count("stub") for _, text in results] == [1, 2, 3, 4]
+    assert progress == [1, 2, 3, 4]
+
+
+def test_batch_process_pool_keeps_order(stub_env, tmp_path):
+    results = list(recognize_batch(_batch_inputs(tmp_path), workers=2))
+    assert [i for i, _ in results] == [0, 1, 2, 3]
+    assert [text.count("stub") for _, text in results] == [1, 2, 3, 4]
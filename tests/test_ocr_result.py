@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""OcrResult：阅读顺序、区域再查询、JSON 往返（手工构造的文本框，不需要 OCR 引擎）。"""
+import numpy as np
+import pytest
+
+from backend.ocr_result import OcrResult, reading_order
+
+
+def rect(x, y, w, h):
+    """轴对齐矩形 -> 4 个顶点（左上、右上、右下、左下）。"""
+    return [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+
+
+def make(items, width=400, height=300):
+    """items: [(text, (x, y, w, h))]，置信度按顺序 0.9, 0.8, ..."""
+    return OcrResult([rect(*r) for _, r in items], [t for t, _ in items],
+                     [0.9 - 0.1 * i for i in range(len(items))], width, height)
+
+
+# 两栏布局：同一视觉行的框纵向有几像素错位；列表顺序故意打乱
+PAGE = [
+    ("右二", (220, 62, 80, 20)),
+    ("左一", (20, 20, 100, 20)),
+    ("左二", (20, 60, 120, 20)),
+    ("右一", (220, 24, 90, 20)),
+    ("页脚", (20, 250, 300, 16)),
+]
+
+
+def test_reading_order_rows_then_left_to_right():
+    result = make(PAGE)
+    assert [line.text for line in result.lines] == ["左一", "右一", "左二", "右二", "页脚"]
+    assert result.text == "左一\n右一\n左二\n右二\n页脚"
+    assert sorted(result.order.tolist()) == list(range(len(PAGE)))
+
+
+def test_reading_order_separates_close_rows():
+    # 行距只比半个行高多一点：仍是两行
+    boxes = np.asarray([rect(200, 0, 50, 20), rect(0, 11, 50, 20)], dtype=np.float32)
+    assert reading_order(boxes).tolist() == [0, 1]
+    # 中心差不到半个行高：同一行，按左边界
+    boxes = np.asarray([rect(200, 0, 50, 20), rect(0, 9, 50, 20)], dtype=np.float32)
+    assert reading_order(boxes).tolist() == [1, 0]
+
+
+def test_reading_order_empty_and_rotated():
+    assert reading_order(np.zeros((0, 4, 2), np.float32)).size == 0
+    # 略微倾斜的框（顶点不轴对齐）按外接范围计算
+    tilted = np.asarray([[[100, 5], [150, 0], [152, 20], [102, 25]], rect(0, 2, 50, 20)], dtype=np.float32)
+    assert reading_order(tilted).tolist() == [1, 0]
+
+
+def test_in_region_overlap_threshold():
+    result = make(PAGE)
+    left = result.in_region(0, 0, 200, 100)
+    assert [line.text for line in left.lines] == ["左一", "左二"]
+    assert [line.index for line in left.lines] == [0, 1]  # 子集内重新编号
+    assert (left.width, left.height) == (400, 300)
+    # 页脚框 300 宽，区域只盖住其中 100 / 150 / 300 像素
+    assert len(result.in_region(0, 240, 120, 40)) == 0
+    assert [line.text for line in result.in_region(0, 240, 170, 40).lines] == ["页脚"]
+    assert len(result.in_region(0, 240, 120, 40, min_overlap=0.3)) == 1
+    assert len(result.in_region(1000, 1000, 10, 10)) == 0
+
+
+def test_in_region_keeps_scores_and_error():
+    result = make(PAGE)
+    right = result.in_region(200, 0, 200, 100)
+    assert {line.text: round(line.score, 3) for line in right.lines} == {"右一": 0.6, "右二": 0.9}
+    failed = OcrResult.failed("[OCR 错误] x", 10, 10)
+    assert failed.in_region(0, 0, 10, 10).error == "[OCR 错误] x"
+
+
+def test_json_round_trip():
+    result = make(PAGE)
+    restored = OcrResult.from_json(result.to_json())
+    assert restored.to_dict() == result.to_dict()
+    assert restored.text == result.text
+    assert np.array_equal(np.sort(restored.boxes, axis=0), np.sort(result.boxes, axis=0))
+    assert restored.boxes.dtype == np.float32 and restored.order.dtype == np.int32
+    data = result.to_dict()
+    assert [line["index"] for line in data["lines"]] == list(range(len(PAGE)))
+    assert data["lines"][0] == {"box": rect(20, 20, 100, 20), "text": "左一", "score": pytest.approx(0.8),
+                                "index": 0}
+
+
+def test_json_round_trip_empty_and_failed():
+    empty = OcrResult(width=5, height=6)
+    assert OcrResult.from_json(empty.to_json()).to_dict() == empty.to_dict()
+    failed = OcrResult.from_json(OcrResult.failed("[OCR 错误] x", 5, 6).to_json())
+    assert failed.error == "[OCR 错误] x" and failed.text == "[OCR 错误] x" and len(failed) == 0
+
+
+def test_from_rapidocr_skips_empty_text():
+    raw = [[rect(0, 0, 10, 10), " 甲 ", 0.5], [rect(0, 20, 10, 10), "", 0.9], [rect(0, 40, 10, 10), "乙"]]
+    result = OcrResult.from_rapidocr(raw, 10, 50)
+    assert result.texts == ["甲", "乙"]
+    assert result.scores.tolist() == [0.5, 1.0]
+
+
+def test_transformed_maps_back():
+    result = make(PAGE[:2])
+    moved = result.transformed(scale=2.0, offset=(5, 7))
+    assert np.allclose(moved.boxes, result.boxes * 2 + [5, 7])
+    assert moved.text == result.text
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+增量预览：frame_count 只随实际拼接的帧变化，不随发布 / 状态更新次数变化；
+PreviewScaler 缓存已缩放的行且结果与一次性缩放一致；旧接口的手动长截图不再每帧复制整张长图。
+"""
+import threading
+
+import numpy as np
+from PIL import Image
+
+from backend import long_screenshot
+from backend.long_screenshot_preview import PREVIEW_CACHE_RATIO, PREVIEW_THUMB_WIDTH, PreviewFeed, PreviewScaler
+
+
+def _rows(n, width=400):
+    return np.full((n, width, 3), 128, dtype=np.uint8)
+
+
+def test_status_updates_do_not_count_frames():
+    feed = PreviewFeed(bgr=True)
+    feed.append(_rows(300), 400, True, frames=1)
+    for _ in range(5):  # 预览线程空转：没有新增行
+        feed.set_status(True, frames=1)
+    feed.set_status(False, frames=1)  # 匹配失败
+    assert feed.frame_count == 1
+    snap = feed.snapshot()
+    assert snap["frame_count"] == 1 and snap["success"] is False
+
+
+def test_batched_publish_uses_capture_count():
+    feed = PreviewFeed(bgr=True)
+    feed.append(_rows(300), 400, True, frames=1)
+    feed.append(_rows(180), 400, True, frames=4)  # 两次发布之间拼接了 3 帧，合并为一次 append
+    assert feed.frame_count == 4
+    assert feed.snapshot()["full_size"] == (400, 480)
+
+
+def test_append_without_frames_counts_one():
+    feed = PreviewFeed()
+    feed.append(_rows(300))
+    feed.append(_rows(60))
+    feed.set_status(True)
+    assert feed.frame_count == 2
+
+
+def _thumb(height, width=288, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def _fit(h, box_h=292, w=288):
+    r = min(1.0, box_h / h)
+    return max(int(w * r), 1), max(int(h * r), 1)
+
+
+def test_scaler_incremental_matches_fresh():
+    thumb = _thumb(5000)
+    scaler = PreviewScaler(292)
+    for height in (100, 250, 293, 700, 701, 1500, 2400, 2417, 5000):
+        size = _fit(height)
+        incremental = scaler.scale(thumb[:height], size)
+        fresh = PreviewScaler(292).scale(thumb[:height], size)
+        assert incremental.size == size
+        assert np.array_equal(np.asarray(incremental), np.asarray(fresh)), height
+        assert scaler._cache.shape[0] <= 292 * PREVIEW_CACHE_RATIO
+
+
+def test_scaler_only_processes_new_rows(monkeypatch):
+    from backend import long_screenshot_preview as lsp
+    seen = []
+    real = lsp._halve_rows
+    monkeypatch.setattr(lsp, "_halve_rows", lambda rows, level: seen.append(rows.shape[0]) or real(rows, level))
+    thumb = _thumb(500)
+    scaler = PreviewScaler(400)  # 缓存上限 800 行：不升级
+    for height in range(100, 501, 100):
+        scaler.scale(thumb[:height], _fit(height, 400))
+    assert seen == [100] * 5
+
+
+def test_scaler_small_thumb_not_resized():
+    thumb = _thumb(120)
+    img = PreviewScaler(292).scale(thumb, (288, 120))
+    assert np.array_equal(np.asarray(img), thumb)
+
+
+def test_scaler_resets_for_new_session():
+    scaler = PreviewScaler(100)
+    scaler.scale(_thumb(900), _fit(900, 100))
+    other = _thumb(50, width=200, seed=1)
+    img = scaler.scale(other, (200, 50))
+    assert np.array_equal(np.asarray(img), other)
+    shorter = _thumb(40, seed=2)
+    assert np.array_equal(np.asarray(scaler.scale(shorter, (288, 40))), shorter)
+
+
+def _textured_page(height, width, seed=3):
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 245, dtype=np.uint8)
+    y = 4
+    while y < height - 12:
+        x = int(rng.integers(0, 40))
+        page[y:y + 9, x:x + int(rng.integers(width // 3, width - x))] = rng.integers(0, 150, size=3)
+        y += int(rng.integers(11, 20))
+    return page
+
+
+def test_manual_capture_holder_gets_thumbnail(monkeypatch):
+    width, frame_h = 640, 300
+    page = _textured_page(1400, width)
+    tops = [0, 0, 100, 260, 380, 520, 700, 860]
+    stop = threading.Event()
+    frames = iter(tops)
+    converted = []
+    real_fromarray = Image.fromarray
+
+    def grab(bbox):
+        top = next(frames, None)
+        if top is None:
+            stop.set()
+            return None
+        return real_fromarray(page[top:top + frame_h])
+
+    def fromarray(arr, *args, **kwargs):
+        converted.append(arr.shape)
+        return real_fromarray(arr, *args, **kwargs)
+
+    monkeypatch.setattr(long_screenshot, "CAPTURE_INTERVAL", 0)
+    monkeypatch.setattr(long_screenshot.ImageGrab, "grab", grab)
+    monkeypatch.setattr(long_screenshot.Image, "fromarray", fromarray)
+    holder = [None]
+    result = long_screenshot.capture_long_screenshot_manual((0, 0, width, frame_h), stop, current_result_holder=holder)
+    assert result.width == width and result.height > 860 + frame_h - 5
+    # 过程中只转换缩略图；整张长图只在结束时转换一次
+    assert converted[-1] == (result.height, width, 3)
+    assert all(shape[1] == PREVIEW_THUMB_WIDTH for shape in converted[:-1]) and len(converted) > 2
+    assert holder[0].width == PREVIEW_THUMB_WIDTH
+    assert holder[0].height == round(result.height * PREVIEW_THUMB_WIDTH / width)
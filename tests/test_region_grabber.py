@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""RegionGrabber 缓冲区复用：仍被使用方持有的帧不会被后续截屏覆盖。"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from backend import long_screenshot_opencv as lso
+from backend.capture_pipeline import CapturePipeline
+
+W, H = 32, 24
+
+
+class _FakeShot:
+    def __init__(self, value):
+        self.width, self.height = W, H
+        self.raw = np.full((H, W, 4), value, dtype=np.uint8).tobytes()
+
+
+class _FakeMss:
+    """每次 grab 返回整帧像素值为递增序号（mod 256）的 BGRA 图。"""
+
+    def __init__(self):
+        self.count = 0
+
+    def grab(self, monitor):
+        self.count += 1
+        return _FakeShot(self.count % 256)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_screen(monkeypatch):
+    monkeypatch.setattr(lso, "MSS_AVAILABLE", True)
+    monkeypatch.setattr(lso, "mss", _FakeMss, raising=False)
+
+
+def test_held_frame_not_overwritten(fake_screen):
+    grabber = lso.RegionGrabber((0, 0, W, H))
+    held = grabber.grab()
+    value = int(held[0, 0, 0])
+    for _ in range(3 * grabber.pool_size):
+        frame = grabber.grab()
+        assert frame is not held
+        grabber.release(frame)
+    assert (held == value).all()
+    assert grabber.alloc_count <= grabber.pool_size
+
+
+def test_grab_skips_when_all_buffers_in_use(fake_screen):
+    grabber = lso.RegionGrabber((0, 0, W, H), pool_size=3)
+    frames = [grabber.grab() for _ in range(3)]
+    assert all(f is not None for f in frames)
+    assert grabber.grab() is None
+    assert grabber.skipped == 1
+    grabber.release(frames[0])
+    assert grabber.grab() is frames[0]
+
+
+def test_slow_consumer_pipeline(fake_screen):
+    """匹配线程处理每帧都很慢（期间截屏超过 7 次），处理过程中帧内容保持不变。"""
+    grabber = lso.RegionGrabber((0, 0, W, H))
+    stop = threading.Event()
+    corrupted, processed = [], []
+
+    def process(frame):
+        value = int(frame[0, 0, 0])
+        before = grabber.grab_count + grabber.skipped
+        time.sleep(0.1)
+        if not (frame == value).all():
+            corrupted.append(value)
+        processed.append(grabber.grab_count + grabber.skipped - before)
+        return 0
+
+    pipeline = CapturePipeline(grab=grabber.grab, process=process, stop_event=stop, frame_height=H,
+                               initial_interval=0.005, release=grabber.release)
+    pipeline.pacer.min_interval = pipeline.pacer.max_interval = 0.005
+    threading.Timer(0.6, stop.set).start()
+    pipeline.run()
+    assert processed and max(processed) > 7
+    assert not corrupted
+    assert grabber.alloc_count <= grabber.pool_size
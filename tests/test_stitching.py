@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+长截图拼接正确性：对合成文档按已知步长滚动截帧，_find_overlap_offset（含金字塔粗到细）给出精确偏移，
+FrameStitcher / stitch_frames 拼出的长图与原文档逐像素一致。
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+cv2 = pytest.importorskip("cv2")
+
+from backend.long_screenshot_opencv import OVERLAP_RATIO, FrameStitcher, _find_overlap_offset, stitch_frames
+
+W, FRAME_H = 240, 300
+
+
+def make_document(height, width=W, seed=0):
+    """白底上随机长度、随机灰度的「词」组成的文字行（BGR），每行内容不同，重叠匹配有唯一解。"""
+    rng = np.random.default_rng(seed)
+    doc = np.full((height, width, 3), 250, dtype=np.uint8)
+    y = 4
+    while y < height - 16:
+        line_h = int(rng.integers(8, 16))
+        x = int(rng.integers(4, 30))
+        while x < width - 20:
+            word_w = int(rng.integers(8, 50))
+            doc[y:y + line_h, x:min(x + word_w, width - 4)] = rng.integers(0, 120, size=3)
+            x += word_w + int(rng.integers(4, 12))
+        y += line_h + int(rng.integers(3, 8))
+    return doc
+
+
+def frames_at(doc, tops):
+    return [np.ascontiguousarray(doc[y:y + FRAME_H]) for y in tops]
+
+
+def tops_for(fractions):
+    tops = [0]
+    for f in fractions:
+        tops.append(tops[-1] + int(FRAME_H * f))
+    return tops
+
+
+# 可匹配的滚动范围：(1 - 2 × 重叠比例) ~ (1 - 重叠比例) 帧高
+MIN_SCROLL = int(np.ceil(FRAME_H * (1 - 2 * OVERLAP_RATIO)))
+MAX_SCROLL = int(FRAME_H * (1 - OVERLAP_RATIO))
+
+
+@pytest.fixture(scope="module")
+def doc():
+    return make_document(4000)
+
+
+@pytest.mark.parametrize("levels", [0, 1, 2])
+def test_offset_exact_for_matchable_scrolls(doc, levels):
+    prev = doc[500:500 + FRAME_H]
+    for scroll in range(MIN_SCROLL, MAX_SCROLL + 1, 7):
+        new = doc[500 + scroll:500 + scroll + FRAME_H]
+        offset, confidence = _find_overlap_offset(prev, new, pyramid_levels=levels)
+        assert offset == FRAME_H - scroll, scroll
+        assert confidence > 0.99
+
+
+def test_pyramid_agrees_with_full_resolution(doc):
+    prev = doc[1200:1200 + FRAME_H]
+    for scroll in (MIN_SCROLL, 150, 166, MAX_SCROLL):
+        new = doc[1200 + scroll:1200 + scroll + FRAME_H]
+        assert _find_overlap_offset(prev, new)[0] == _find_overlap_offset(prev, new, pyramid_levels=0)[0]
+
+
+@pytest.mark.parametrize("scroll", [0, 30, MIN_SCROLL - 10, MAX_SCROLL + 10, FRAME_H])
+def test_offset_fails_outside_search_range(doc, scroll):
+    # 模板只在新帧顶部 2 × 重叠高度内搜索：滚得太少或滚过了重叠区都算匹配失败
+    prev = doc[800:800 + FRAME_H]
+    new = doc[800 + scroll:800 + scroll + FRAME_H]
+    assert _find_overlap_offset(prev, new)[0] == 0
+
+
+def test_offset_rejects_width_mismatch(doc):
+    assert _find_overlap_offset(doc[:FRAME_H], doc[150:150 + FRAME_H, :200]) == (0, 0.0)
+
+
+def test_frame_stitcher_reconstructs_document(doc):
+    tops = tops_for([0.5, 0.45, 0.6, 0.7, 0.4, 0.55, 0.5])
+    stitcher = FrameStitcher()
+    results = []
+    for frame in frames_at(doc, tops):
+        results.append(stitcher.push(frame))
+        results.append(stitcher.push(frame.copy()))  # 用户停顿：重复帧
+        assert stitcher.last_success is None
+    assert results[1::2] == [None] * len(tops)
+    assert stitcher.frame_count == stitcher.stitch_count == len(tops)
+    starts = [start for start, _ in results[0::2]]
+    assert starts == [0] + [prev + FRAME_H for prev in tops[:-1]]
+    final = stitcher.canvas.view()
+    assert final.shape == (tops[-1] + FRAME_H, W, 3)
+    assert np.array_equal(final, doc[:tops[-1] + FRAME_H])
+
+
+def test_frame_stitcher_recovers_after_small_scroll(doc):
+    # 0.1 帧高的滚动不足以匹配：该帧丢弃，画布尾部不变，后续帧相对尾部累计滚动后继续拼接
+    tops = [0, 30, 60, 165, 330]
+    stitcher = FrameStitcher()
+    outcomes = []
+    for frame in frames_at(doc, tops):
+        stitcher.push(frame)
+        outcomes.append(stitcher.last_success)
+    assert outcomes == [True, False, False, True, True]
+    assert stitcher.frame_count == 5 and stitcher.stitch_count == 3
+    assert np.array_equal(stitcher.canvas.view(), doc[:330 + FRAME_H])
+
+
+def test_stitch_frames_strips_are_contiguous(doc):
+    tops = tops_for([0.5, 0.62, 0.41, 0.68, 0.5, 0.5, 0.45, 0.6])
+    stitcher = FrameStitcher()
+    strips = list(stitch_frames(frames_at(doc, tops), stitcher=stitcher))
+    y = 0
+    for start, strip in strips:
+        assert start == y
+        assert np.array_equal(strip, doc[start:start + strip.shape[0]])
+        y += strip.shape[0]
+    assert y == tops[-1] + FRAME_H == stitcher.canvas.height
+
+
+def test_stitch_frames_from_directory(doc, tmp_path):
+    tops = tops_for([0.5, 0.5, 0.5])
+    for i, frame in enumerate(frames_at(doc, tops)):
+        cv2.imwrite(str(tmp_path / f"{i:03d}.png"), frame)
+    (tmp_path / "notes.txt").write_text("not a frame")
+    stitcher = FrameStitcher()
+    list(stitch_frames(str(tmp_path), stitcher=stitcher))
+    assert np.array_equal(stitcher.canvas.view(), doc[:tops[-1] + FRAME_H])
+
+
+def test_stitch_frames_accepts_rgb_pil_and_bgra(doc):
+    frames = frames_at(doc, tops_for([0.5, 0.5]))
+    mixed = [Image.fromarray(cv2.cvtColor(frames[0], cv2.COLOR_BGR2RGB)),
+             cv2.cvtColor(frames[1], cv2.COLOR_BGR2BGRA), frames[2]]
+    stitcher = FrameStitcher()
+    list(stitch_frames(mixed, stitcher=stitcher))
+    assert np.array_equal(stitcher.canvas.view(), doc[:300 + FRAME_H])